@@ -24,44 +24,256 @@ document.addEventListener("DOMContentLoaded", () => {
   let notes = [];
   let currentNoteId = null;
 
-  // 🟡 API функции
-  async function fetchNotes() {
-    const res = await fetch("/api/notes");
-    notes = await res.json();
-    renderNotes();
+  // 🔄 Локальная копия заметок в localStorage: при открытии показываем её сразу,
+  // а с сервера забираем только изменённое после syncToken (/api/notes/changes)
+  const LOCAL_KEY = "notesLocal";
+  const CHANGES_LIMIT = 500;
+  let syncToken = null;
+  let syncing = null;
+
+  // Копия своя у каждого пользователя (userId — см. checkUser ниже)
+  function localKey() {
+    return `${LOCAL_KEY}:${userId}`;
   }
 
-  async function createNote(title, text, icon) {
-    await fetch("/api/notes/create", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ title, text, icon }),
+  function loadLocal() {
+    if (!userId) return;
+    try {
+      const saved = JSON.parse(localStorage.getItem(localKey()));
+      if (saved && Array.isArray(saved.notes)) {
+        notes = saved.notes;
+        syncToken = saved.token;
+      }
+    } catch {
+      localStorage.removeItem(localKey());
+    }
+  }
+
+  function saveLocal() {
+    if (!userId) return;
+    try {
+      localStorage.setItem(localKey(), JSON.stringify({ token: syncToken, notes }));
+    } catch (err) {
+      console.warn("Не удалось сохранить заметки локально:", err);
+    }
+  }
+
+  // Новые сверху — как в /api/notes
+  function byCreated(a, b) {
+    if (a.created_at !== b.created_at) return a.created_at < b.created_at ? 1 : -1;
+    return b.id - a.id;
+  }
+
+  function applyChanges(changes) {
+    const byId = new Map(notes.map(note => [note.id, note]));
+    changes.forEach(change => {
+      if (change.deleted) byId.delete(change.id);
+      else byId.set(change.id, change);
     });
-    await fetchNotes();
+    notes = Array.from(byId.values()).sort(byCreated);
+  }
+
+  async function pullChanges() {
+    let changed = false;
+    while (true) {
+      const params = new URLSearchParams({ limit: CHANGES_LIMIT });
+      if (syncToken) params.set("since", syncToken);
+      const res = await fetch(`/api/notes/changes?${params}`);
+      if (res.status === 400 || res.status === 410) {
+        // токен испорчен или от другого пользователя — загружаем всё заново
+        if (!syncToken) return changed;
+        notes = [];
+        syncToken = null;
+        changed = true;
+        continue;
+      }
+      if (!res.ok) return changed;
+      const data = await res.json();
+      if (data.changes.length) {
+        applyChanges(data.changes);
+        changed = true;
+      }
+      syncToken = data.token;
+      if (!data.has_more) return changed;
+    }
+  }
+
+  // После создания, правки и удаления — только изменения, а не весь список
+  async function syncNotes() {
+    if (!syncing) {
+      syncing = pullChanges()
+        .then(changed => {
+          saveLocal();
+          if (changed) resetList();
+        })
+        .catch(err => console.warn("Синхронизация заметок не удалась:", err))
+        .finally(() => { syncing = null; });
+    }
+    return syncing;
+  }
+
+  // 📄 В DOM заметки попадают порциями: следующая — когда низ списка показался на экране
+  const PAGE_SIZE = 30;
+  let shown = 0;
+
+  const sentinel = document.createElement("div");
+  sentinel.className = "notes-sentinel";
+  notesList.after(sentinel);
+
+  function resetList() {
+    notesList.innerHTML = "";
+    shown = 0;
+    renderNotes([]);
+    showMoreNotes();
+  }
+
+  function showMoreNotes() {
+    if (shown >= notes.length) return;
+    const page = notes.slice(shown, shown + PAGE_SIZE);
+    shown += page.length;
+    renderNotes(page);
+    fillViewport();
+  }
+
+  // Observer срабатывает только при смене видимости — короткую порцию догружаем сами
+  function fillViewport() {
+    if (shown < notes.length && sentinel.getBoundingClientRect().top < window.innerHeight + 200) {
+      showMoreNotes();
+    }
+  }
+
+  new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) showMoreNotes();
+  }, { rootMargin: "200px" }).observe(sentinel);
+
+  // ✏️ Изменения уходят пакетом в /api/notes/batch. Без сети операции копятся
+  // в localStorage — отдельно для каждого пользователя — и отправляются,
+  // когда связь вернётся. Очередь удаляется только после ответа 200.
+  const USER_KEY = "notesUserId";
+  const BATCH_MAX = 500;  // NOTES_BATCH_MAX на сервере
+  let userId = localStorage.getItem(USER_KEY);
+
+  function pendingKey() {
+    return `pendingNoteOps:${userId}`;
+  }
+
+  function pendingOps() {
+    if (!userId) return [];
+    try {
+      return JSON.parse(localStorage.getItem(pendingKey())) || [];
+    } catch {
+      return [];
+    }
+  }
+
+  function savePending(ops) {
+    if (ops.length) localStorage.setItem(pendingKey(), JSON.stringify(ops));
+    else localStorage.removeItem(pendingKey());
+  }
+
+  // Кто вошёл: очередь и копия заметок другого пользователя на этом устройстве удаляются
+  async function checkUser() {
+    let res;
+    try {
+      res = await fetch("/api/me");
+    } catch {
+      return true;  // без сети работаем с последним пользователем
+    }
+    if (res.status === 401) {
+      askLogin();
+      return false;
+    }
+    if (!res.ok) return true;
+    const me = await res.json();
+    if (String(me.id) !== userId) {
+      if (userId) {
+        localStorage.removeItem(pendingKey());
+        localStorage.removeItem(localKey());
+      }
+      // старые общие ключи без владельца
+      localStorage.removeItem("pendingNoteOps");
+      localStorage.removeItem(LOCAL_KEY);
+      userId = String(me.id);
+      localStorage.setItem(USER_KEY, userId);
+      notes = [];
+      syncToken = null;
+      loadLocal();
+      resetList();
+    }
+    return true;
+  }
+
+  let loginAsked = false;
+  function askLogin() {
+    if (loginAsked) return;
+    loginAsked = true;
+    if (confirm("Сессия истекла. Несохранённые изменения останутся на устройстве. Войти снова?")) {
+      window.location.href = "/html-static/welcome.html";
+    }
+  }
+
+  async function sendOps(ops) {
+    let queued = pendingOps().concat(ops);
+    savePending(queued);
+    while (queued.length) {
+      const chunk = queued.slice(0, BATCH_MAX);
+      let res;
+      try {
+        res = await fetch("/api/notes/batch", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ operations: chunk }),
+        });
+      } catch (err) {
+        console.warn("Нет связи, изменения сохранены до подключения:", err);
+        return;
+      }
+      if (!res.ok) {
+        // 4xx/5xx: очередь остаётся до следующей попытки
+        if (res.status === 401) askLogin();
+        else console.warn(`Изменения не приняты (HTTP ${res.status}), сохранены на устройстве`);
+        return;
+      }
+      // 200: пакет принят целиком. Отдельные операции с ошибкой (битый id и т.п.)
+      // не повторяются — повтор дал бы ту же ошибку
+      const { results = [] } = await res.json().catch(() => ({}));
+      results.forEach((result, i) => {
+        if (result && result.status === "error") console.warn("Операция отклонена:", chunk[i], result.error);
+      });
+      queued = queued.slice(chunk.length);
+      savePending(queued);
+    }
+  }
+
+  async function createNote(title, text, icon) {
+    await sendOps([{ op: "create", title, text, icon }]);
+    await syncNotes();
   }
 
   async function updateNote(id, title, text, icon) {
-    await fetch(`/api/notes/update/${id}`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ title, text, icon }),
-    });
-    await fetchNotes();
+    await sendOps([{ op: "update", id, title, text, icon }]);
+    await syncNotes();
   }
 
   async function deleteNote(id) {
-    await fetch(`/api/notes/delete/${id}`, { method: "POST" });
-    await fetchNotes();
+    await sendOps([{ op: "delete", id }]);
+    await syncNotes();
   }
 
-  // 📝 Рендер заметок
-  function renderNotes() {
-    notesList.innerHTML = "";
+  window.addEventListener("online", async () => {
+    if (pendingOps().length) {
+      await sendOps([]);
+      await syncNotes();
+    }
+  });
+
+  // 📝 Рендер заметок: дописывает в список только новую порцию
+  function renderNotes(page) {
     if (notes.length === 0) {
       emptyMessage.style.display = "block";
     } else {
       emptyMessage.style.display = "none";
-      notes.forEach(note => {
+      page.forEach(note => {
         const div = document.createElement("div");
         div.className = "note-tile";
         div.innerHTML = `
@@ -149,5 +361,14 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
-  fetchNotes();
+  loadLocal();
+  resetList();
+  checkUser().then(ok => {
+    if (!ok) return;
+    if (pendingOps().length && navigator.onLine) {
+      sendOps([]).then(syncNotes);
+    } else {
+      syncNotes();
+    }
+  });
 });
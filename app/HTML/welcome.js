@@ -80,14 +80,20 @@ if (form) {
       group: form.group.value
     };
 
+    // Пароль уходит только на сервер и в localStorage не попадает
     localStorage.setItem('student', JSON.stringify(data));
 
     try {
-      await fetch('/api/register', {
+      const res = await fetch('/api/register', {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify(data)
+        body: JSON.stringify({ ...data, password: form.password.value })
       });
+      if (!res.ok) {
+        const body = await res.json().catch(() => ({}));
+        alert(body.error || 'Не удалось зарегистрироваться');
+        return;
+      }
     } catch (err) {
       console.error('Ошибка регистрации:', err);
     }
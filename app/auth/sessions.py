@@ -0,0 +1,228 @@
+# app/auth/sessions.py
+import os
+import time
+import hmac
+import hashlib
+import secrets
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models import User, SessionToken
+
+# 🔑 Сессии по токену: токен выдаётся при регистрации или входе и приходит
+# в cookie или в заголовке Authorization: Bearer. Токен -> пользователь
+# ищется через кэш в памяти, так что частые запросы не ходят в базу.
+
+SESSION_COOKIE = "session"
+SESSION_TTL_DAYS = int(os.environ.get("SESSION_TTL_DAYS", "30"))
+# Сколько секунд держим пользователя в кэше и сколько записей максимум
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+# Истёкшие токены удаляются из базы не чаще раза в столько секунд
+TOKEN_PURGE_INTERVAL = float(os.environ.get("TOKEN_PURGE_INTERVAL", "3600"))
+PASSWORD_ITERATIONS = 200_000
+PASSWORD_MIN_LENGTH = 6
+
+
+class Principal:
+    """
+    Текущий пользователь без привязки к сессии SQLAlchemy: те же id,
+    username и group, что у User, поэтому его можно хранить в кэше.
+    """
+    __slots__ = ("id", "username", "group")
+
+    def __init__(self, id, username, group):
+        self.id = id
+        self.username = username
+        self.group = group
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.group)
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# 🔒 Пароль: pbkdf2_sha256$итерации$соль$хэш. Пользователи, созданные до
+# паролей, хранят "local": первый вход или повторная регистрация задаёт им
+# пароль (claim_password), дальше — как у всех. Хэширование занимает
+# ~100 мс процессора — обработчики вызывают его через asyncio.to_thread.
+LEGACY_PASSWORD = "local"
+
+def hash_password(password):
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), PASSWORD_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_ITERATIONS}${salt}${digest.hex()}"
+
+
+def verify_password(password, stored):
+    try:
+        scheme, iterations, salt, expected = (stored or "").split("$")
+    except ValueError:
+        return False
+    if scheme != "pbkdf2_sha256" or not password:
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def has_password(user):
+    return bool(user.password_hash) and user.password_hash != LEGACY_PASSWORD
+
+
+def claim_password(db: Session, user_id, password_hash):
+    """
+    Задаёт пароль аккаунту без пароля. Условный UPDATE: из двух
+    одновременных попыток пароль задаст только первая — True для неё.
+    """
+    claimed = (
+        db.query(User)
+        .filter(User.id == user_id, or_(User.password_hash == LEGACY_PASSWORD, User.password_hash.is_(None)))
+        .update({User.password_hash: password_hash}, synchronize_session=False)
+    )
+    db.commit()
+    return claimed == 1
+
+
+class PrincipalCache:
+    """LRU токен -> Principal с временем жизни записи; ключ — хэш токена."""
+
+    def __init__(self, ttl=PRINCIPAL_CACHE_TTL, max_size=PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # хэш -> (Principal, когда истекает)
+        self._by_user = {}             # user_id -> {хэши} для сброса по пользователю
+
+    def get(self, token_hash):
+        entry = self._entries.get(token_hash)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._drop(token_hash)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token_hash)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, token_hash, principal, expires_at=None):
+        """expires_at — когда истекает сам токен (datetime UTC): запись не переживёт его."""
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        self._drop(token_hash)
+        self._entries[token_hash] = (principal, time.monotonic() + ttl)
+        self._by_user.setdefault(principal.id, set()).add(token_hash)
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, token_hash):
+        entry = self._entries.pop(token_hash, None)
+        if entry is not None:
+            hashes = self._by_user.get(entry[0].id)
+            if hashes is not None:
+                hashes.discard(token_hash)
+                if not hashes:
+                    del self._by_user[entry[0].id]
+
+    def invalidate_token(self, token_hash):
+        self._drop(token_hash)
+
+    def invalidate_user(self, user_id):
+        for token_hash in list(self._by_user.get(user_id, ())):
+            self._drop(token_hash)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+principal_cache = PrincipalCache()
+
+
+def token_from_request(request):
+    """Токен из заголовка Authorization: Bearer, иначе из cookie."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials.strip():
+        return credentials.strip()
+    return request.cookies.get(SESSION_COOKIE)
+
+
+_last_purge = 0.0
+
+
+def purge_expired_tokens(db: Session, force=False):
+    """Удаляет истёкшие сессии (не чаще TOKEN_PURGE_INTERVAL). Возвращает число удалённых."""
+    global _last_purge
+    if not force and time.monotonic() - _last_purge < TOKEN_PURGE_INTERVAL:
+        return 0
+    _last_purge = time.monotonic()
+    deleted = (
+        db.query(SessionToken)
+        .filter(SessionToken.expires_at <= datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def issue_token(db: Session, user):
+    """Новая сессия пользователя. Возвращает (токен, когда истекает)."""
+    purge_expired_tokens(db)
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.utcnow() + timedelta(days=SESSION_TTL_DAYS)
+    db.add(SessionToken(token_hash=hash_token(token), user_id=user.id, expires_at=expires_at))
+    db.commit()
+    principal_cache.put(hash_token(token), Principal.from_user(user), expires_at)
+    return token, expires_at
+
+
+def resolve_token(db: Session, token):
+    """Principal по токену или None. Из базы — только если токена нет в кэше."""
+    if not token:
+        return None
+    token_hash = hash_token(token)
+    principal = principal_cache.get(token_hash)
+    if principal is not None:
+        return principal
+
+    row = (
+        db.query(SessionToken.expires_at, User.id, User.username, User.group)
+        .join(User, User.id == SessionToken.user_id)
+        .filter(SessionToken.token_hash == token_hash)
+        .first()
+    )
+    if row is None or row.expires_at <= datetime.utcnow():
+        return None
+    principal = Principal(row.id, row.username, row.group)
+    principal_cache.put(token_hash, principal, row.expires_at)
+    return principal
+
+
+def revoke_token(db: Session, token):
+    token_hash = hash_token(token)
+    db.query(SessionToken).filter(SessionToken.token_hash == token_hash).delete(synchronize_session=False)
+    db.commit()
+    principal_cache.invalidate_token(token_hash)
+
+
+def set_user_group(db: Session, user, group):
+    """Меняет группу пользователя и сбрасывает его записи в кэше."""
+    if user.group == group:
+        return False
+    user.group = group
+    db.commit()
+    principal_cache.invalidate_user(user.id)
+    return True
@@ -1,19 +1,117 @@
-from sqlalchemy import create_engine
+import os
+import asyncio
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.search.fts import register_functions
+
 # 📌 Для SQLite используем файл app.db в корне
 DATABASE_URL = "sqlite:///./app.db"
 
-# connect_args нужен для SQLite
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+# 🗄 Профиль хранения: PRAGMA на каждом новом соединении (и Python, и
+# app/server.js). WAL — читатели не ждут писателя и наоборот; synchronous=NORMAL
+# в WAL не теряет целостность, fsync только на контрольных точках; mmap и
+# кэш страниц — чтение без лишних системных вызовов; busy_timeout — вместо
+# «database is locked» писатель ждёт свою очередь.
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", "16384"))  # на соединение
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", SQLITE_MMAP_SIZE),
+    ("cache_size", -SQLITE_CACHE_KB),  # отрицательное — в КиБ, а не в страницах
+    ("busy_timeout", SQLITE_BUSY_TIMEOUT_MS),
 )
 
+# Пул: соединения переиспользуются вместе с прогретым кэшем страниц.
+# Писатель в SQLite всё равно один, так что пул нужен читателям
+POOL_OPTIONS = {
+    "pool_size": int(os.environ.get("SQLITE_POOL_SIZE", "8")),
+    "max_overflow": int(os.environ.get("SQLITE_POOL_OVERFLOW", "8")),
+    "pool_timeout": float(os.environ.get("SQLITE_POOL_TIMEOUT", "30")),
+}
+
+
+def apply_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url, tuned=True):
+    """Синхронный engine для файла SQLite; tuned=False — без профиля (для бенчмарка)."""
+    new_engine = create_engine(url, connect_args={"check_same_thread": False}, **POOL_OPTIONS)
+    # Функции SQL, которые вызывают триггеры (индекс поиска заметок), — всегда
+    event.listen(new_engine, "connect", register_functions)
+    if tuned:
+        event.listen(new_engine, "connect", apply_pragmas)
+    return new_engine
+
+
+engine = create_sqlite_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# ⚡ Тот же файл через aiosqlite — для async-обработчиков FastAPI: запросы и
+# commit выполняются в потоке драйвера и не останавливают цикл событий.
+# Синхронный engine остаётся для миграций, фоновых задач и скриптов.
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./app.db"
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+event.listen(async_engine.sync_engine, "connect", register_functions)
+event.listen(async_engine.sync_engine, "connect", apply_pragmas)
+
+# expire_on_commit=False: после commit объекты читаются без нового запроса —
+# ленивая загрузка вне run_sync в async-сессии невозможна
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# SQLite пишет только одним соединением за раз: записи из async-обработчиков
+# встают в очередь здесь, а не крутятся в ожидании блокировки файла
+async_write_lock = asyncio.Lock()
+
 Base = declarative_base()
 
 def init_db():
-    from app.models import User, Note, Event  # импортируем модели перед созданием таблиц
+    from app.models import User, SessionToken, Note, Event, ScheduleSource, ExcelLesson, Replacement  # импортируем модели перед созданием таблиц
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_indexes()
+    from app.notes.sync import ensure_note_sync
+    ensure_note_sync(engine)
+    from app.search.fts import ensure_fts
+    ensure_fts(engine)
+
+def ensure_indexes():
+    # create_all не добавляет новые индексы в уже существующие таблицы — создаём недостающие
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def ensure_columns():
+    """
+    Миграция при старте: колонки, добавленные в модели после создания
+    таблицы, добавляются через ALTER TABLE ADD COLUMN. Новые колонки
+    должны допускать NULL (или иметь server_default) — так их можно
+    добавить к таблице с данными.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}{default}'))
+                print(f"🛠 {table.name}: добавлена колонка {column.name}")
@@ -0,0 +1,142 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import Note
+from app.notes import notes as notes_service
+from app.notes.sync import ensure_note_sync
+from app.search.fts import ensure_fts
+
+# 🗄 Бенчмарк профиля хранения SQLite: одновременные читатели (лента заметок)
+# и писатели (создание и отметка «выполнено») на одной базе — сначала с
+# настройками по умолчанию (журнал отката, без PRAGMA), затем с профилем из
+# app/database.py. Код запросов — тот же, что в обработчиках; каждый
+# читатель и писатель — отдельный процесс.
+# Запуск из корня проекта:
+#   python -m app.db_benchmark                              # 8 читателей, 2 писателя, по 5 с
+#   python -m app.db_benchmark --readers 16 --writers 4 --seconds 10
+
+PROFILES = ("default", "tuned")
+
+
+def seed(engine, users, notes_per_user):
+    Base.metadata.create_all(bind=engine)
+    ensure_note_sync(engine)
+    ensure_fts(engine)
+    db = sessionmaker(bind=engine)()
+    rows = [
+        {"text": f"Заметка {i}\nтекст", "note_datetime": None, "repeat": "none", "done": False, "user_id": user_id}
+        for user_id in range(1, users + 1) for i in range(notes_per_user)
+    ]
+    db.bulk_insert_mappings(Note, rows)
+    db.commit()
+    db.close()
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def worker(role, n, url, tuned, users, seconds, ready, go, results):
+    """
+    Отдельный процесс со своим engine — как uvicorn, app/server.js и фоновые
+    задачи: так меряются блокировки файла SQLite, а не GIL одного процесса.
+    """
+    engine = create_sqlite_engine(url, tuned=tuned)
+    db = sessionmaker(autoflush=False, bind=engine)()
+    rnd = random.Random(n)
+    latencies, locked = [], 0
+    ready.put(n)
+    go.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = rnd.randint(1, users)
+        started = time.perf_counter()
+        try:
+            if role == "read":
+                notes_service.get_notes_page(db, user_id, 30)
+                db.rollback()  # конец транзакции чтения, как при закрытии сессии запроса
+            else:
+                note = notes_service.create_note(db, user_id, "Новая заметка\nиз бенчмарка")
+                notes_service.mark_note_as_done(db, note.id, user_id)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            # database is locked: busy_timeout истёк
+            db.rollback()
+            locked += 1
+    db.close()
+    engine.dispose()
+    results.put((role, latencies, locked))
+
+
+def run_profile(profile, readers, writers, seconds, users, notes_per_user):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        tuned = profile == "tuned"
+        engine = create_sqlite_engine(url, tuned=tuned)
+        seed(engine, users, notes_per_user)
+        engine.dispose()
+
+        ready, results, go = context.Queue(), context.Queue(), context.Event()
+        roles = ["read"] * readers + ["write"] * writers
+        processes = [
+            context.Process(target=worker, args=(role, n, url, tuned, users, seconds, ready, go, results))
+            for n, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+        go.set()
+        stats = {"read": [], "write": [], "locked": 0}
+        for _ in processes:
+            role, latencies, locked = results.get()
+            stats[role].extend(latencies)
+            stats["locked"] += locked
+        for process in processes:
+            process.join()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": len(stats["read"]) / seconds,
+        "writes_per_sec": len(stats["write"]) / seconds,
+        "read_p99": percentile(stats["read"], 0.99),
+        "write_p99": percentile(stats["write"], 0.99),
+        "locked": stats["locked"],
+    }
+
+
+def report(result):
+    ms = 1000
+    print(f"{result['profile']:>7}: чтений {result['reads_per_sec']:8.1f}/с (p99 {result['read_p99'] * ms:6.1f} мс), "
+          f"записей {result['writes_per_sec']:7.1f}/с (p99 {result['write_p99'] * ms:6.1f} мс), "
+          f"database is locked: {result['locked']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк чтения и записи SQLite: по умолчанию против профиля")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--notes", type=int, default=100, help="заметок на пользователя")
+    args = parser.parse_args()
+
+    results = {}
+    for profile in PROFILES:
+        results[profile] = run_profile(profile, args.readers, args.writers, args.seconds, args.users, args.notes)
+        report(results[profile])
+    before, after = results["default"], results["tuned"]
+    print(f"⚡ профиль: чтение {after['reads_per_sec'] / max(before['reads_per_sec'], 1e-9):.2f}×, "
+          f"запись {after['writes_per_sec'] / max(before['writes_per_sec'], 1e-9):.2f}×")
@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+# 🏋️ Нагрузочный тест API заметок и регистрации: одновременные клиенты
+# гоняют смесь запросов через ASGI (без сети), а отдельная задача меряет,
+# на сколько запаздывает цикл событий — столько ждут все остальные запросы.
+# Режимы:
+#   async — обработчики как есть: AsyncSession (aiosqlite), база в потоке драйвера;
+#   sync  — как до неё: те же вызовы сервисов на синхронной Session прямо в цикле.
+# Каждый режим идёт в отдельном процессе со своей пустой базой во временной папке.
+# Запуск из корня проекта:
+#   python -m app.load_test                          # оба режима и сравнение
+#   python -m app.load_test --mode async --clients 50 --requests 2000
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "нагрузка"
+
+# Доли запросов: чтение ленты, создание, пакет, синхронизация, вход
+MIX = (
+    ("list", 0.55),
+    ("create", 0.25),
+    ("batch", 0.1),
+    ("changes", 0.05),
+    ("login", 0.05),
+)
+
+
+class BlockingSession:
+    """
+    Синхронная Session с интерфейсом AsyncSession, который используют
+    обработчики: так режим sync повторяет старую схему, где запрос к SQLite
+    выполнялся прямо в цикле событий.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.db, *args, **kwargs)
+
+    async def scalar(self, statement):
+        return self.db.scalar(statement)
+
+    def add(self, instance):
+        self.db.add(instance)
+
+    async def commit(self):
+        self.db.commit()
+
+    async def refresh(self, instance):
+        self.db.refresh(instance)
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def probe_loop(stop, lags, interval=0.005):
+    # Насколько позже срока просыпается sleep — время, когда цикл был занят
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_load(mode, clients, total, seed=0):
+    from httpx import AsyncClient, ASGITransport
+    from app import main
+
+    if mode == "sync":
+        def blocking_db():
+            db = main.SessionLocal()
+            try:
+                yield BlockingSession(db)
+            finally:
+                db.close()
+        main.app.dependency_overrides[main.get_async_db] = blocking_db
+
+    rnd = random.Random(seed)
+    transport = ASGITransport(app=main.app)
+    latencies = {kind: [] for kind, _ in MIX}
+    errors = 0
+
+    async with AsyncClient(transport=transport, base_url="http://load") as client:
+        # У каждого клиента свой пользователь и токен
+        tokens = []
+        for i in range(clients):
+            r = await client.post("/api/register", json={
+                "firstName": "Нагрузка", "lastName": f"{mode}{i}", "course": "2", "group": "РС01-24",
+                "password": PASSWORD
+            })
+            tokens.append(r.json()["token"])
+
+        kinds = [kind for kind, _ in MIX]
+        weights = [share for _, share in MIX]
+        plan = rnd.choices(kinds, weights, k=total)
+        queue = asyncio.Queue()
+        for kind in plan:
+            queue.put_nowait(kind)
+
+        async def worker(i):
+            nonlocal errors
+            headers = {"Authorization": f"Bearer {tokens[i]}"}
+            sync_token = None
+            own = []
+            while not queue.empty():
+                kind = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    r = await send(kind, i, headers, own, sync_token)
+                except Exception as e:
+                    # например, TimeoutError пула соединений
+                    print(f"⚠️ {kind}: {e!r}", file=sys.stderr)
+                    errors += 1
+                    continue
+                latencies[kind].append(time.perf_counter() - started)
+                if r.status_code != 200:
+                    errors += 1
+                elif kind == "create":
+                    own.append(r.json()["id"])
+                elif kind == "changes":
+                    sync_token = r.json()["token"]
+
+        async def send(kind, i, headers, own, sync_token):
+            if kind == "list":
+                return await client.get("/api/notes", params={"limit": 30}, headers=headers)
+            if kind == "create":
+                return await client.post("/api/notes/create", headers=headers, json={
+                    "title": "Лаба", "text": "сдать отчёт", "datetime": "2030-01-01T10:00"
+                })
+            if kind == "batch":
+                ops = [{"op": "create", "text": "из пакета"}]
+                if own:
+                    ops.append({"op": "done", "id": own[-1]})
+                return await client.post("/api/notes/batch", headers=headers, json={"operations": ops})
+            if kind == "changes":
+                params = {"since": sync_token} if sync_token else {}
+                return await client.get("/api/notes/changes", params=params, headers=headers)
+            return await client.post("/api/login", json={"username": f"Нагрузка {mode}{i}", "password": PASSWORD})
+
+        stop = asyncio.Event()
+        lags = []
+        probe = asyncio.create_task(probe_loop(stop, lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "mode": mode,
+        "clients": clients,
+        "requests": total,
+        "errors": errors,
+        "wall": wall,
+        "rps": total / wall,
+        "p50": percentile(all_latencies, 0.5),
+        "p99": percentile(all_latencies, 0.99),
+        "by_kind": {kind: {"p50": percentile(v, 0.5), "p99": percentile(v, 0.99)} for kind, v in latencies.items()},
+        "loop_lag_p99": percentile(lags, 0.99),
+        "loop_lag_max": max(lags, default=0.0),
+    }
+
+
+def run_in_subprocess(mode, args):
+    # Чистая база на каждый режим: приложение открывает ./app.db в текущей папке
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PYTHONPATH=str(PROJECT_DIR) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        output = subprocess.run(
+            [sys.executable, "-m", "app.load_test", "--mode", mode, "--json",
+             "--clients", str(args.clients), "--requests", str(args.requests)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(result):
+    ms = 1000
+    print(f"{result['mode']:>5}: {result['rps']:7.1f} запр/с, p50 {result['p50'] * ms:6.1f} мс, "
+          f"p99 {result['p99'] * ms:6.1f} мс, цикл занят до {result['loop_lag_max'] * ms:6.1f} мс "
+          f"(p99 {result['loop_lag_p99'] * ms:.1f}), ошибок {result['errors']}")
+    for kind, values in result["by_kind"].items():
+        print(f"       {kind:<8} p50 {values['p50'] * ms:6.1f} мс  p99 {values['p99'] * ms:6.1f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API заметок: AsyncSession против синхронной Session")
+    parser.add_argument("--mode", choices=("async", "sync", "both"), default="both")
+    # Больше 15 (5 + 10 соединений пула) режим sync не выдерживает: пока цикл
+    # ждёт свободное соединение, сессии других запросов не могут закрыться
+    parser.add_argument("--clients", type=int, default=10, help="одновременных клиентов")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="одна строка JSON с результатом")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        results = [run_in_subprocess(mode, args) for mode in ("sync", "async")]
+        for result in results:
+            report(result)
+        before, after = results
+        print(f"⚡ async/sync: {after['rps'] / before['rps']:.2f}× запросов в секунду, "
+              f"p50 {before['p50'] / max(after['p50'], 1e-9):.2f}× ниже, "
+              f"p50 чтения ленты {before['by_kind']['list']['p50'] / max(after['by_kind']['list']['p50'], 1e-9):.2f}× ниже, "
+              f"p99 задержки цикла {before['loop_lag_p99'] / max(after['loop_lag_p99'], 1e-9):.1f}× меньше")
+    else:
+        import contextlib
+        # print() приложения ([REGISTER] и т.п.) — в stderr, чтобы stdout оставался JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = asyncio.run(run_load(args.mode, args.clients, args.requests))
+        if args.json:
+            print(json.dumps(result))
+        else:
+            report(result)
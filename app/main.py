@@ -1,39 +1,57 @@
-from fastapi import FastAPI, Request, Form, UploadFile, Depends
+from fastapi import FastAPI, Request, Response, Form, UploadFile, Depends, Query
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from collections import OrderedDict
+from contextlib import asynccontextmanager
 import os, sys
+import asyncio
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # 📦 Импортируем БД и модели
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, AsyncSessionLocal, async_write_lock, init_db
 from app import models
 from app.models import User
 
 # 📦 Импорты модулей
 sys.path.append(str(Path(__file__).resolve().parent / "schedule"))
-from app.schedule.excel_scraper import get_excel_schedule
-from app.schedule.doc_scraper import (
-    has_docx_url_changed,
-    fetch_latest_docx_url,
-    get_docx_schedule,
-    get_available_replacement_days
-)
-from app.schedule.schedule_merger import merge_schedules, normalize_day
+from app.schedule.doc_scraper import get_available_replacement_days
+from app.schedule.schedule_merger import normalize_day
+from app.schedule.refresher import schedule_refresher
+from app.schedule.page_cache import schedule_page_cache, conditional_response, dump_json
 from app.grades.calculator import GradeTracker
 from app.sumarizer.compressor import summarize_text, read_txt, read_docx, save_docx
 from app.notes import notes as notes_service
+from app.notes import sync as note_sync
+from app.notes.reminders import reminder_scheduler
+from app.auth import sessions
+from app.search import fts
 
 # 📁 Базовые настройки
 BASE_DIR = Path(__file__).resolve().parent
 HTML_DIR = BASE_DIR / "HTML"
+API_SCHEDULE_MAX_DAYS = 31
 
-app = FastAPI(debug=True)
-models.Base.metadata.create_all(bind=engine)
+
+# 🔄 Фоновое обновление расписания и напоминания живут столько же, сколько приложение
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    schedule_refresher.start()
+    reminder_scheduler.start()
+    yield
+    await reminder_scheduler.stop()
+    await schedule_refresher.stop()
+
+
+app = FastAPI(debug=True, lifespan=lifespan)
+# 🗜 Сжатие ответов: JSON расписания и HTML заметно ужимаются
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+init_db()
 
 # 📁 Статика и шаблоны
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
@@ -43,13 +61,17 @@ templates = Jinja2Templates(directory=HTML_DIR)
 tracker = GradeTracker()
 
 
-# 📌 Зависимость для БД
-def get_db():
-    db = SessionLocal()
-    try:
+# ⚡ Асинхронная сессия (aiosqlite): обработчик ждёт базу, не блокируя цикл
+# событий. Синхронный код сервисов вызывается через await db.run_sync(...)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def run_write(db: AsyncSession, fn, *args, **kwargs):
+    # Изменения — по одному: см. async_write_lock в app/database.py
+    async with async_write_lock:
+        return await db.run_sync(fn, *args, **kwargs)
 
 
 # 📌 Главная страница → редирект на /admin-login
@@ -58,29 +80,41 @@ async def index():
     return RedirectResponse("/admin-login")
 
 
-# 📌 Временный способ получения текущего пользователя
-def get_current_user(db: Session):
+# 🔑 Текущий пользователь по токену сессии (cookie или Authorization: Bearer)
+async def get_current_user(request: Request, db: AsyncSession):
     """
-    Пока нет полноценной авторизации — возвращаем пользователя с id=1.
-    В дальнейшем заменить на полноценную проверку по сессии / токену.
+    Principal (id, username, group) или None, если токена нет или он истёк.
+    Повторные запросы с тем же токеном обслуживаются из кэша без обращения к базе.
     """
-    return db.query(User).filter(User.id == 1).first()
-
+    token = sessions.token_from_request(request)
+    if not token:
+        return None
+    return await db.run_sync(sessions.resolve_token, token)
+
+
+async def start_session(response: Response, db: AsyncSession, user):
+    # Токен — и в теле (для Bearer), и в httponly cookie (для страниц)
+    token, expires_at = await run_write(db, sessions.issue_token, user)
+    response.set_cookie(
+        sessions.SESSION_COOKIE, token,
+        max_age=sessions.SESSION_TTL_DAYS * 24 * 3600, httponly=True, samesite="lax"
+    )
+    return {"token": token, "expires_at": expires_at.isoformat()}
 
-# 📅 Страница расписания
-@app.get("/schedule")
-async def schedule_page(request: Request, db: Session = Depends(get_db)):
-    EXCEL_URL = "http://www.bobruisk.belstu.by/uploads/b1/s/8/648/basic/117/614/Raspisanie_uchebnyih_zanyatiy_na_2025-2026_uch.god_1_semestr.xlsx?t=1756801696"
-    DOC_PAGE_URL = "http://www.bobruisk.belstu.by/dnevnoe-otdelenie/raspisanie-zanyatiy-i-zvonkov-zamenyi"
 
-    # 🧠 Получаем группу пользователя (пока временно user_id = 1)
-    user = get_current_user(db)
+def get_user_group(user):
     # user.group имеет формат "2 курс, РС02-24" — берём последнюю часть
     if user and user.group:
         # защитно: если нет запятой, оставляем как есть
-        MY_GROUP = user.group.split(",")[-1].strip()
-    else:
-        MY_GROUP = "РС02-24"  # fallback
+        return user.group.split(",")[-1].strip()
+    return "РС02-24"  # fallback
+
+
+# 📅 Страница расписания
+@app.get("/schedule")
+async def schedule_page(request: Request, format: str = "html", db: AsyncSession = Depends(get_async_db)):
+    # 🧠 Получаем группу пользователя (пока временно user_id = 1)
+    MY_GROUP = get_user_group(await get_current_user(request, db))
 
     weekday_map_eng_to_rus = {
         "Monday": "Понедельник",
@@ -92,35 +126,28 @@ async def schedule_page(request: Request, db: Session = Depends(get_db)):
         "Sunday": "Воскресенье"
     }
 
-    excel_schedule = get_excel_schedule(EXCEL_URL, MY_GROUP)
-    if not excel_schedule or not excel_schedule.get("schedule"):
+    # Всё скачивание и разбор — в фоне (app/schedule/refresher.py), здесь только чтение снимка.
+    # Устаревший снимок отдаётся сразу, а обновление запускается в фоне (одно на всех)
+    schedule_refresher.revalidate_if_stale()
+    snapshot = schedule_refresher.snapshot
+    if snapshot is None:
         return templates.TemplateResponse("schedule.html", {
             "request": request,
             "schedule_by_day": {
-                "Ошибка": [{"comment": f"Ошибка загрузки расписания для группы {MY_GROUP}."}]
+                "Расписание": [{"comment": "Расписание загружается, обновите страницу через минуту."}]
             }
         })
 
-    DOCX_URL = None
-    doc_schedule = {"group": MY_GROUP, "schedule": []}
-    doc_updated_status = False
-
-    try:
-        DOCX_URL = fetch_latest_docx_url(DOC_PAGE_URL)
-    except Exception as e:
-        # логируем, но не падаем
-        print("Ошибка при получении ссылки на DOCX:", e)
-        DOCX_URL = None
+    group_data = snapshot.get_group(MY_GROUP)
+    if not group_data:
+        return templates.TemplateResponse("schedule.html", {
+            "request": request,
+            "schedule_by_day": {
+                "Ошибка": [{"comment": f"Ошибка загрузки расписания для группы {MY_GROUP}."}]
+            }
+        })
 
-    if DOCX_URL:
-        try:
-            doc_updated_status = has_docx_url_changed(DOCX_URL)
-            temp_doc_schedule = get_docx_schedule(MY_GROUP, DOC_PAGE_URL, doc_updated_status)
-            if temp_doc_schedule and temp_doc_schedule.get("schedule") is not None:
-                doc_schedule = temp_doc_schedule
-        except Exception as e:
-            print("Ошибка при разборе DOCX:", e)
-            doc_schedule = {"group": MY_GROUP, "schedule": []}
+    doc_schedule = group_data["doc_schedule"]
 
     now = datetime.now()
     today_rus = weekday_map_eng_to_rus[now.strftime("%A")]
@@ -138,36 +165,104 @@ async def schedule_page(request: Request, db: Session = Depends(get_db)):
     else:
         target_days = ["Суббота", "Понедельник"] if today_rus == "Суббота" else [tomorrow_rus]
 
+    # Готовый ответ живёт, пока не сменится день, книга или замены этой группы.
+    # Время обновления — в заголовках; в тело и ключ оно попадает, только пока
+    # снимок устарел (тогда fresh_at не меняется), иначе каждое фоновое
+    # обновление меняло бы ETag всех страниц
+    format = "json" if format == "json" else "html"
+    stale = schedule_refresher.is_stale(snapshot)
+    updated_at = datetime.fromtimestamp(snapshot.fresh_at).strftime("%d.%m %H:%M") if stale else None
+    freshness_headers = {
+        "X-Schedule-Updated-At": datetime.fromtimestamp(snapshot.fresh_at).isoformat(timespec="seconds"),
+        "X-Schedule-Stale": "1" if stale else "0"
+    }
+    cache_key = (
+        MY_GROUP, tuple(target_days), snapshot.excel_version, snapshot.replacements_version(MY_GROUP),
+        updated_at, format
+    )
+    page = schedule_page_cache.get(cache_key)
+    if page is not None:
+        return conditional_response(request, page, freshness_headers)
+
     schedule_by_day = OrderedDict()
     for target_day in target_days:
-        filtered = {
-            "group": excel_schedule["group"],
-            "schedule": [
-                p for p in excel_schedule["schedule"]
-                if (p.get("day") or "").strip().lower() == target_day.strip().lower()
-            ]
-        }
-
-        doc_schedule_for_target_day = {
-            "group": doc_schedule.get("group", MY_GROUP),
-            "schedule": [
-                p for p in doc_schedule.get("schedule", [])
-                if (p.get("day") or "").strip().lower() == target_day.strip().lower()
-            ]
-        }
-
-        final_schedule = merge_schedules(filtered, doc_schedule_for_target_day)
-        schedule_by_day[target_day] = final_schedule.get("schedule", [])
+        schedule_by_day[target_day] = group_data["days"].get(target_day.strip().lower(), [])
 
     if not any(schedule_by_day.values()):
         schedule_by_day = {
             ", ".join(target_days): [{"comment": f"Нет пар на {', '.join(target_days)}."}]
         }
 
-    return templates.TemplateResponse("schedule.html", {
-        "request": request,
-        "schedule_by_day": schedule_by_day,
-        "group": MY_GROUP
+    if format == "json":
+        payload = {"group": MY_GROUP, "schedule_by_day": schedule_by_day, "stale": stale}
+        if stale:
+            payload["updated_at"] = snapshot.fresh_at
+        body = dump_json(payload)
+        page = schedule_page_cache.put(cache_key, body, "application/json")
+    else:
+        # Рендер напрямую через окружение Jinja — шаблону request не нужен
+        html = templates.env.get_template("schedule.html").render(
+            schedule_by_day=schedule_by_day, group=MY_GROUP, updated_at=updated_at, stale=stale
+        )
+        page = schedule_page_cache.put(cache_key, html.encode("utf-8"), "text/html; charset=utf-8")
+    return conditional_response(request, page, freshness_headers)
+
+
+# 📈 Состояние фонового обновления: версии источников и время стадий загрузки
+@app.get("/api/schedule/status")
+async def api_schedule_status():
+    return {**schedule_refresher.status(), "page_cache": schedule_page_cache.stats()}
+
+
+# 📅 API расписания: объединённые пары группы по датам из готового снимка
+@app.get("/api/schedule")
+async def api_schedule(
+    request: Request,
+    group: str = None,
+    date_from: str = Query(None, alias="from"),
+    date_to: str = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not group:
+        group = get_user_group(await get_current_user(request, db))
+
+    try:
+        first = date.fromisoformat(date_from) if date_from else date.today()
+        last = date.fromisoformat(date_to) if date_to else first
+    except ValueError:
+        return JSONResponse({"error": "Даты ожидаются в формате ГГГГ-ММ-ДД"}, status_code=400)
+    if last < first or (last - first).days >= API_SCHEDULE_MAX_DAYS:
+        return JSONResponse({"error": f"Диапазон — от 1 до {API_SCHEDULE_MAX_DAYS} дней"}, status_code=400)
+
+    schedule_refresher.revalidate_if_stale()
+    snapshot = schedule_refresher.snapshot
+    if snapshot is None:
+        return JSONResponse({"error": "Расписание загружается"}, status_code=503, headers={"Retry-After": "30"})
+
+    cache_key = ("api", group, first, last, snapshot.excel_version, snapshot.docx_version)
+    page = schedule_page_cache.get(cache_key)
+    if page is None:
+        days = []
+        for offset in range((last - first).days + 1):
+            day = snapshot.get_dated_day(group, first + timedelta(days=offset))
+            if day is None:
+                return JSONResponse({"error": f"Группа {group} не найдена"}, status_code=404)
+            days.append(day)
+
+        body = dump_json({
+            "group": group,
+            "from": first.isoformat(),
+            "to": last.isoformat(),
+            "excel_version": snapshot.excel_version,
+            "docx_version": snapshot.docx_version,
+            "built_at": snapshot.built_at,
+            "days": days
+        })
+        page = schedule_page_cache.put(cache_key, body, "application/json")
+    # Свежесть — в заголовках: тело и ETag зависят только от версий источников
+    return conditional_response(request, page, {
+        "X-Schedule-Updated-At": datetime.fromtimestamp(snapshot.fresh_at).isoformat(timespec="seconds"),
+        "X-Schedule-Stale": "1" if schedule_refresher.is_stale(snapshot) else "0"
     })
 
 
@@ -191,94 +286,173 @@ async def student_page(request: Request):
 
 
 # 📝 API заметок (обновлено под JS)
+def serialize_note(n):
+    return {
+        "id": n.id,
+        "title": (n.text or "").split("\n")[0][:255],
+        "text": n.text,
+        "icon": n.icon or "📝",
+        "datetime": n.note_datetime,
+        "done": n.done,
+        "created_at": n.created_at.isoformat(),
+        "updated_at": n.updated_at.isoformat() if n.updated_at else None
+    }
+
+
 @app.get("/api/notes")
-async def api_get_notes(db: Session = Depends(get_db)):
-    # Пока используем user_id = 1; в будущем берем текущего аутентифицированного пользователя
-    user = get_current_user(db)
+async def api_get_notes(
+    request: Request,
+    limit: int = Query(notes_service.NOTES_PAGE_SIZE, ge=1, le=notes_service.NOTES_PAGE_MAX),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await get_current_user(request, db)
     if not user:
         return JSONResponse({"error": "not authenticated"}, status_code=401)
     user_id = user.id
 
-    notes = notes_service.get_all_notes(db, user_id)
-    return [
-        {
-            "id": n.id,
-            "title": (n.text or "").split("\n")[0][:255],
-            "text": n.text,
-            "icon": n.icon or "📝",
-            "datetime": n.note_datetime,
-            "done": n.done,
-            "created_at": n.created_at.isoformat()
-        }
+    # Страница за страницей: next_cursor передаётся обратно как cursor
+    try:
+        notes, next_cursor = await db.run_sync(notes_service.get_notes_page, user_id, limit, cursor)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"notes": [serialize_note(n) for n in notes], "next_cursor": next_cursor}
+
+
+# 🔄 Изменения заметок после токена since (см. app/notes/sync.py): клиент
+# держит локальную копию и забирает только изменённое и удалённое
+@app.get("/api/notes/changes")
+async def api_note_changes(
+    request: Request,
+    since: str = None,
+    limit: int = Query(note_sync.NOTES_CHANGES_SIZE, ge=1, le=note_sync.NOTES_CHANGES_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "not authenticated"}, status_code=401)
+
+    since_seq = 0
+    if since:
+        try:
+            token_user_id, since_seq = note_sync.decode_sync_token(since)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if token_user_id != user.id:
+            # копия другого пользователя — клиенту нужно начать заново
+            return JSONResponse({"error": "Токен другого пользователя", "reset": True}, status_code=410)
+
+    notes, last_seq, has_more = await db.run_sync(note_sync.get_changes, user.id, since_seq, limit)
+    changes = [
+        {"id": n.id, "deleted": True, "updated_at": n.updated_at.isoformat() if n.updated_at else None}
+        if n.deleted_at else {**serialize_note(n), "deleted": False}
         for n in notes
     ]
+    return {"changes": changes, "token": note_sync.encode_sync_token(user.id, last_seq), "has_more": has_more}
+
+
+# ⏰ Сработавшие напоминания текущего пользователя (после чтения очищаются)
+@app.get("/api/notes/reminders")
+async def api_note_reminders(request: Request, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "not authenticated"}, status_code=401)
+    return {"reminders": reminder_scheduler.take_fired(user.id)}
+
+
+# 🔍 Поиск по заметкам и событиям (SQLite FTS5, см. app/search/fts.py)
+@app.get("/api/notes/search")
+async def api_search_notes(
+    request: Request,
+    q: str = "",
+    limit: int = Query(fts.SEARCH_LIMIT, ge=1, le=fts.SEARCH_LIMIT_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "not authenticated"}, status_code=401)
+    if not fts.fts_enabled:
+        return JSONResponse({"error": "Поиск недоступен"}, status_code=503)
+    return {"query": q, "results": await db.run_sync(fts.search_notes, user.id, q, limit)}
+
+
+@app.get("/api/events/search")
+async def api_search_events(
+    q: str = "",
+    limit: int = Query(fts.SEARCH_LIMIT, ge=1, le=fts.SEARCH_LIMIT_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not fts.fts_enabled:
+        return JSONResponse({"error": "Поиск недоступен"}, status_code=503)
+    return {"query": q, "results": await db.run_sync(fts.search_events, q, limit)}
 
 
 @app.post("/api/notes/create")
-async def api_create_note(data: dict, db: Session = Depends(get_db)):
-    user = get_current_user(db)
+async def api_create_note(request: Request, data: dict, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
     if not user:
         return JSONResponse({"error": "not authenticated"}, status_code=401)
     user_id = user.id
 
     # Поддерживаем как text (полный текст) так и title+text
-    title = data.get("title")
-    text_field = data.get("text") or ""
-    if title:
-        text = f"{title}\n{text_field}"
-    else:
-        text = text_field or "(Без текста)"
-
-    note = notes_service.create_note(db, user_id, text=text, datetime_str=data.get("datetime"), repeat=data.get("repeat", "none"))
+    text = notes_service.compose_text(data)
+    note = await run_write(
+        db, notes_service.create_note, user_id, text=text, datetime_str=data.get("datetime"), repeat=data.get("repeat", "none")
+    )
     return {"status": "created", "id": note.id}
 
 
 @app.post("/api/notes/update/{note_id}")
-async def api_update_note(note_id: int, data: dict, db: Session = Depends(get_db)):
-    user = get_current_user(db)
+async def api_update_note(request: Request, note_id: int, data: dict, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
     if not user:
         return JSONResponse({"error": "not authenticated"}, status_code=401)
     user_id = user.id
 
-    text_field = data.get("text") or ""
-    title = data.get("title")
-    if title:
-        text = f"{title}\n{text_field}"
-    else:
-        text = text_field or "(Без текста)"
-
-    note = db.query(models.Note).filter(models.Note.id == note_id, models.Note.user_id == user_id).first()
+    note = await run_write(db, notes_service.update_note, note_id, user_id, data)
     if not note:
         return {"status": "not_found"}
-    note.text = text
-    note.icon = data.get("icon", note.icon)
-    note.note_datetime = data.get("datetime", note.note_datetime)
-    db.commit()
     return {"status": "updated"}
 
 
 @app.post("/api/notes/delete/{note_id}")
-async def api_delete_note(note_id: int, db: Session = Depends(get_db)):
-    user = get_current_user(db)
+async def api_delete_note(request: Request, note_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
     if not user:
         return JSONResponse({"error": "not authenticated"}, status_code=401)
     user_id = user.id
 
-    ok = notes_service.delete_note(db, note_id, user_id)
+    ok = await run_write(db, notes_service.delete_note, note_id, user_id)
     return {"status": "deleted" if ok else "not_found"}
 
 
 @app.post("/api/notes/done/{note_id}")
-async def api_mark_done(note_id: int, db: Session = Depends(get_db)):
-    user = get_current_user(db)
+async def api_mark_done(request: Request, note_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
     if not user:
         return JSONResponse({"error": "not authenticated"}, status_code=401)
     user_id = user.id
 
-    ok = notes_service.mark_note_as_done(db, note_id, user_id)
+    ok = await run_write(db, notes_service.mark_note_as_done, note_id, user_id)
     return {"status": "done" if ok else "not_found"}
 
 
+# 📦 Несколько изменений заметок одним запросом (например, накопленные офлайн)
+@app.post("/api/notes/batch")
+async def api_notes_batch(request: Request, data: dict, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "not authenticated"}, status_code=401)
+
+    operations = data.get("operations")
+    if not isinstance(operations, list):
+        return JSONResponse({"error": "Ожидается список operations"}, status_code=400)
+    if len(operations) > notes_service.NOTES_BATCH_MAX:
+        return JSONResponse({"error": f"Не больше {notes_service.NOTES_BATCH_MAX} операций за раз"}, status_code=413)
+
+    return {"results": await run_write(db, notes_service.apply_batch, user.id, operations)}
+
+
 # 📊 API оценок
 @app.get("/api/grades")
 async def get_grades():
@@ -331,31 +505,110 @@ async def compress(text: str = Form(None), filename: str = Form(...), file: Uplo
     return {"summary": summary, "file": str(saved_path)}
 
 
-# 👤 Регистрация
+# 👤 Регистрация: новый пользователь или повторная отправка формы тем же студентом
 @app.post("/api/register")
-async def register_user(data: dict, db: Session = Depends(get_db)):
+async def register_user(request: Request, data: dict, response: Response, db: AsyncSession = Depends(get_async_db)):
     first_name = data.get("firstName")
     last_name = data.get("lastName")
     course = data.get("course")
     group = data.get("group")
+    password = data.get("password") or ""
 
     if not all([first_name, last_name, course, group]):
         return JSONResponse({"error": "Не все поля заполнены"}, status_code=400)
 
     username = f"{first_name} {last_name}"
 
-    existing = db.query(User).filter(User.username == username).first()
+    existing = await db.scalar(select(User).where(User.username == username))
     if existing:
-        return {"status": "exists", "id": existing.id}
+        # Существующий аккаунт — только для его владельца: по действующему
+        # токену или по паролю. Иначе ни сессии, ни смены группы
+        current = await get_current_user(request, db)
+        if current is not None and current.id == existing.id:
+            await run_write(db, sessions.set_user_group, existing, f"{course} курс, {group}")
+            return {"status": "exists", "id": existing.id}
+        if not sessions.has_password(existing):
+            # Аккаунт до паролей: эта форма задаёт ему пароль
+            error = await claim_legacy_account(db, existing, password)
+            if error:
+                return error
+        elif not await asyncio.to_thread(sessions.verify_password, password, existing.password_hash):
+            return JSONResponse({"error": "Такой пользователь уже есть — войдите с паролем"}, status_code=409)
+        await run_write(db, sessions.set_user_group, existing, f"{course} курс, {group}")
+        return {"status": "exists", "id": existing.id, **await start_session(response, db, existing)}
+
+    if len(password) < sessions.PASSWORD_MIN_LENGTH:
+        return password_too_short()
 
     new_user = User(
         username=username,
-        password_hash="local",  # временно
+        password_hash=await asyncio.to_thread(sessions.hash_password, password),
         group=f"{course} курс, {group}"
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    async with async_write_lock:
+        await db.commit()
+    await db.refresh(new_user)
 
     print(f"[REGISTER] {username} ({course} курс, {group})")
-    return {"status": "ok", "id": new_user.id}
+    return {"status": "ok", "id": new_user.id, **await start_session(response, db, new_user)}
+
+
+def password_too_short():
+    return JSONResponse({"error": f"Пароль — не короче {sessions.PASSWORD_MIN_LENGTH} символов"}, status_code=400)
+
+
+async def claim_legacy_account(db, user, password):
+    """
+    Первый вход аккаунта, созданного до паролей: пароль задаётся один раз.
+    None — пароль задан, иначе ответ с ошибкой.
+    """
+    if len(password) < sessions.PASSWORD_MIN_LENGTH:
+        return password_too_short()
+    password_hash = await asyncio.to_thread(sessions.hash_password, password)
+    if not await run_write(db, sessions.claim_password, user.id, password_hash):
+        # Пароль только что задан другим запросом — проверяем по нему
+        await db.refresh(user)
+        if not await asyncio.to_thread(sessions.verify_password, password, user.password_hash):
+            return JSONResponse({"error": "Неверное имя или пароль"}, status_code=401)
+    print(f"[PASSWORD] {user.username}: задан пароль для аккаунта без пароля")
+    return None
+
+
+# 🔑 Вход зарегистрированного пользователя и выход
+@app.post("/api/login")
+async def login_user(data: dict, response: Response, db: AsyncSession = Depends(get_async_db)):
+    username = data.get("username") or f"{data.get('firstName', '')} {data.get('lastName', '')}".strip()
+    password = data.get("password") or ""
+    user = await db.scalar(select(User).where(User.username == username)) if username else None
+    if not user:
+        return JSONResponse({"error": "Неверное имя или пароль"}, status_code=401)
+    if not sessions.has_password(user):
+        # Аккаунт до паролей: первый вход задаёт пароль
+        error = await claim_legacy_account(db, user, password)
+        if error:
+            return error
+    elif not await asyncio.to_thread(sessions.verify_password, password, user.password_hash):
+        return JSONResponse({"error": "Неверное имя или пароль"}, status_code=401)
+    return {"status": "ok", "id": user.id, **await start_session(response, db, user)}
+
+
+@app.post("/api/logout")
+async def logout_user(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    token = sessions.token_from_request(request)
+    if token:
+        await run_write(db, sessions.revoke_token, token)
+    response.delete_cookie(sessions.SESSION_COOKIE)
+    # Браузер стирает localStorage: очередь офлайн-правок и копия заметок
+    # не достанутся следующему пользователю этого устройства
+    response.headers["Clear-Site-Data"] = '"storage"'
+    return {"status": "ok"}
+
+
+# 👤 Кто вошёл — note-page.js хранит очередь и копию заметок по id пользователя
+@app.get("/api/me")
+async def current_user_info(request: Request, db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "not authenticated"}, status_code=401)
+    return {"id": user.id, "username": user.username, "group": user.group}
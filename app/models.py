@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -13,6 +13,19 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     notes = relationship("Note", back_populates="user")
+    sessions = relationship("SessionToken", back_populates="user")
+
+
+# 🔑 Сессии: в базе только хэш токена, сам токен знает лишь клиент
+class SessionToken(Base):
+    __tablename__ = "session_tokens"
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # sha256 токена
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)  # по нему удаляются истёкшие
+
+    user = relationship("User", back_populates="sessions")
 
 
 class Note(Base):
@@ -26,9 +39,22 @@ class Note(Base):
     done = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Ближайшее напоминание (местное время): из note_datetime и repeat, NULL — не напоминать
+    next_due = Column(DateTime, nullable=True, index=True)
+    # Синхронизация (app/notes/sync.py): время и номер последнего изменения
+    # ставит триггер; удалённая заметка остаётся «надгробием» с deleted_at
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True, index=True)
+    deleted_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="notes")
 
+    # Лента заметок пользователя: фильтр и сортировка (created_at, id) по одному индексу
+    __table_args__ = (
+        Index("ix_notes_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_notes_user_change_seq", "user_id", "change_seq"),
+    )
+
 
 class Event(Base):
     __tablename__ = "events"
@@ -40,3 +66,57 @@ class Event(Base):
     content = Column(Text, nullable=True)
     image = Column(String(300), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# 📅 Снимок разобранного расписания: версии источников и их содержимое
+class ScheduleSource(Base):
+    __tablename__ = "schedule_sources"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(10), nullable=False)            # "excel" или "docx"
+    url = Column(String(500), nullable=True)
+    sha256 = Column(String(64), nullable=False)          # хэш содержимого файла
+    week_type = Column(String(10), nullable=True)        # docx: "upper" / "lower"
+    header_cells = Column(Text, nullable=True)           # excel: JSON [[текст, колонка]] шапки
+    published_at = Column(Float, nullable=True)          # docx: когда версия появилась на сайте
+    is_current = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("kind", "sha256", name="uq_schedule_sources_kind_sha256"),)
+
+
+class ExcelLesson(Base):
+    __tablename__ = "excel_lessons"
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("schedule_sources.id"), nullable=False)
+    column = Column(Integer, nullable=False)             # колонка группы в книге
+    group = Column(String(50), nullable=False)
+    day = Column(String(50), nullable=False)             # ключ дня в нижнем регистре
+    position = Column(Integer, nullable=False)           # порядок пар внутри колонки
+    day_label = Column(String(50), nullable=True)        # день как в книге
+    pair = Column(String(20), nullable=True)
+    time = Column(String(50), nullable=True)
+    raw_time = Column(String(50), nullable=True)
+    room = Column(String(100), nullable=True)
+    subject = Column(Text, nullable=True)
+    week_type = Column(String(10), nullable=True)
+    duration = Column(Integer, nullable=True)
+
+    __table_args__ = (Index("ix_excel_lessons_source_group_day", "source_id", "group", "day"),)
+
+
+class Replacement(Base):
+    __tablename__ = "replacements"
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("schedule_sources.id"), nullable=False)
+    group = Column(String(50), nullable=False)           # нормализованное название группы
+    day = Column(String(50), nullable=False)             # день как в документе
+    position = Column(Integer, nullable=False)           # порядок строк во всём документе
+    pair = Column(String(20), nullable=True)
+    room = Column(String(100), nullable=True)
+    subject_to = Column(Text, nullable=True)
+    teacher_to = Column(String(200), nullable=True)
+    subject_from = Column(Text, nullable=True)
+    teacher_from = Column(String(200), nullable=True)
+    comment = Column(Text, nullable=True)                # строка "группа | комментарий"
+
+    __table_args__ = (Index("ix_replacements_source_group_day", "source_id", "group", "day"),)
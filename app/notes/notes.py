@@ -1,34 +1,233 @@
 # app/notes/notes.py
+import json
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from app.models import Note
+from app.notes.reminders import reminder_scheduler, compute_next_due
+
+NOTES_PAGE_SIZE = 50
+NOTES_PAGE_MAX = 200
+
+# 🪦 Удалённые заметки остаются в таблице с deleted_at — для синхронизации
+# (app/notes/sync.py); везде, кроме неё, берём только живые
+
+def live_notes(db: Session, user_id: int):
+    return db.query(Note).filter(Note.user_id == user_id, Note.deleted_at.is_(None))
+
+def get_note(db: Session, note_id: int, user_id: int):
+    return live_notes(db, user_id).filter(Note.id == note_id).first()
 
 def get_all_notes(db: Session, user_id: int):
-    return db.query(Note).filter(Note.user_id == user_id).order_by(Note.created_at.desc()).all()
+    return live_notes(db, user_id).order_by(Note.created_at.desc()).all()
+
+# 📄 Постраничная выдача: курсор — последняя отданная заметка (created_at, id),
+# следующая страница начинается строго после неё. Порядок — новые сверху.
+
+def encode_cursor(note: Note):
+    raw = json.dumps([note.created_at.isoformat(), note.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    """(created_at, id) из курсора; ValueError, если курсор испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, note_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(note_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+def get_notes_page(db: Session, user_id: int, limit: int = NOTES_PAGE_SIZE, cursor: str = None):
+    """
+    (заметки, курсор следующей страницы или None). Запрос идёт по индексу
+    (user_id, created_at, id), поэтому страница стоит одинаково при любом их числе.
+    """
+    query = live_notes(db, user_id)
+    if cursor:
+        created_at, note_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Note.created_at < created_at,
+            and_(Note.created_at == created_at, Note.id < note_id)
+        ))
+    # Одна лишняя строка — чтобы узнать, есть ли следующая страница
+    notes = query.order_by(Note.created_at.desc(), Note.id.desc()).limit(limit + 1).all()
+    if len(notes) > limit:
+        notes = notes[:limit]
+        return notes, encode_cursor(notes[-1])
+    return notes, None
 
 def create_note(db: Session, user_id: int, text: str, datetime_str: str = None, repeat: str = "none"):
     note = Note(
         text=text,
         note_datetime=datetime_str,
         repeat=repeat,
-        user_id=user_id
+        user_id=user_id,
+        next_due=compute_next_due(datetime_str, repeat)
     )
     db.add(note)
     db.commit()
     db.refresh(note)
+    reminder_scheduler.notify(note.id, note.next_due)
     return note
 
 def delete_note(db: Session, note_id: int, user_id: int):
-    note = db.query(Note).filter(Note.id == note_id, Note.user_id == user_id).first()
+    note = get_note(db, note_id, user_id)
     if note:
-        db.delete(note)
+        note.deleted_at = datetime.utcnow()
+        note.next_due = None
         db.commit()
+        reminder_scheduler.notify(note_id, None)
         return True
     return False
 
+def update_note(db: Session, note_id: int, user_id: int, data: dict):
+    """Правка из /api/notes/update: текст, иконка и дата (если переданы). None — нет заметки."""
+    note = get_note(db, note_id, user_id)
+    if not note:
+        return None
+    note.text = compose_text(data)
+    note.icon = data.get("icon", note.icon)
+    note.note_datetime = data.get("datetime", note.note_datetime)
+    next_due = reschedule_note(note)
+    db.commit()
+    reminder_scheduler.notify(note.id, next_due)
+    return note
+
 def mark_note_as_done(db: Session, note_id: int, user_id: int):
-    note = db.query(Note).filter(Note.id == note_id, Note.user_id == user_id).first()
+    note = get_note(db, note_id, user_id)
     if note:
         note.done = True
+        note.next_due = None
         db.commit()
+        reminder_scheduler.notify(note_id, None)
         return True
     return False
+
+def reschedule_note(note: Note):
+    """Пересчитывает next_due после правки даты или правила повтора (до commit)."""
+    note.next_due = compute_next_due(note.note_datetime, note.repeat, note.done)
+    return note.next_due
+
+# 📦 Пакет изменений одним запросом и одной транзакцией
+
+NOTES_BATCH_MAX = 500
+BATCH_OPS = ("create", "update", "delete", "done")
+
+def _batch_note_id(op: dict):
+    # id из JSON: только целое число — список или объект не хэшируются,
+    # а true/false в Python тоже int и попали бы в заметки 1 и 0
+    note_id = op.get("id")
+    if isinstance(note_id, int) and not isinstance(note_id, bool):
+        return note_id
+    return None
+
+def compose_text(data: dict):
+    # Как в /api/notes/create и /update: title и text склеиваются в одно поле
+    title = data.get("title")
+    text_field = data.get("text") or ""
+    if title:
+        return f"{title}\n{text_field}"
+    return text_field or "(Без текста)"
+
+def apply_batch(db: Session, user_id: int, operations: list):
+    """
+    Применяет операции [{"op": "create"|"update"|"delete"|"done", "id": ..., ...}]
+    по порядку и возвращает результат каждой — те же статусы, что у отдельных
+    эндпоинтов. SQL — пачками: один SELECT своих заметок, одна вставка,
+    одно обновление, одна пометка удалённых и один commit на весь пакет.
+    """
+    results = [None] * len(operations)
+    ids = {
+        _batch_note_id(op) for op in operations
+        if isinstance(op, dict) and op.get("op") in ("update", "delete", "done")
+    }
+    ids.discard(None)
+    owned = {}  # id -> (note_datetime, repeat, done) — для пересчёта напоминаний
+    if ids:
+        owned = {
+            note_id: (note_datetime, repeat, done) for note_id, note_datetime, repeat, done in
+            live_notes(db, user_id).with_entities(Note.id, Note.note_datetime, Note.repeat, Note.done).filter(Note.id.in_(ids))
+        }
+
+    # Сначала итог по каждой заметке, затем SQL: порядок операций сохраняется,
+    # например, правка после удаления в том же пакете — not_found
+    creates = []    # (позиция, строка для вставки)
+    updates = {}    # id -> изменённые поля
+    deleted = set()
+    for position, op in enumerate(operations):
+        kind = op.get("op") if isinstance(op, dict) else None
+        if kind not in BATCH_OPS:
+            results[position] = {"status": "error", "error": f"неизвестная операция: {kind}"}
+            continue
+        if kind == "create":
+            creates.append((position, {
+                "text": compose_text(op),
+                "icon": op.get("icon"),
+                "note_datetime": op.get("datetime"),
+                "repeat": op.get("repeat", "none"),
+                "done": False,
+                "user_id": user_id,
+                "next_due": compute_next_due(op.get("datetime"), op.get("repeat", "none"))
+            }))
+            continue
+
+        note_id = _batch_note_id(op)
+        if note_id is None:
+            results[position] = {"status": "error", "error": "id заметки должен быть целым числом"}
+            continue
+        if note_id not in owned or note_id in deleted:
+            results[position] = {"status": "not_found", "id": note_id}
+            continue
+        if kind == "delete":
+            deleted.add(note_id)
+            updates.pop(note_id, None)
+            results[position] = {"status": "deleted", "id": note_id}
+        elif kind == "done":
+            fields = updates.setdefault(note_id, {})
+            fields["done"] = True
+            fields["next_due"] = None
+            results[position] = {"status": "done", "id": note_id}
+        else:
+            fields = updates.setdefault(note_id, {})
+            fields["text"] = compose_text(op)
+            if "icon" in op:
+                fields["icon"] = op["icon"]
+            for key, column in (("datetime", "note_datetime"), ("repeat", "repeat")):
+                if key in op:
+                    fields[column] = op[key]
+            if "note_datetime" in fields or "repeat" in fields:
+                note_datetime, repeat, done = owned[note_id]
+                fields["next_due"] = compute_next_due(
+                    fields.get("note_datetime", note_datetime), fields.get("repeat", repeat),
+                    fields.get("done", done)
+                )
+            results[position] = {"status": "updated", "id": note_id}
+
+    try:
+        if creates:
+            rows = [row for _, row in creates]
+            # return_defaults — чтобы вернуть клиенту id новых заметок
+            db.bulk_insert_mappings(Note, rows, return_defaults=True)
+            for (position, _), row in zip(creates, rows):
+                results[position] = {"status": "created", "id": row["id"]}
+        if updates:
+            db.bulk_update_mappings(Note, [{"id": note_id, **fields} for note_id, fields in updates.items()])
+        if deleted:
+            live_notes(db, user_id).filter(Note.id.in_(deleted)).update(
+                {Note.deleted_at: datetime.utcnow(), Note.next_due: None}, synchronize_session=False
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for _, row in creates:
+        reminder_scheduler.notify(row["id"], row["next_due"])
+    for note_id, fields in updates.items():
+        if "next_due" in fields:
+            reminder_scheduler.notify(note_id, fields["next_due"])
+    for note_id in deleted:
+        reminder_scheduler.notify(note_id, None)
+    return results
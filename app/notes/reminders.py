@@ -0,0 +1,430 @@
+# app/notes/reminders.py
+import os
+import time
+import heapq
+import asyncio
+import calendar
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Note
+
+# ⏰ Напоминания по заметкам. У заметки хранится next_due — ближайшее
+# срабатывание (из note_datetime и правила repeat), по нему есть индекс.
+# В памяти — min-куча только на ближайшее окно времени: она дочитывается
+# из базы по мере движения окна, поэтому и старт, и память не зависят
+# от общего числа заметок. Пробуждение и постановка в очередь — O(log n).
+
+REMINDER_WINDOW = int(os.environ.get("REMINDER_WINDOW", "3600"))   # секунд вперёд в куче
+REMINDER_HISTORY = 100  # сработавших напоминаний на пользователя
+
+REPEAT_RULES = ("none", "daily", "weekdays", "weekly", "monthly", "yearly")
+
+# Форматы note_datetime: <input type="datetime-local">, ISO и привычный «ДД.ММ.ГГГГ ЧЧ:ММ»
+_DATETIME_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%Y", "%Y-%m-%d %H:%M")
+
+
+def parse_note_datetime(value):
+    """Строка из note_datetime -> datetime (местное время) или None."""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+        return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+    except ValueError:
+        pass
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _add_months(start, months):
+    # День месяца — от исходной даты: 31 января -> 28/29 февраля -> 31 марта
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def next_occurrence(start, repeat, after):
+    """
+    Первое срабатывание правила repeat с началом start строго позже after,
+    None — если больше не будет. Считается сразу, без перебора пропущенных
+    повторов: сколько бы ни простояло приложение, это O(1).
+    """
+    if start > after:
+        return start
+    if repeat in ("daily", "weekly"):
+        step = timedelta(days=1 if repeat == "daily" else 7)
+        return start + step * ((after - start) // step + 1)
+    if repeat == "weekdays":
+        candidate = next_occurrence(start, "daily", after)
+        while candidate.weekday() >= 5:
+            candidate += timedelta(days=1)
+        return candidate
+    if repeat in ("monthly", "yearly"):
+        step = 1 if repeat == "monthly" else 12
+        months = ((after.year - start.year) * 12 + after.month - start.month) // step * step
+        candidate = _add_months(start, months)
+        while candidate <= after:
+            months += step
+            candidate = _add_months(start, months)
+        return candidate
+    return None
+
+
+def compute_next_due(note_datetime, repeat, done=False, now=None):
+    """next_due для полей заметки: None — выполнена, без даты или уже прошла."""
+    if done:
+        return None
+    start = parse_note_datetime(note_datetime)
+    if start is None:
+        return None
+    return next_occurrence(start, repeat or "none", now or datetime.now())
+
+
+class ReminderScheduler:
+    """
+    Куча (next_due, note_id) на окно [.., loaded_until). Запись в куче
+    актуальна, только если совпадает с _due[note_id]: изменённые и удалённые
+    заметки не ищутся в куче, а отбрасываются при извлечении.
+    """
+
+    def __init__(self, window=REMINDER_WINDOW, session_factory=SessionLocal):
+        self.window = timedelta(seconds=window)
+        self.session_factory = session_factory
+        self._heap = []
+        self._due = {}               # note_id -> next_due актуальной записи в куче
+        self._loaded_until = None    # всё с next_due раньше этого момента уже в куче
+        self._loading = None         # id -> next_due из notify во время чтения окна из базы
+        self._wakeup = None
+        self._task = None
+        self.fired = {}              # user_id -> deque сработавших напоминаний
+        self.counters = {"loaded": 0, "fired": 0, "window_loads": 0}
+
+    # 📥 Окно из базы
+
+    def query_window(self, db: Session, start, until):
+        """(id, next_due) заметок с next_due в [start, until); start=None — включая просроченные."""
+        query = db.query(Note.id, Note.next_due).filter(Note.next_due < until)
+        if start is not None:
+            query = query.filter(Note.next_due >= start)
+        return query.all()
+
+    def push_rows(self, rows):
+        for note_id, due in rows:
+            if self._loading is not None and note_id in self._loading:
+                continue  # уже пришло через notify — оно новее прочитанного
+            self._push(note_id, due)
+        self.counters["loaded"] += len(rows)
+
+    def _push(self, note_id, due):
+        self._due[note_id] = due
+        heapq.heappush(self._heap, (due, note_id))
+
+    def load_window(self, db: Session, now):
+        """Синхронная загрузка окна (CLI, бенчмарк); сервер использует _extend_window."""
+        until = now + self.window
+        self.push_rows(self.query_window(db, self._loaded_until, until))
+        self._loaded_until = until
+        self.counters["window_loads"] += 1
+
+    async def _extend_window(self, now):
+        until = now + self.window
+        start = self._loaded_until
+        self._loading = {}
+        try:
+            rows = await asyncio.to_thread(self._query_window_session, start, until)
+            self.push_rows(rows)
+            self._loaded_until = until
+            self.counters["window_loads"] += 1
+            # notify во время чтения не мог положить в кучу время из нового
+            # отрезка [start, until), а строку из базы push_rows пропустил
+            for note_id, due in self._loading.items():
+                if due is not None and due < until and self._due.get(note_id) != due:
+                    self._push(note_id, due)
+        finally:
+            self._loading = None
+
+    def _query_window_session(self, start, until):
+        db = self.session_factory()
+        try:
+            return self.query_window(db, start, until)
+        finally:
+            db.close()
+
+    # ✏️ Изменения заметок
+
+    def notify(self, note_id, next_due):
+        """Заметка получила новый next_due (None — напоминать не нужно)."""
+        if self._loading is not None:
+            self._loading[note_id] = next_due
+        if next_due is not None and self._loaded_until is not None and next_due < self._loaded_until:
+            self._push(note_id, next_due)
+            if self._wakeup is not None:
+                self._wakeup.set()
+        else:
+            # вне окна — дочитается из базы, когда окно до него дойдёт
+            self._due.pop(note_id, None)
+
+    # 🔔 Срабатывание
+
+    def _pop_due_entries(self, now):
+        entries = []
+        while self._heap and self._heap[0][0] <= now:
+            due, note_id = heapq.heappop(self._heap)
+            if self._due.get(note_id) == due:
+                del self._due[note_id]
+                entries.append((note_id, due))
+        return entries
+
+    def pop_due(self, now):
+        """id заметок, чьё время пришло; устаревшие записи кучи пропускаются."""
+        return [note_id for note_id, _ in self._pop_due_entries(now)]
+
+    def fire(self, db: Session, note_ids, now):
+        """
+        Переносит next_due повторяющихся заметок на следующий повтор.
+        Возвращает (сработавшие напоминания, [(note_id, новый next_due)]).
+        """
+        notes = db.query(Note).filter(Note.id.in_(note_ids), Note.next_due.isnot(None)).all()
+        fired, updates = [], []
+        for note in notes:
+            fired.append({
+                "note_id": note.id,
+                "user_id": note.user_id,
+                "title": (note.text or "").split("\n")[0][:255],
+                "due": note.next_due.isoformat(),
+                "fired_at": now.isoformat()
+            })
+            start = parse_note_datetime(note.note_datetime)
+            next_due = next_occurrence(start, note.repeat or "none", now) if start else None
+            updates.append({"id": note.id, "next_due": next_due})
+        if updates:
+            db.bulk_update_mappings(Note, updates)
+            db.commit()
+        return fired, [(row["id"], row["next_due"]) for row in updates]
+
+    def _fire_session(self, note_ids, now):
+        db = self.session_factory()
+        try:
+            return self.fire(db, note_ids, now)
+        finally:
+            db.close()
+
+    async def _fire_due(self, now):
+        """Срабатывание всего, чьё время пришло. False — срабатывать нечему."""
+        entries = self._pop_due_entries(now)
+        if not entries:
+            return False
+        try:
+            fired, rescheduled = await asyncio.to_thread(self._fire_session, [note_id for note_id, _ in entries], now)
+        except Exception:
+            # commit не прошёл — next_due в базе прежний. Записи возвращаются
+            # в кучу (_main повторит через паузу), кроме заметок, которым
+            # notify за это время дал новое время
+            for note_id, due in entries:
+                if note_id not in self._due:
+                    self._push(note_id, due)
+            raise
+        self._record(fired)
+        for note_id, next_due in rescheduled:
+            self.notify(note_id, next_due)
+        return True
+
+    def _record(self, fired):
+        for reminder in fired:
+            self.fired.setdefault(reminder["user_id"], deque(maxlen=REMINDER_HISTORY)).append(reminder)
+            print(f"⏰ Напоминание: {reminder['title']} (заметка {reminder['note_id']})")
+        self.counters["fired"] += len(fired)
+
+    def take_fired(self, user_id):
+        """Сработавшие напоминания пользователя; после чтения очередь пуста."""
+        reminders = self.fired.pop(user_id, None)
+        return list(reminders) if reminders else []
+
+    # 🔄 Фоновая задача
+
+    async def _run(self):
+        while True:
+            now = datetime.now()
+            # Окно дочитывается заранее, на половине пути
+            if self._loaded_until is None or now + self.window / 2 >= self._loaded_until:
+                await self._extend_window(now)
+
+            if await self._fire_due(now):
+                continue
+
+            wake_at = self._loaded_until - self.window / 2
+            if self._heap and self._heap[0][0] < wake_at:
+                wake_at = self._heap[0][0]
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, (wake_at - datetime.now()).total_seconds()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _backfill(self):
+        # Заметки, созданные до появления next_due: считаем его один раз
+        try:
+            count = await asyncio.to_thread(self._backfill_session)
+            if count:
+                print(f"⏰ Рассчитано напоминаний: {count}")
+        except Exception as e:
+            print("⚠️ Не удалось рассчитать напоминания:", e)
+
+    def _backfill_session(self):
+        db = self.session_factory()
+        try:
+            return backfill_next_due(db)
+        finally:
+            db.close()
+
+    async def _main(self):
+        await self._backfill()
+        while True:
+            try:
+                await self._run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("❌ Ошибка планировщика напоминаний:", e)
+                await asyncio.sleep(5)
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._main())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+    def stats(self):
+        return {
+            **self.counters,
+            "heap": len(self._heap),
+            "scheduled": len(self._due),
+            "loaded_until": self._loaded_until.isoformat() if self._loaded_until else None
+        }
+
+
+def backfill_next_due(db: Session, now=None, batch_size=1000):
+    """next_due для невыполненных заметок с датой, у которых он ещё не посчитан."""
+    now = now or datetime.now()
+    count = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Note.id, Note.note_datetime, Note.repeat)
+            .filter(
+                Note.id > last_id, Note.next_due.is_(None), Note.note_datetime.isnot(None),
+                Note.done == False, Note.deleted_at.is_(None)
+            )
+            .order_by(Note.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        for note_id, note_datetime, repeat in rows:
+            next_due = compute_next_due(note_datetime, repeat, now=now)
+            if next_due is not None:
+                updates.append({"id": note_id, "next_due": next_due})
+        if updates:
+            db.bulk_update_mappings(Note, updates)
+            db.commit()
+            count += len(updates)
+    return count
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+# 🧪 Бенчмарк: python -m app.notes.reminders [число заметок]
+def _benchmark(total=100_000):
+    import random
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    rnd = random.Random(1)
+    now = datetime(2025, 10, 20, 12, 0)
+
+    db = factory()
+    rows = []
+    for _ in range(total):
+        start = now + timedelta(minutes=rnd.randint(-30 * 24 * 60, 30 * 24 * 60))
+        repeat = rnd.choice(REPEAT_RULES)
+        rows.append({
+            "text": "напоминание", "note_datetime": start.strftime("%Y-%m-%dT%H:%M"),
+            "repeat": repeat, "done": False, "user_id": rnd.randint(1, 1000)
+        })
+    db.bulk_insert_mappings(Note, rows)
+    db.commit()
+
+    started = time.perf_counter()
+    scheduled = backfill_next_due(db, now=now)
+    print(f"backfill next_due: {scheduled} из {total} за {time.perf_counter() - started:.2f} с")
+
+    scheduler = ReminderScheduler(session_factory=factory)
+    started = time.perf_counter()
+    scheduler.load_window(db, now)
+    print(f"окно {scheduler.window}: {len(scheduler._heap)} в куче за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    # Вся будущая нагрузка сразу — чтобы измерить кучу на полном объёме
+    full = ReminderScheduler(window=60 * 24 * 3600, session_factory=factory)
+    started = time.perf_counter()
+    full.load_window(db, now)
+    print(f"все {len(full._heap)} в куче за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    # Продвигаемся по времени: извлечение сработавших и перенос повторов
+    started = time.perf_counter()
+    clock, fired_total, pops = now, 0, 0
+    for _ in range(24):
+        clock += timedelta(hours=1)
+        due_ids = full.pop_due(clock)
+        pops += len(due_ids)
+        fired, rescheduled = full.fire(db, due_ids, clock)
+        fired_total += len(fired)
+        for note_id, next_due in rescheduled:
+            full.notify(note_id, next_due)
+    elapsed = time.perf_counter() - started
+    print(f"сутки по часам: сработало {fired_total}, {elapsed:.2f} с вместе с базой")
+
+    # Чистая куча: push + pop
+    heap_ops = 200_000
+    bench = ReminderScheduler(window=1, session_factory=factory)
+    bench._loaded_until = now + timedelta(days=365)
+    started = time.perf_counter()
+    for i in range(heap_ops):
+        bench.notify(i, now + timedelta(seconds=rnd.randint(0, 30 * 24 * 3600)))
+    pushed = time.perf_counter() - started
+    started = time.perf_counter()
+    bench.pop_due(now + timedelta(days=31))
+    popped = time.perf_counter() - started
+    print(f"куча: push {pushed / heap_ops * 1e6:.2f} мкс, pop {popped / heap_ops * 1e6:.2f} мкс на операцию")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,79 @@
+# app/notes/sync.py
+import json
+import base64
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import Note
+
+# 🔄 Синхронизация заметок по изменениям: клиент хранит копию заметок и
+# токен, а сервер отдаёт только строки, изменённые после токена, — вместе
+# с «надгробиями» удалённых заметок (deleted_at), чтобы клиент их убрал.
+# Токен — номер изменения change_seq, а не время: его выдаёт триггер SQLite
+# под блокировкой записи, поэтому номера растут в порядке commit и
+# изменение, записанное «задним числом», не потеряется.
+
+NOTES_CHANGES_SIZE = 500
+NOTES_CHANGES_MAX = 1000
+
+# Колонки, которые видит клиент: правка next_due сработавшим напоминанием
+# номер изменения не меняет
+SYNCED_COLUMNS = ("text", "title", "icon", "note_datetime", "repeat", "done", "deleted_at")
+
+_TOUCH = (
+    "UPDATE notes SET change_seq = (SELECT IFNULL(MAX(change_seq), 0) + 1 FROM notes), "
+    "updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = new.id;"
+)
+
+TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS notes_sync_ai AFTER INSERT ON notes BEGIN {_TOUCH} END",
+    f"CREATE TRIGGER IF NOT EXISTS notes_sync_au AFTER UPDATE OF {', '.join(SYNCED_COLUMNS)} ON notes "
+    f"BEGIN {_TOUCH} END",
+]
+
+
+def ensure_note_sync(engine):
+    """
+    Триггеры change_seq/updated_at и номера для заметок, созданных до них:
+    старые строки получают номера по порядку id после уже выданных.
+    """
+    with engine.begin() as conn:
+        last_seq = conn.execute(text("SELECT IFNULL(MAX(change_seq), 0) FROM notes")).scalar()
+        conn.execute(text(
+            "UPDATE notes SET change_seq = :base + id, updated_at = COALESCE(updated_at, created_at) "
+            "WHERE change_seq IS NULL"
+        ), {"base": last_seq})
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+
+
+def encode_sync_token(user_id: int, change_seq: int):
+    raw = json.dumps([user_id, change_seq]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_sync_token(token: str):
+    """(user_id, change_seq) из токена; ValueError, если токен испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        user_id, change_seq = json.loads(raw)
+        return int(user_id), int(change_seq)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Некорректный токен синхронизации") from e
+
+
+def get_changes(db: Session, user_id: int, since_seq: int = 0, limit: int = NOTES_CHANGES_SIZE):
+    """
+    (изменённые заметки по возрастанию change_seq, последний отданный номер,
+    есть ли ещё). Запрос идёт по индексу (user_id, change_seq). При первой
+    синхронизации (since_seq == 0) надгробия не нужны — клиенту нечего удалять.
+    """
+    query = db.query(Note).filter(Note.user_id == user_id, Note.change_seq > since_seq)
+    if not since_seq:
+        query = query.filter(Note.deleted_at.is_(None))
+    notes = query.order_by(Note.change_seq).limit(limit + 1).all()
+    has_more = len(notes) > limit
+    notes = notes[:limit]
+    last_seq = notes[-1].change_seq if notes else since_seq
+    return notes, last_seq, has_more
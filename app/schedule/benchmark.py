@@ -0,0 +1,392 @@
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+from docx import Document
+
+from app.schedule import xlsx_stream
+from app.schedule.excel_scraper import ScheduleIndex, build_schedule_index, iter_sheet_rows, _deep_sizeof
+from app.schedule.doc_scraper import (
+    build_replacement_index,
+    extract_docx_tables,
+    group_replacements,
+    parse_docx_schedule
+)
+# schedule_merger импортирует соседние модули без пакета — как и в main.py
+sys.path.append(str(Path(__file__).resolve().parent))
+from app.schedule.schedule_merger import merge_schedules, merge_schedules_reference, merge_all_groups
+
+# ⏱ Офлайн-бенчмарк конвейера расписания: синтетические книга и документ замен,
+# замер стадий разбора, индексации и слияния, сравнение с сохранённой базой.
+# Запуск из корня проекта:
+#   python -m app.schedule.benchmark --groups 300 --save-baseline   # записать базу
+#   python -m app.schedule.benchmark --groups 300                   # сравнить с базой
+#   python -m app.schedule.benchmark --compare                      # + сравнение реализаций
+
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+PAIR_TIMES = ["1 8.00-9.35", "2 9.50-11.25", "3 12.10-13.45", "4 14.00-15.35", "5 16.00-17.35", "6 17.50-19.25"]
+FILL_COLORS = [None, None, "FF00B0F0", "FF00FF00", "FFFFC0CB", "FFFFFF00"]
+ROOMS = [101, 204, "204а", "спортзал", "12/3"]
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+
+def make_workbook(groups=20, days=6, pairs_per_day=6, seed=0):
+    """
+    Синтетическая книга в формате колледжа: день в колонке B, "№ время" в C,
+    для каждой группы — шапка, предмет и аудитория; заливка задаёт тип недели.
+    Возвращает байты xlsx.
+    """
+    rnd = random.Random(seed)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.cell(1, 1, "Расписание учебных занятий")
+
+    for g in range(groups):
+        sheet.cell(2, 4 + g * 2, f"РС{g % 100:02d}-{20 + g // 100}")
+
+    row = 3
+    for day in DAYS[:days]:
+        day_start = row
+        for time_label in PAIR_TIMES[:pairs_per_day]:
+            for half in range(2):
+                if half == 0:
+                    sheet.cell(row, 3, time_label)
+                for g in range(groups):
+                    column = 5 + g * 2
+                    if rnd.random() < 0.6:
+                        cell = sheet.cell(row, column, f"Предмет {rnd.randint(1, 40)}")
+                        sheet.cell(row, column + 1, rnd.choice(ROOMS))
+                        color = rnd.choice(FILL_COLORS)
+                        if color:
+                            cell.fill = PatternFill("solid", fgColor=color)
+                row += 1
+        sheet.cell(day_start, 2, day)
+        sheet.merge_cells(start_row=day_start, start_column=2, end_row=row - 1, end_column=2)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_replacement_tables(groups=300, days=2, seed=0, share=0.5, max_rows=3):
+    """
+    Синтетический документ замен в виде extract_docx_tables: на каждый день
+    таблица со строками групп, продолжениями без названия, комментариями
+    "группа | текст" и изредка битыми строками из 7 ячеек.
+    share — доля групп с заменами, max_rows — до скольких замен на группу.
+    """
+    rnd = random.Random(seed)
+    tables = []
+    for _ in range(days):
+        rows = [["Группа", "Пара", "Ауд.", "Предмет", "Преподаватель", "Вместо", "", "Преподаватель"]]
+        for g in range(groups):
+            if rnd.random() >= share:
+                continue
+            name = f"РС{g % 100:02d}-{20 + g // 100}"
+            if rnd.random() < 0.1:
+                rows.append([name, "Занятия с 3-й пары"])
+                continue
+            for k in range(rnd.randint(1, max_rows)):
+                rows.append([
+                    name if k == 0 else "",
+                    rnd.choice(["1", "2", "3", "4/1", "4/2", "5", "3лр"]),
+                    rnd.choice(["101", "204а", ""]),
+                    f"Новый {rnd.randint(1, 9)}", "Иванов И.И.",
+                    f"Старый {rnd.randint(1, 9)}", "", "Петров П.П."
+                ])
+            if rnd.random() < 0.05:
+                rows.append(["", "2", "101", "Практика", "", "", ""])
+        tables.append(rows)
+    return {"week_type": "upper", "day_labels": DAYS[:days], "tables": tables}
+
+
+def make_docx(parsed):
+    """
+    Документ в духе Zamena_SAYT.docx из make_replacement_tables: строка про
+    тип недели, перед каждой таблицей абзац с днём, комментарии групп —
+    объединённой ячейкой на всю ширину. Возвращает байты docx.
+    """
+    document = Document()
+    week = "верхняя неделя" if parsed["week_type"] == "upper" else "нижняя неделя"
+    document.add_paragraph(f"Замены в расписании учебных занятий ({week})")
+    for label, rows in zip(parsed["day_labels"], parsed["tables"]):
+        document.add_paragraph(f"{label.upper()} 20.10.2025")
+        table = document.add_table(rows=0, cols=8)
+        for row in rows:
+            cells = table.add_row().cells
+            if len(row) == 2:
+                cells[0].text = row[0]
+                cells[1].merge(cells[7]).text = row[1]
+            else:
+                for cell, value in zip(cells, row):
+                    cell.text = value
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def check_replacement_index_equivalence(seeds=(0, 1, 2), groups=60):
+    """Индекс замен всех групп должен совпадать с разбором по одной группе."""
+    for seed in seeds:
+        parsed = make_replacement_tables(groups=groups, seed=seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            index = build_replacement_index(parsed)
+            for g in range(groups + 1):
+                name = f"РС{g % 100:02d}-{20 + g // 100}"
+                expected = parse_docx_schedule(parsed, name)
+                assert group_replacements(index, name, parsed["week_type"]) == expected, f"seed={seed}: {name}"
+    print(f"✅ Индекс замен совпадает с разбором по группам на {len(seeds)} документах")
+
+
+def bench_replacements(groups):
+    parsed = make_replacement_tables(groups=groups)
+    names = [f"РС{g % 100:02d}-{20 + g // 100}" for g in range(groups)]
+    rows = sum(len(t) for t in parsed["tables"])
+    print(f"📄 Замены: {groups} групп, {rows} строк")
+
+    def per_group():
+        return [parse_docx_schedule(parsed, name) for name in names]
+
+    def indexed():
+        index = build_replacement_index(parsed)
+        return [group_replacements(index, name) for name in names]
+
+    for name, func in (("по группе", per_group), ("индекс", indexed)):
+        _, elapsed, peak = measure(func)
+        print(f"  {name:<9} {elapsed * 1000:8.1f} мс   пик памяти {peak / 1024 / 1024:6.1f} МБ")
+
+
+def bench_merge(groups, days=6):
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = index_with_stream(make_workbook(groups=groups, days=days))
+        replacements = build_replacement_index(make_replacement_tables(groups=groups, days=days))
+    weeks = {name: (index.get_days(name), group_replacements(replacements, name)) for name in index.groups}
+    print(f"🔀 Слияние: {len(weeks)} групп × {days} дней")
+
+    def per_day(merge):
+        result = {}
+        for name, (excel_days, doc_schedule) in weeks.items():
+            result[name] = {}
+            for day_key, lessons in excel_days.items():
+                doc_day = [r for r in doc_schedule["schedule"] if (r.get("day") or "").strip().lower() == day_key]
+                result[name][day_key] = merge({"group": name, "schedule": lessons},
+                                              {"group": name, "schedule": doc_day})["schedule"]
+        return result
+
+    def batch():
+        return merge_all_groups(weeks)
+
+    def whole_week(merge):
+        # Неделя одним списком — здесь перебор эталона квадратичен
+        return [
+            merge({"group": name, "schedule": [l for lessons in excel_days.values() for l in lessons]}, doc_schedule)
+            for name, (excel_days, doc_schedule) in weeks.items()
+        ]
+
+    runs = (
+        ("эталон", per_day, (merge_schedules_reference,)),
+        ("пакет", batch, ()),
+        ("неделя/эталон", whole_week, (merge_schedules_reference,)),
+        ("неделя/индекс", whole_week, (merge_schedules,))
+    )
+    results = {}
+    for name, func, args in runs:
+        results[name], elapsed, peak = measure(func, *args, repeat=5)
+        print(f"  {name:<13} {elapsed * 1000:8.1f} мс   пик памяти {peak / 1024 / 1024:6.1f} МБ")
+    assert results["пакет"] == results["эталон"], "пакетное слияние расходится с эталоном"
+    assert results["неделя/индекс"] == results["неделя/эталон"], "слияние недели расходится с эталоном"
+
+
+def index_with_openpyxl(content):
+    workbook = load_workbook(io.BytesIO(content))
+    return build_schedule_index(iter_sheet_rows(workbook.active))
+
+
+def index_with_stream(content):
+    return build_schedule_index(xlsx_stream.iter_rows(content))
+
+
+def measure(func, *args, repeat=1):
+    """
+    Время без трассировки (лучшее из repeat прогонов) и пик памяти
+    отдельным прогоном под tracemalloc. Диагностический print разбираемых
+    модулей в замер не попадает.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            took = time.perf_counter() - started
+            elapsed = took if elapsed is None else min(elapsed, took)
+
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_xlsx(groups):
+    content = make_workbook(groups=groups)
+    print(f"📦 Книга: {groups} групп, {len(content) / 1024:.0f} КБ")
+    for name, func in (("openpyxl", index_with_openpyxl), ("stream", index_with_stream)):
+        index, elapsed, peak = measure(func, content)
+        print(f"  {name:<9} {elapsed * 1000:8.1f} мс   пик памяти {peak / 1024 / 1024:6.1f} МБ   "
+              f"групп {len(index.groups)}")
+
+
+
+def bench_lesson_memory(groups, days=6):
+    """
+    Память индекса всех групп: пары Lesson со __slots__ и общими строками
+    против прежних словарей (через JSON — у каждого словаря свои строки,
+    как их и создавал старый разбор).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = index_with_stream(make_workbook(groups=groups, days=days))
+    as_dicts = json.loads(json.dumps(index.to_dict()["columns"], ensure_ascii=False))
+    assert ScheduleIndex.from_dict(index.to_dict()).columns == index.columns, "Lesson.to_dict/from_dict не обратимы"
+
+    lessons = index.stats()["lessons"]
+    print(f"🧱 Память пар: {groups} групп × {days} дней, пар {lessons}")
+    for name, columns in (("словари", as_dicts), ("Lesson", index.columns)):
+        size = _deep_sizeof(columns)
+        print(f"  {name:<9} {size / 1024 / 1024:8.1f} МБ   {size / lessons:6.0f} байт на пару")
+
+
+def run_suite(groups=300, days=6, share=0.5, max_rows=3, repeat=3, seed=0):
+    """
+    Конвейер по стадиям на синтетических данных: разбор и индекс книги,
+    разбор и индекс документа замен, слияние недели всех групп.
+    Возвращает {"params": ..., "stages": {стадия: {"ms", "peak_mb"}}}.
+    """
+    params = {"groups": groups, "days": days, "share": share, "max_rows": max_rows, "seed": seed}
+    xlsx_content = make_workbook(groups=groups, days=days, seed=seed)
+    parsed_tables = make_replacement_tables(groups=groups, days=days, seed=seed, share=share, max_rows=max_rows)
+    docx_content = make_docx(parsed_tables)
+    print(f"🧪 Данные: {groups} групп × {days} дней, книга {len(xlsx_content) / 1024:.0f} КБ, "
+          f"замены {len(docx_content) / 1024:.0f} КБ")
+
+    state = {}
+
+    def xlsx_parse():
+        state["rows"] = list(xlsx_stream.iter_rows(xlsx_content))
+
+    def xlsx_index():
+        state["index"] = build_schedule_index(state["rows"])
+
+    def docx_parse():
+        state["parsed"] = extract_docx_tables(Document(io.BytesIO(docx_content)))
+
+    def docx_index():
+        state["replacements"] = build_replacement_index(state["parsed"])
+
+    def merge():
+        index, replacements = state["index"], state["replacements"]
+        weeks = {
+            name: (index.get_days(name), group_replacements(replacements, name, state["parsed"]["week_type"]))
+            for name in index.groups
+        }
+        state["merged"] = merge_all_groups(weeks)
+
+    stages = {}
+    for name, func in (
+        ("xlsx_parse", xlsx_parse),
+        ("xlsx_index", xlsx_index),
+        ("docx_parse", docx_parse),
+        ("docx_index", docx_index),
+        ("merge", merge)
+    ):
+        _, elapsed, peak = measure(func, repeat=repeat)
+        stages[name] = {"ms": round(elapsed * 1000, 2), "peak_mb": round(peak / 1024 / 1024, 2)}
+
+    lessons = sum(len(l) for days_ in state["merged"].values() for l in days_.values())
+    print(f"  групп {len(state['merged'])}, пар после слияния {lessons}")
+    return {"params": params, "stages": stages}
+
+
+def compare_with_baseline(result, baseline, tolerance=0.5):
+    """
+    Печатает стадии рядом с базой. Регрессия — время или пик памяти
+    больше базы более чем на tolerance. Возвращает список регрессий.
+    """
+    if baseline is not None and baseline.get("params") != result["params"]:
+        print(f"⚠️ База снята с другими параметрами: {baseline.get('params')} — сравнение пропущено")
+        baseline = None
+
+    regressions = []
+    for name, current in result["stages"].items():
+        line = f"  {name:<11} {current['ms']:9.1f} мс   пик памяти {current['peak_mb']:6.1f} МБ"
+        base = (baseline or {}).get("stages", {}).get(name)
+        if base:
+            marks = []
+            for key, unit in (("ms", "мс"), ("peak_mb", "МБ")):
+                if base[key] and current[key] > base[key] * (1 + tolerance):
+                    marks.append(f"{key} {base[key]} → {current[key]} {unit}")
+            ratio = current["ms"] / base["ms"] if base["ms"] else 1.0
+            line += f"   ×{ratio:.2f} к базе"
+            if marks:
+                regressions.append(f"{name}: " + ", ".join(marks))
+                line += "   ❌"
+        print(line)
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(result, path=BASELINE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"💾 База сохранена: {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера расписания")
+    parser.add_argument("--groups", type=int, default=300)
+    parser.add_argument("--days", type=int, default=6)
+    parser.add_argument("--share", type=float, default=0.5, help="доля групп с заменами")
+    parser.add_argument("--max-rows", type=int, default=3, help="до скольких замен на группу в день")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимый рост к базе (доля)")
+    parser.add_argument("--compare", action="store_true", help="сравнить реализации (openpyxl, перебор)")
+    parser.add_argument("--skip-checks", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_checks:
+        check_replacement_index_equivalence()
+    if args.compare:
+        bench_xlsx(args.groups)
+        bench_replacements(args.groups)
+        bench_merge(args.groups)
+        bench_lesson_memory(args.groups)
+
+    result = run_suite(args.groups, args.days, args.share, args.max_rows, args.repeat)
+    if args.save_baseline:
+        compare_with_baseline(result, None)
+        save_baseline(result, args.baseline)
+    else:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"ℹ️ Базы нет ({args.baseline}) — запустите с --save-baseline")
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("❌ Регрессии:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
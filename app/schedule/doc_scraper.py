@@ -1,14 +1,36 @@
-import requests
 import io
 import re
 import os
+import time
+import asyncio
+import hashlib
 from docx import Document
+from lxml import etree
+from collections import Counter
 from datetime import datetime, timedelta
 import json
 
-# Абсолютный путь для файла кэша
+try:
+    from app.schedule import http_client
+    from app.schedule.single_flight import schedule_flights
+except ImportError:  # запуск как скрипта из папки schedule
+    import http_client
+    from single_flight import schedule_flights
+
+# 📁 Кэш замен: docx_cache/<sha256>.docx (сырые байты), <sha256>.json (таблицы
+# с отпечатками) и index.json с адресами документов, последней ссылкой и версией
+DOCX_CACHE_DIR = os.path.join(os.path.dirname(__file__), "docx_cache")
+DOCX_CACHE_INDEX = os.path.join(DOCX_CACHE_DIR, "index.json")
+# Сколько последних версий документа хранить на диске и в памяти: текущая
+# и предыдущие (с предыдущей сравнивается новая версия)
+DOCX_CACHE_KEEP = 3
+# Старый однострочный кэш ссылки — читается один раз для миграции
 CACHE_FILE = os.path.join(os.path.dirname(__file__), "last_docx_url.txt")
 
+# url -> {"url", "sha256", "parsed"} для документов, уже скачанных этим процессом
+_docx_cache = {}
+_docx_index = None
+
 weekday_map = {
     0: "Понедельник",
     1: "Вторник",
@@ -25,9 +47,16 @@ def normalize_day(day):
 def normalize_group(g):
     return re.sub(r"\W+", "", g.strip().lower()) if isinstance(g, str) else ""
 
-def fetch_latest_docx_url(page_url):
+async def fetch_latest_docx_url_async(page_url):
+    """
+    Ссылка на текущий документ замен или None, если на странице её нет.
+    Сетевые ошибки пробрасываются: «сайт недоступен» — не то же, что «замен нет».
+    """
+    return await schedule_flights.do(("docx_link", page_url), _fetch_latest_docx_url_async, page_url)
+
+async def _fetch_latest_docx_url_async(page_url):
     try:
-        response = requests.get(page_url)
+        response = await http_client.fetch(page_url)
         response.raise_for_status()
         html = response.text
 
@@ -37,6 +66,8 @@ def fetch_latest_docx_url(page_url):
         else:
             print("❌ Не удалось найти ссылку на DOCX.")
             return None
+    except http_client.HTTPError:
+        raise
     except Exception as e:
         print(f"❌ Ошибка при получении ссылки: {e}")
         return None
@@ -54,23 +85,207 @@ def get_week_type_from_docx(doc):
         return "lower"
     return None
 
-def has_docx_url_changed(new_url, cache_file=CACHE_FILE):
+def _load_docx_index():
+    global _docx_index
+    if _docx_index is None:
+        try:
+            with open(DOCX_CACHE_INDEX, "r", encoding="utf-8") as f:
+                _docx_index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _docx_index = {"latest_url": "", "urls": {}}
+            try:
+                with open(CACHE_FILE, "r") as f:
+                    _docx_index["latest_url"] = f.read().strip()
+            except FileNotFoundError:
+                pass
+    return _docx_index
+
+def _save_docx_index():
     try:
-        with open(cache_file, "r") as f:
-            old_url = f.read().strip()
-    except FileNotFoundError:
-        old_url = ""
-
-    if new_url != old_url:
-        with open(cache_file, "w") as f:
-            f.write(new_url)
+        os.makedirs(DOCX_CACHE_DIR, exist_ok=True)
+        tmp_path = DOCX_CACHE_INDEX + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_docx_index, f, ensure_ascii=False)
+        os.replace(tmp_path, DOCX_CACHE_INDEX)
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить кэш замен: {e}")
+
+def get_last_docx_url():
+    return _load_docx_index().get("latest_url") or None
+
+def has_docx_url_changed(new_url):
+    index = _load_docx_index()
+    if new_url != index.get("latest_url"):
+        index["latest_url"] = new_url
+        _save_docx_index()
         return True
     return False
 
-def load_docx_from_url(url):
-    response = requests.get(url)
+async def download_docx_async(url):
+    response = await http_client.fetch(url)
     response.raise_for_status()
-    return Document(io.BytesIO(response.content))
+    return response.content
+
+def table_fingerprint(table):
+    # Хэш XML таблицы: совпал с прошлой версией — текст ячеек можно не читать
+    return hashlib.sha256(etree.tostring(table._tbl)).hexdigest()[:20]
+
+def extract_docx_tables(doc, previous=None):
+    """
+    Всё, что нужно для разбора замен, без объектов python-docx:
+    тип недели, дни из абзацев, текст ячеек каждой таблицы и её отпечаток.
+    previous — такой же результат для прошлой версии документа: таблицы
+    с тем же отпечатком берутся оттуда, перечитываются только изменённые.
+    """
+    known = {}
+    if previous and previous.get("fingerprints"):
+        known = dict(zip(previous["fingerprints"], previous["tables"]))
+
+    tables = []
+    fingerprints = []
+    reparsed = 0
+    for table in doc.tables:
+        fingerprint = table_fingerprint(table)
+        rows = known.get(fingerprint)
+        if rows is None:
+            rows = [[cell.text.strip() for cell in row.cells] for row in table.rows]
+            reparsed += 1
+        tables.append(rows)
+        fingerprints.append(fingerprint)
+
+    if known:
+        print(f"🧩 Таблиц замен: {len(tables)}, перечитано изменённых: {reparsed}")
+
+    return {
+        "week_type": get_week_type_from_docx(doc),
+        "day_labels": get_docx_day_labels(doc),
+        "tables": tables,
+        "fingerprints": fingerprints
+    }
+
+def _read_parsed(sha256):
+    try:
+        with open(os.path.join(DOCX_CACHE_DIR, f"{sha256}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_blob(name, data):
+    os.makedirs(DOCX_CACHE_DIR, exist_ok=True)
+    path = os.path.join(DOCX_CACHE_DIR, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def parse_docx_content(content, previous=None):
+    """
+    Байты DOCX -> результат extract_docx_tables. Чистая функция без общего
+    состояния, поэтому её можно выполнять в отдельном процессе (см. ingest.py).
+    """
+    return extract_docx_tables(Document(io.BytesIO(content)), previous)
+
+def _store_docx(url, sha256, content, parsed, is_new):
+    # Запись на диск — синхронная часть get_docx_tables_async
+    if is_new:
+        try:
+            _write_blob(f"{sha256}.docx", content)
+            _write_blob(f"{sha256}.json", json.dumps(parsed, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить кэш замен: {e}")
+
+    index = _load_docx_index()
+    index["urls"][url] = sha256
+    # Когда версия впервые появилась на сайте — от этой даты считаются дни замен
+    index.setdefault("first_seen", {}).setdefault(sha256, time.time())
+    _save_docx_index()
+
+def _prune_docx_cache(current_sha):
+    """
+    Оставляет DOCX_CACHE_KEEP последних версий (по first_seen) и current_sha:
+    файлы остальных версий удаляются, их ссылки забываются. Возвращает
+    множество оставленных sha256.
+    """
+    index = _load_docx_index()
+    first_seen = index.setdefault("first_seen", {})
+    kept = set(sorted(first_seen, key=first_seen.get, reverse=True)[:DOCX_CACHE_KEEP]) | {current_sha}
+    for sha256 in [sha256 for sha256 in first_seen if sha256 not in kept]:
+        del first_seen[sha256]
+    index["urls"] = {url: sha256 for url, sha256 in index["urls"].items() if sha256 in kept}
+
+    removed = 0
+    try:
+        for name in os.listdir(DOCX_CACHE_DIR):
+            sha256, ext = os.path.splitext(name)
+            if ext in (".docx", ".json") and name != os.path.basename(DOCX_CACHE_INDEX) and sha256 not in kept:
+                os.remove(os.path.join(DOCX_CACHE_DIR, name))
+                removed += 1
+    except OSError as e:
+        print(f"⚠️ Не удалось очистить кэш замен: {e}")
+    if removed:
+        print(f"🧹 Из кэша замен удалено файлов старых версий: {removed}")
+    _save_docx_index()
+    return kept
+
+async def get_docx_tables_async(url, run_job=None):
+    """
+    Разобранный документ замен по ссылке. Каждая опубликованная версия
+    скачивается и разбирается один раз: ссылка -> sha256 содержимого
+    -> таблицы, и всё это переживает перезапуск. Для новой версии
+    перечитываются только изменённые таблицы, а в entry["changes"]
+    кладётся разница с предыдущей версией (см. diff_replacement_indexes).
+    run_job(func, *args) — где выполнять разбор: по умолчанию отдельный поток.
+    """
+    entry = _docx_cache.get(url)
+    if entry is not None:
+        return entry
+    return await schedule_flights.do(("docx", url), _get_docx_tables_async, url, run_job)
+
+async def _get_docx_tables_async(url, run_job=None):
+    entry = _docx_cache.get(url)
+    if entry is not None:
+        return entry
+
+    index = _load_docx_index()
+    previous_sha = index.get("latest_sha256")
+    sha256 = index["urls"].get(url)
+    parsed = _read_parsed(sha256) if sha256 else None
+    previous = _read_parsed(previous_sha) if previous_sha and previous_sha != sha256 else None
+
+    if parsed is None:
+        content = await download_docx_async(url)
+        sha256 = hashlib.sha256(content).hexdigest()
+        # Та же версия могла уже прийти по другой ссылке
+        parsed = _read_parsed(sha256)
+        is_new = parsed is None
+        if is_new:
+            run_job = run_job or asyncio.to_thread
+            parsed = await run_job(parse_docx_content, content, previous)
+        await asyncio.to_thread(_store_docx, url, sha256, content, parsed, is_new)
+
+    loaded_at = time.time()
+    entry = {
+        "url": url, "sha256": sha256, "parsed": parsed, "index": None, "loaded_at": loaded_at,
+        "first_seen": index.get("first_seen", {}).get(sha256, loaded_at),
+        "changes": None
+    }
+
+    if sha256 != previous_sha:
+        if previous is not None:
+            entry["changes"] = {
+                "previous": previous_sha,
+                "week_type_changed": previous.get("week_type") != parsed.get("week_type"),
+                "groups": diff_replacement_indexes(build_replacement_index(previous), get_replacement_index(entry))
+            }
+            print(f"🔀 Замены изменились у групп: {len(entry['changes']['groups'])}")
+        index["latest_sha256"] = sha256
+        # Новая версия — старые уходят с диска и из памяти
+        kept = await asyncio.to_thread(_prune_docx_cache, sha256)
+        for cached_url in [u for u, cached in _docx_cache.items() if cached["sha256"] not in kept]:
+            del _docx_cache[cached_url]
+
+    _docx_cache[url] = entry
+    return entry
 
 def get_day_from_table(table):
     for row in table.rows[:2]:
@@ -82,6 +297,12 @@ def get_day_from_table(table):
     return None
 
 
+def table_rows(table):
+    # Таблица python-docx или уже извлечённые строки из extract_docx_tables
+    if isinstance(table, list):
+        return table
+    return [[cell.text.strip() for cell in row.cells] for row in table.rows]
+
 def parse_schedule_table(table, target_group, day_label):
     schedule_data = {
         "group": target_group,
@@ -91,8 +312,7 @@ def parse_schedule_table(table, target_group, day_label):
     current_group = None
     group_found = False
 
-    for row in table.rows:
-        cells = [cell.text.strip() for cell in row.cells]
+    for cells in table_rows(table):
 
         if not any(cells):
             continue
@@ -142,61 +362,233 @@ def parse_schedule_table(table, target_group, day_label):
 
     return schedule_data
 
-def get_docx_schedule(group_name, page_url="http://www.bobruisk.belstu.by/dnevnoe-otdelenie/raspisanie-zanyatiy-i-zvonkov-zamenyi#gsc.tab=0", doc_updated=False):
-    docx_url = fetch_latest_docx_url(page_url)
-    if not docx_url:
-        return None
+def get_docx_day_labels(doc):
+    # Собираем список дней из абзацев
+    day_labels = []
+    for para in doc.paragraphs:
+        text = para.text.strip().upper()
+        match = re.search(r'(ПОНЕДЕЛЬНИК|ВТОРНИК|СРЕДА|ЧЕТВЕРГ|ПЯТНИЦА|СУББОТА|ВОСКРЕСЕНЬЕ)', text)
+        if match:
+            day_labels.append(match.group(1).capitalize())
+    return day_labels
+
+def _table_day_labels(parsed):
+    # Привязка дней к таблицам
+    day_labels = parsed["day_labels"]
+    labels = []
+    for i in range(len(parsed["tables"])):
+        if i < len(day_labels):
+            labels.append(day_labels[i])
+        else:
+            # Если таблиц больше, чем дней — используем резерв
+            target_day = datetime.now() + timedelta(days=1)
+            if target_day.weekday() == 6: 
+                target_day += timedelta(days=1)
+            day_label = weekday_map[target_day.weekday()]
+            print(f"⚠️ День не найден для таблицы {i}, используем резерв: {day_label}")
+            labels.append(day_label)
+    return labels
+
+def index_schedule_table(rows, day_label, index):
+    """
+    Один проход по таблице для всех групп сразу. Правила те же, что
+    в parse_schedule_table: строка с названием группы переключает текущую
+    группу, строка "группа | комментарий" добавляет группу к текущим,
+    строки без названия относятся ко всем текущим группам.
+    """
+    active = set()
+
+    for cells in rows:
+        if not any(cells):
+            continue
 
-    try:
-        doc = load_docx_from_url(docx_url)
+        if len(cells) == 2 and cells[0] and cells[1]:
+            group_key = normalize_group(cells[0])
+            active.add(group_key)
+            index.setdefault(group_key, {}).setdefault(day_label, []).append({
+                "day": day_label,
+                "comment": cells[1]
+            })
+            continue
 
-        full_schedule = {
-            "group": group_name,
-            "schedule": []
-        }
+        if cells[0] and not cells[0].startswith("-"):
+            active = {normalize_group(cells[0])}
 
-        week_type = get_week_type_from_docx(doc)
-        full_schedule["week_type"] = week_type
-        print(f"📌 Тип недели: {week_type}")
+        if not active:
+            continue
 
-        # Собираем список дней из абзацев
-        day_labels = []
-        for para in doc.paragraphs:
-            text = para.text.strip().upper()
-            match = re.search(r'(ПОНЕДЕЛЬНИК|ВТОРНИК|СРЕДА|ЧЕТВЕРГ|ПЯТНИЦА|СУББОТА|ВОСКРЕСЕНЬЕ)', text)
-            if match:
-                day_labels.append(match.group(1).capitalize())
+        try:
+            pair_number = cells[1] if len(cells) > 1 else None
+            room = cells[2] if len(cells) > 2 else None
+            subject_to = cells[3] if len(cells) > 3 else None
+            teacher_to = cells[4] if len(cells) > 4 else None
+            subject_from = cells[5] if len(cells) > 5 else None
+            teacher_from = cells[7] if len(cells) > 6 else None
 
-        print(f"📅 Найденные дни перед таблицами: {day_labels}")
+            item = {
+                "day": day_label,
+                "pair": str(pair_number).strip() if pair_number else None,
+                "room": room,
+                "from": {
+                    "subject": subject_from,
+                    "teacher": teacher_from
+                },
+                "to": {
+                    "subject": subject_to,
+                    "teacher": teacher_to
+                }
+            }
+        except Exception as e:
+            print(f"⚠️ Ошибка при обработке строки: {e}")
+            continue
 
-        # Привязка дней к таблицам
-        for i, table in enumerate(doc.tables):
-            if i < len(day_labels):
-                day_label = day_labels[i]
+        for group_key in active:
+            index.setdefault(group_key, {}).setdefault(day_label, []).append(item)
+
+def build_replacement_index(parsed):
+    """
+    Замены всех групп за один обход таблиц:
+    нормализованная группа -> день -> строки замен и комментарии по порядку.
+    """
+    index = {}
+    for rows, day_label in zip(parsed["tables"], _table_day_labels(parsed)):
+        index_schedule_table(rows, day_label, index)
+    return index
+
+def get_replacement_index(entry):
+    # Индекс строится один раз на запись кэша get_docx_tables
+    if entry.get("index") is None:
+        entry["index"] = build_replacement_index(entry["parsed"])
+    return entry["index"]
+
+def _item_fingerprint(item):
+    return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+def _item_slot(item):
+    # Место строки в расписании: комментарий сравнивается целиком, замена — по дню и паре
+    if "comment" in item:
+        return None
+    return (normalize_day(item.get("day")), item.get("pair"))
+
+def diff_replacement_indexes(old, new):
+    """
+    Разница двух индексов build_replacement_index по группам:
+    {группа: {"added": [...], "removed": [...], "modified": [{"before", "after"}]}}.
+    Строка на том же дне и паре, но с другим содержимым, считается изменённой.
+    Группы без изменений в результат не попадают.
+    """
+    changes = {}
+    for group_key in sorted(old.keys() | new.keys()):
+        before = [item for items in old.get(group_key, {}).values() for item in items]
+        after = [item for items in new.get(group_key, {}).values() for item in items]
+        if before == after:
+            continue
+
+        # Мультимножества строк: одинаковые строки сокращаются попарно
+        unmatched = Counter(_item_fingerprint(item) for item in after)
+        removed = []
+        for item in before:
+            fp = _item_fingerprint(item)
+            if unmatched[fp]:
+                unmatched[fp] -= 1
             else:
-                # Если таблиц больше, чем дней — используем резерв
-                target_day = datetime.now() + timedelta(days=1)
-                if target_day.weekday() == 6: 
-                    target_day += timedelta(days=1)
-                day_label = weekday_map[target_day.weekday()]
-                print(f"⚠️ День не найден для таблицы {i}, используем резерв: {day_label}")
-
-            result = parse_schedule_table(table, group_name, day_label)
-            full_schedule["schedule"].extend(result["schedule"])
-
-        if full_schedule["schedule"]:
-            return full_schedule
-        else:
+                removed.append(item)
+        unmatched = Counter(_item_fingerprint(item) for item in before)
+        added = []
+        for item in after:
+            fp = _item_fingerprint(item)
+            if unmatched[fp]:
+                unmatched[fp] -= 1
+            else:
+                added.append(item)
+
+        modified = []
+        for item in list(added):
+            slot = _item_slot(item)
+            match = next((r for r in removed if slot is not None and _item_slot(r) == slot), None)
+            if match is not None:
+                removed.remove(match)
+                added.remove(item)
+                modified.append({"before": match, "after": item})
+
+        # Пустые списки — строки те же, но в другом порядке
+        changes[group_key] = {"added": added, "removed": removed, "modified": modified}
+    return changes
+
+def group_replacements(index, group_name, week_type=None):
+    days = index.get(normalize_group(group_name), {})
+    return {
+        "group": group_name,
+        "schedule": [item for items in days.values() for item in items],
+        "week_type": week_type
+    }
+
+def parse_docx_schedule(parsed, group_name):
+    """
+    Разбирает замены одной группы из результата extract_docx_tables.
+    Для многих групп выгоднее один раз вызвать build_replacement_index.
+    """
+    full_schedule = {
+        "group": group_name,
+        "schedule": [],
+        "week_type": parsed["week_type"]
+    }
+
+    for rows, day_label in zip(parsed["tables"], _table_day_labels(parsed)):
+        result = parse_schedule_table(rows, group_name, day_label)
+        full_schedule["schedule"].extend(result["schedule"])
+
+    return full_schedule
+
+async def get_docx_schedule_async(group_name, page_url="http://www.bobruisk.belstu.by/dnevnoe-otdelenie/raspisanie-zanyatiy-i-zvonkov-zamenyi#gsc.tab=0", doc_updated=False, docx_url=None):
+    """
+    doc_updated оставлен для совместимости: повторная загрузка той же версии
+    и так не происходит — см. get_docx_tables_async. Если ссылка на DOCX уже
+    известна, передайте docx_url, чтобы не запрашивать страницу ещё раз.
+    Одновременные вызовы для той же группы ждут один результат.
+    """
+    key = ("docx_schedule", docx_url or page_url, group_name)
+    return await schedule_flights.do(key, _get_docx_schedule_async, group_name, page_url, docx_url)
+
+async def _get_docx_schedule_async(group_name, page_url, docx_url=None):
+    try:
+        if docx_url is None:
+            docx_url = await fetch_latest_docx_url_async(page_url)
+        if not docx_url:
+            return None
+
+        entry = await get_docx_tables_async(docx_url)
+        parsed = entry["parsed"]
+        print(f"📌 Тип недели: {parsed['week_type']}")
+        print(f"📅 Найденные дни перед таблицами: {parsed['day_labels']}")
+
+        full_schedule = group_replacements(get_replacement_index(entry), group_name, parsed["week_type"])
+
+        if not full_schedule["schedule"]:
             print(f"⚠️ Группа {group_name} не найдена в документе.")
-            return full_schedule
+        return full_schedule
 
-    except requests.exceptions.RequestException as e:
+    except http_client.HTTPError as e:
         print(f"❌ Ошибка при скачивании файла: {e}")
         return None
     except Exception as e:
         print(f"❌ Ошибка при обработке DOCX: {e}")
         return None
 
+# 🔁 Синхронные обёртки для CLI и старого кода
+
+def fetch_latest_docx_url(page_url):
+    return http_client.run_sync(fetch_latest_docx_url_async, page_url)
+
+def load_docx_from_url(url):
+    return Document(io.BytesIO(http_client.run_sync(download_docx_async, url)))
+
+def get_docx_tables(url):
+    return http_client.run_sync(get_docx_tables_async, url)
+
+def get_docx_schedule(group_name, page_url="http://www.bobruisk.belstu.by/dnevnoe-otdelenie/raspisanie-zanyatiy-i-zvonkov-zamenyi#gsc.tab=0", doc_updated=False, docx_url=None):
+    return http_client.run_sync(get_docx_schedule_async, group_name, page_url, doc_updated, docx_url)
+
 
 def get_available_replacement_days(doc_schedule):
     days_with_replacements = set()
@@ -214,7 +606,7 @@ if __name__ == '__main__':
     DOCX_URL = fetch_latest_docx_url(DOC_PAGE_URL)
     doc_updated = has_docx_url_changed(DOCX_URL) 
     
-    schedule = get_docx_schedule(MY_GROUP, DOC_PAGE_URL, doc_updated) 
+    schedule = get_docx_schedule(MY_GROUP, DOC_PAGE_URL, doc_updated, docx_url=DOCX_URL)
 
     if schedule:
         print("✅ Получено расписание замен:")
@@ -1,11 +1,43 @@
-import requests
 import io
+import asyncio
+import os
+import re
+import sys
+import time
+import hashlib
 from openpyxl import load_workbook
 import json
 from collections import defaultdict, Counter
+from functools import lru_cache
 from datetime import datetime, timedelta
 from openpyxl.styles import PatternFill
 
+try:
+    from app.schedule import xlsx_stream, http_client
+    from app.schedule.single_flight import schedule_flights
+    from app.schedule.lessons import Lesson, parse_time_range, format_clock, normalize_dashes
+except ImportError:  # запуск как скрипта из папки schedule
+    import xlsx_stream
+    import http_client
+    from single_flight import schedule_flights
+    from lessons import Lesson, parse_time_range, format_clock, normalize_dashes
+color_type_from_rgb = xlsx_stream.color_type_from_rgb
+
+# 📁 Кэш книги Excel: сырые байты, ETag/Last-Modified и индекс всех групп
+EXCEL_CACHE_DIR = os.path.join(os.path.dirname(__file__), "excel_cache")
+# Сколько секунд считаем книгу свежей и не ходим на сервер даже с условным запросом
+EXCEL_CACHE_TTL = int(os.environ.get("EXCEL_CACHE_TTL", "60"))
+
+# url -> запись кэша (см. _new_cache_entry)
+_excel_cache = {}
+
+# 🔎 Название группы в шапке: "РС02-24", "ЛХ02-25с", "ПО6", "МД23"
+GROUP_NAME_PATTERN = re.compile(r"[А-ЯЁA-Z]{2,4}\d{1,2}(?:-\d{2}[а-яё]?)?")
+HEADER_MAX_ROW = 24  # шапка — не ниже, чем ищет find_group_column
+DATA_MIN_ROW = 3
+# Версия формата индекса в кэше на диске: индекс другой версии строится заново
+INDEX_FORMAT = 3
+
 def find_group_column(sheet, group_name):
     for row in sheet.iter_rows(min_row=1, max_row=24):
         for cell in row:
@@ -13,158 +45,501 @@ def find_group_column(sheet, group_name):
                 return cell.column
     return None
 
+@lru_cache(maxsize=1024)
 def split_time_interval(time_str):
+    """
+    "8.00-9.35" -> ("08:00 - 08:40", "08:50 - 09:35"): две половины пары
+    с переменой 10 минут. Если время не разобрать — (time_str, time_str).
+    Считается в минутах и запоминается для каждой уникальной строки.
+    """
     try:
-        time_str = time_str.replace("–", "-").replace("—", "-").strip()
-        parts = time_str.split("-")
-        if len(parts) != 2:
-            return time_str, time_str
-
-        start_str, end_str = parts
-        start_str = start_str.replace(".", ":").strip()
-        end_str = end_str.replace(".", ":").strip()
-
-        start = datetime.strptime(start_str, "%H:%M")
-        end = datetime.strptime(end_str, "%H:%M")
-        total_minutes = int((end - start).total_seconds() // 60)
-
-        half = (total_minutes - 10) // 2
-        first_end = start + timedelta(minutes=half)
-        second_start = first_end + timedelta(minutes=10)
-
-        first_interval = f"{start.strftime('%H:%M')} - {first_end.strftime('%H:%M')}"
-        second_interval = f"{second_start.strftime('%H:%M')} - {end.strftime('%H:%M')}"
-        return first_interval, second_interval
-    except:
+        time_str = normalize_dashes(time_str)
+    except AttributeError:
         return time_str, time_str
 
+    minutes = parse_time_range(time_str)
+    if minutes is None:
+        return time_str, time_str
+
+    start, end = minutes
+    first_end = start + (end - start - 10) // 2
+    second_start = first_end + 10
+
+    first_interval = f"{format_clock(start)} - {format_clock(first_end)}"
+    second_interval = f"{format_clock(second_start)} - {format_clock(end)}"
+    return first_interval, second_interval
+
 def interpret_color(cell):
     try:
         fill = cell.fill
         fg = fill.fgColor
         if fg.type == "rgb":
-            rgb = fg.rgb.upper()
-            if rgb.startswith("FF"):
-                rgb = rgb[2:]
-
-            upper_colors = {"00B0F0", "0070C0", "0066FF", "CCECFF"}
-            lower_colors = {"00FF00", "00B050", "00FF99"}
-            hour_colors = {"FFC0CB", "FF99CC", "FFB6C1", "FF66CC"}
-
-            if rgb in upper_colors:
-                return "upper"
-            elif rgb in lower_colors:
-                return "lower"
-            elif rgb in hour_colors:
-                return "hour"
+            return color_type_from_rgb(fg.rgb)
         return None
     except:
         return None
 
-def get_excel_schedule(url, group_name):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-
-        excel_file_in_memory = io.BytesIO(response.content)
-        workbook = load_workbook(excel_file_in_memory)
-        sheet = workbook.active
-        
-        column_index = find_group_column(sheet, group_name)
-        if not column_index:
-            print(f"Ошибка: Не удалось найти столбец для группы {group_name}.")
+class _LazyColors:
+    """Тип недели по цвету ячейки openpyxl — вычисляется, только когда нужен."""
+    __slots__ = ("row",)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getitem__(self, index):
+        return interpret_color(self.row[index])
+
+def iter_sheet_rows(sheet):
+    """
+    Строки листа openpyxl в виде (номер строки, значения, цвета).
+    colors[i] возвращает то же, что interpret_color для ячейки values[i].
+    """
+    for row_idx, row in enumerate(sheet.iter_rows(min_row=1), start=1):
+        yield row_idx, [cell.value for cell in row], _LazyColors(row)
+
+def _deep_sizeof(obj, seen=None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+def _assign_intervals(lessons):
+    """
+    Делит время пары на половины для "1/1", "1/2" и схлопывает одиночные
+    половинки обратно в "1" — как и раньше в get_excel_schedule.
+    """
+    pair_occurrences = Counter((p.day, p.pair.split("/")[0]) for p in lessons if p.pair)
+    interval_cache = {}
+
+    for entry in lessons:
+        pair_raw = entry.pair
+        if not pair_raw or "/" not in pair_raw:
+            continue
+
+        base_pair = pair_raw.split("/")[0]
+        index = int(pair_raw.split("/")[1])
+        key = (entry.day, base_pair)
+
+        if key not in interval_cache:
+            interval_cache[key] = split_time_interval(entry.time)
+
+        first, second = interval_cache[key]
+        entry.set_time(first if index == 1 else second)
+
+        if pair_occurrences[key] == 1:
+            entry.pair = f"{base_pair}/1" if entry.duration == 1 else base_pair
+
+
+class ScheduleIndex:
+    """
+    Расписание всех групп из одной книги: колонка группы -> день -> пары (Lesson).
+    Ключи дней — в нижнем регистре, в самих парах день остаётся как в книге.
+    """
+
+    def __init__(self, columns=None, header_cells=None, build_seconds=0.0):
+        self.columns = columns or {}            # колонка -> {день: [пары]}
+        self.header_cells = header_cells or []  # [(текст, колонка)] шапки по порядку
+        self.build_seconds = build_seconds
+        self.version = None                     # sha256 книги, из которой построен индекс
+        self.groups = {                         # название группы -> колонка
+            name: column for name, column in _header_groups(self.header_cells).items()
+            if column in self.columns
+        }
+        self._lookup = {}
+        self._memory_bytes = None
+
+    def find_column(self, group_name):
+        # Та же семантика, что у find_group_column: первая ячейка шапки с группой.
+        # Запоминаются только найденные колонки — промахи по произвольным
+        # строкам из запроса копили бы память без предела
+        if group_name in self._lookup:
+            return self._lookup[group_name]
+        column = next((column for text, column in self.header_cells if group_name in text), None)
+        if column is not None:
+            self._lookup[group_name] = column
+        return column
+
+    def get_days(self, group_name):
+        column = self.find_column(group_name)
+        if column is None:
             return None
+        return self.columns.get(column)
+
+    def lessons_for_day(self, group_name, day):
+        days = self.get_days(group_name) or {}
+        return days.get((day or "").strip().lower(), [])
 
-        schedule_data = {
+    def get_group_schedule(self, group_name):
+        days = self.get_days(group_name)
+        if days is None:
+            return None
+        return {
             "group": group_name,
-            "schedule": []
+            "schedule": [lesson.to_dict() for lessons in days.values() for lesson in lessons]
+        }
+
+    @property
+    def memory_bytes(self):
+        if self._memory_bytes is None:
+            self._memory_bytes = _deep_sizeof(self.columns) + _deep_sizeof(self.header_cells)
+        return self._memory_bytes
+
+    def stats(self):
+        return {
+            "groups": len(self.groups),
+            "lessons": sum(len(l) for days in self.columns.values() for l in days.values()),
+            "build_seconds": round(self.build_seconds, 4),
+            "memory_bytes": self.memory_bytes
         }
-        
-        current_day = None
-        current_time = None
-        pair_counts = defaultdict(int)
 
-        for row in sheet.iter_rows(min_row=3): 
-            row_values = [cell.value for cell in row]
+    def to_dict(self):
+        return {
+            "columns": {
+                str(column): {day: [lesson.to_dict() for lesson in lessons] for day, lessons in days.items()}
+                for column, days in self.columns.items()
+            },
+            "header_cells": [list(cell) for cell in self.header_cells],
+            "build_seconds": self.build_seconds
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            columns={
+                int(column): {day: [Lesson.from_dict(lesson) for lesson in lessons] for day, lessons in days.items()}
+                for column, days in data.get("columns", {}).items()
+            },
+            header_cells=[tuple(cell) for cell in data.get("header_cells", [])],
+            build_seconds=data.get("build_seconds", 0.0)
+        )
+
 
-            day_cell_value = row_values[1] if len(row_values) > 1 else None
-            time_cell_value = row_values[2] if len(row_values) > 2 else None
+class _IndexBuilder:
+    def __init__(self, columns):
+        self.group_columns = columns
+        self.lessons = {column: [] for column in columns}
+        self.pair_counts = {column: defaultdict(int) for column in columns}
+        self.current_day = None
+        self.current_time = None
 
-            if day_cell_value:
-                current_day = str(day_cell_value).strip()
-            if time_cell_value:
-                current_time = str(time_cell_value).strip()
+    def add_row(self, row_values, colors):
+        day_cell_value = row_values[1] if len(row_values) > 1 else None
+        time_cell_value = row_values[2] if len(row_values) > 2 else None
 
-            pair_number = None
-            clean_time = current_time
-            parts = current_time.split() if current_time else []
-            if parts and parts[0].isdigit():
-                pair_number = parts[0]
-                clean_time = " ".join(parts[1:]) if len(parts) > 1 else current_time
+        if day_cell_value:
+            self.current_day = str(day_cell_value).strip()
+        if time_cell_value:
+            self.current_time = str(time_cell_value).strip()
 
+        pair_number = None
+        clean_time = self.current_time
+        parts = self.current_time.split() if self.current_time else []
+        if parts and parts[0].isdigit():
+            pair_number = parts[0]
+            clean_time = " ".join(parts[1:]) if len(parts) > 1 else self.current_time
+
+        for column_index in self.group_columns:
             subject_cell = row_values[column_index] if column_index < len(row_values) else None
+            if not subject_cell:
+                continue
             room_cell = row_values[column_index + 1] if column_index + 1 < len(row_values) else None
 
-            if subject_cell:
-                key = (current_day, pair_number)
-                pair_counts[key] += 1
-
-                color_type = interpret_color(row[column_index])
-                week_type = None
-                duration = 2
-
-                if color_type == "upper":
-                    week_type = "upper"
-                elif color_type == "lower":
-                    week_type = "lower"
-                elif color_type == "hour":
-                    duration = 1
-
-                indexed_pair = f"{pair_number}/{pair_counts[key]}" if pair_number else None
-
-                pair_info = {
-                    "day": current_day,
-                    "time": clean_time,
-                    "raw_time": clean_time,
-                    "pair": indexed_pair,
-                    "room": str(room_cell).strip() if room_cell else "",
-                    "subject": str(subject_cell).strip() if subject_cell else "",
-                    "week_type": week_type,
-                    "duration": duration
-                }
-
-                schedule_data["schedule"].append(pair_info)
-
-        pair_occurrences = Counter((p["day"], p["pair"].split("/")[0]) for p in schedule_data["schedule"] if p.get("pair"))
-        interval_cache = {}
-
-        for entry in schedule_data["schedule"]:
-            pair_raw = entry.get("pair")
-            if not pair_raw or "/" not in pair_raw:
+            key = (self.current_day, pair_number)
+            pair_counts = self.pair_counts[column_index]
+            pair_counts[key] += 1
+
+            color_type = colors[column_index]
+            week_type = None
+            duration = 2
+
+            if color_type == "upper":
+                week_type = "upper"
+            elif color_type == "lower":
+                week_type = "lower"
+            elif color_type == "hour":
+                duration = 1
+
+            indexed_pair = f"{pair_number}/{pair_counts[key]}" if pair_number else None
+
+            self.lessons[column_index].append(Lesson(
+                day=self.current_day,
+                time=clean_time,
+                raw_time=clean_time,
+                pair=indexed_pair,
+                room=str(room_cell).strip() if room_cell else "",
+                subject=str(subject_cell).strip() if subject_cell else "",
+                week_type=week_type,
+                duration=duration
+            ))
+
+    def finish(self):
+        columns = {}
+        for column_index, lessons in self.lessons.items():
+            _assign_intervals(lessons)
+            days = {}
+            for lesson in lessons:
+                days.setdefault((lesson.day or "").lower(), []).append(lesson)
+            columns[column_index] = days
+        return columns
+
+def _header_groups(header_cells):
+    """
+    Название группы -> колонка по тому же правилу, что find_column: первая
+    ячейка шапки, в тексте которой есть название.
+    """
+    groups = {}
+    for text, _ in header_cells:
+        for name in GROUP_NAME_PATTERN.findall(text):
+            if name not in groups:
+                groups[name] = next(column for cell_text, column in header_cells if name in cell_text)
+    return groups
+
+def _find_group_columns(header_cells):
+    # Индексируются колонки всех непустых ячеек шапки, а не только совпавших
+    # с GROUP_NAME_PATTERN: find_column ищет подстроку, как find_group_column,
+    # и группа с непривычным названием ("рс02-24", "ТЭОС02-24 вечер") иначе
+    # находилась бы в шапке, но без пар
+    return sorted({column for _, column in header_cells})
+
+def _starts_data(row_idx, row_values):
+    # Шапка кончается на первой строке с днём недели в колонке B
+    if row_idx > HEADER_MAX_ROW:
+        return True
+    return row_idx >= DATA_MIN_ROW and len(row_values) > 1 and bool(row_values[1])
+
+def build_schedule_index(rows):
+    """
+    Строит ScheduleIndex за один проход по строкам листа (см. iter_sheet_rows).
+    Шапка — строки до первого дня недели: ячейки пар ("УК1" и т.п.) в неё
+    не попадают и не становятся группами. Строки с 3-й до конца шапки
+    буферизуются, пока не станут известны колонки всех групп.
+    """
+    started = time.perf_counter()
+    header_cells = []
+    buffered = []
+    builder = None
+    in_header = True
+
+    for row_idx, row_values, colors in rows:
+        if in_header and _starts_data(row_idx, row_values):
+            in_header = False
+        if in_header:
+            for column, value in enumerate(row_values, start=1):
+                if value and isinstance(value, str):
+                    header_cells.append((value, column))
+        if row_idx < DATA_MIN_ROW:
+            continue
+
+        if builder is None:
+            if in_header:
+                buffered.append((row_values, colors))
                 continue
+            builder = _IndexBuilder(_find_group_columns(header_cells))
+            for buffered_values, buffered_colors in buffered:
+                builder.add_row(buffered_values, buffered_colors)
+            buffered = None
+
+        builder.add_row(row_values, colors)
+
+    if builder is None:
+        builder = _IndexBuilder(_find_group_columns(header_cells))
+        for buffered_values, buffered_colors in buffered:
+            builder.add_row(buffered_values, buffered_colors)
+
+    return ScheduleIndex(
+        columns=builder.finish(),
+        header_cells=header_cells,
+        build_seconds=time.perf_counter() - started
+    )
 
-            base_pair = pair_raw.split("/")[0]
-            index = int(pair_raw.split("/")[1])
-            key = (entry["day"], base_pair)
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return (
+        os.path.join(EXCEL_CACHE_DIR, f"{key}.json"),
+        os.path.join(EXCEL_CACHE_DIR, f"{key}.xlsx"),
+        os.path.join(EXCEL_CACHE_DIR, f"{key}.index.json"),
+    )
 
-            if key not in interval_cache:
-                interval_cache[key] = split_time_interval(entry["time"])
+def _new_cache_entry(url, content, etag=None, last_modified=None):
+    return {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "checked_at": time.time(),
+        "content": content,
+        "index": None       # ScheduleIndex всех групп, строится один раз на версию книги
+    }
 
-            first, second = interval_cache[key]
-            entry["time"] = first if index == 1 else second
+def _load_cache_entry(url):
+    """
+    Возвращает запись кэша для url: сначала из памяти, затем с диска.
+    None — если книга ещё ни разу не скачивалась.
+    """
+    entry = _excel_cache.get(url)
+    if entry is not None:
+        return entry
+
+    meta_path, data_path, index_path = _cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            content = f.read()
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if hashlib.sha256(content).hexdigest() != meta.get("sha256"):
+        return None
+
+    entry = _new_cache_entry(url, content, meta.get("etag"), meta.get("last_modified"))
+    entry["checked_at"] = meta.get("checked_at", 0)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index_data = json.load(f)
+        if index_data.get("sha256") == entry["sha256"] and index_data.get("format") == INDEX_FORMAT:
+            entry["index"] = ScheduleIndex.from_dict(index_data)
+    except (FileNotFoundError, ValueError):
+        pass
+    _excel_cache[url] = entry
+    return entry
+
+def _write_file(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _save_cache_entry(entry, with_content=False, with_index=False):
+    meta_path, data_path, index_path = _cache_paths(entry["url"])
+    try:
+        os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+        if with_content:
+            _write_file(data_path, entry["content"])
+        if with_index and entry["index"] is not None:
+            index_data = entry["index"].to_dict()
+            index_data["sha256"] = entry["sha256"]
+            index_data["format"] = INDEX_FORMAT
+            _write_file(index_path, json.dumps(index_data, ensure_ascii=False).encode("utf-8"))
 
-            if pair_occurrences[key] == 1:
-                entry["pair"] = f"{base_pair}/1" if entry.get("duration") == 1 else base_pair
+        meta = {k: entry[k] for k in ("url", "etag", "last_modified", "sha256", "checked_at")}
+        _write_file(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить кэш Excel: {e}")
 
+async def fetch_excel_workbook_async(url):
+    """
+    Скачивает книгу условным запросом (If-None-Match / If-Modified-Since).
+    Пока книга свежее EXCEL_CACHE_TTL — на сервер не ходим вообще.
+    Индекс групп перестраивается, только если сервер вернул новые байты.
+    Возвращает запись кэша.
+    """
+    entry = _load_cache_entry(url)
+    if entry is not None and time.time() - entry["checked_at"] < EXCEL_CACHE_TTL:
+        return entry
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = await http_client.fetch(url, headers=headers)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+
+    if response.status_code == 304 and entry is not None:
+        entry["checked_at"] = time.time()
+        entry["etag"] = etag or entry["etag"]
+        entry["last_modified"] = last_modified or entry["last_modified"]
+        _save_cache_entry(entry)
+        return entry
+
+    response.raise_for_status()
+    content = response.content
+
+    # Сервер мог не поддержать условный запрос — сверяем содержимое по хэшу
+    if entry is not None and hashlib.sha256(content).hexdigest() == entry["sha256"]:
+        entry["checked_at"] = time.time()
+        entry["etag"] = etag
+        entry["last_modified"] = last_modified
+        _save_cache_entry(entry)
+        return entry
+
+    entry = _new_cache_entry(url, content, etag, last_modified)
+    _excel_cache[url] = entry
+    await asyncio.to_thread(_save_cache_entry, entry, True)
+    return entry
+
+def parse_workbook_content(content):
+    """
+    Байты книги -> ScheduleIndex. Чистая функция без общего состояния,
+    поэтому её можно выполнять в отдельном процессе (см. ingest.py).
+    Потоковое чтение: без объектной модели openpyxl, но с цветами заливки.
+    """
+    index = build_schedule_index(xlsx_stream.iter_rows(content))
+    index.stats()  # размер считается здесь же, а не в процессе сервера
+    return index
+
+async def get_excel_index_async(url, run_job=None):
+    """
+    Индекс всех групп для текущей версии книги. Книга разбирается один раз
+    на версию, дальше любые группы читаются из индекса. run_job(func, *args) —
+    где выполнять разбор: по умолчанию отдельный поток. Одновременные вызовы
+    с той же ссылкой ждут одну загрузку (см. single_flight.py).
+    """
+    return await schedule_flights.do(("excel_index", url), _get_excel_index_async, url, run_job)
+
+async def _get_excel_index_async(url, run_job=None):
+    entry = await fetch_excel_workbook_async(url)
+    if entry["index"] is None:
+        run_job = run_job or asyncio.to_thread
+        entry["index"] = await run_job(parse_workbook_content, entry["content"])
+        print(f"📊 Индекс расписания построен: {entry['index'].stats()}")
+        await asyncio.to_thread(_save_cache_entry, entry, False, True)
+    entry["index"].version = entry["sha256"]
+    return entry["index"]
+
+async def get_excel_schedule_async(url, group_name):
+    return await schedule_flights.do(("excel_schedule", url, group_name), _get_excel_schedule_async, url, group_name)
+
+async def _get_excel_schedule_async(url, group_name):
+    try:
+        index = await get_excel_index_async(url)
+
+        schedule_data = index.get_group_schedule(group_name)
+        if schedule_data is None:
+            print(f"Ошибка: Не удалось найти столбец для группы {group_name}.")
         return schedule_data
-        
-    except requests.exceptions.RequestException as e:
+
+    except http_client.HTTPError as e:
         print(f"Ошибка при скачивании файла: {e}")
         return None
     except Exception as e:
         print(f"Ошибка при обработке файла Excel: {e}")
         return None
 
+# 🔁 Синхронные обёртки для CLI и старого кода
+
+def fetch_excel_workbook(url):
+    return http_client.run_sync(fetch_excel_workbook_async, url)
+
+def get_excel_index(url):
+    return http_client.run_sync(get_excel_index_async, url)
+
+def get_excel_schedule(url, group_name):
+    return http_client.run_sync(get_excel_schedule_async, url, group_name)
+
 if __name__ == '__main__':
     EXCEL_URL = "http://www.bobruisk.belstu.by/uploads/b1/s/8/648/basic/117/614/Raspisanie_uchebnyih_zanyatiy_na_2025-2026_uch.god_1_semestr.xlsx?t=1756801696"
     MY_GROUP = "РС02-24"
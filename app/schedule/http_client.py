@@ -0,0 +1,175 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+# 🌐 Общий HTTP-клиент для скраперов: пул keep-alive соединений, явные
+# таймауты, ограничение параллельных запросов и повтор с экспоненциальной паузой.
+# Для каждого хоста — предохранитель: после серии неудач запросы к нему
+# сразу завершаются ошибкой, пока не пройдёт пауза.
+
+CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("SCRAPER_READ_TIMEOUT", "30"))
+MAX_CONCURRENCY = int(os.environ.get("SCRAPER_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.environ.get("SCRAPER_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.environ.get("SCRAPER_BACKOFF_BASE", "0.5"))
+# Сколько неудачных запросов подряд размыкают цепь и на сколько секунд
+BREAKER_FAILURES = int(os.environ.get("SCRAPER_BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.environ.get("SCRAPER_BREAKER_RESET", "60"))
+
+# Ответы, после которых есть смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HTTPError = httpx.HTTPError
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Хост недавно не отвечал — запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель одного хоста. closed — запросы идут как обычно;
+    после BREAKER_FAILURES неудач подряд — open: запросы отклоняются
+    без обращения к сети; через BREAKER_RESET секунд — half_open:
+    пропускается один пробный запрос, его успех замыкает цепь.
+    """
+
+    def __init__(self, host, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.host = host
+        self.max_failures = failures
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        # Пробный запрос один; если он так и не завершился (отменён) — через паузу ещё один
+        now = time.monotonic()
+        if state == "half_open" and (self._probe_started is None or now - self._probe_started >= self.reset_after):
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_started = None
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            if self.opened_at is None:
+                print(f"🔌 {self.host}: {self.failures} ошибок подряд, запросы приостановлены на {self.reset_after:.0f} с")
+            self.opened_at = time.monotonic()
+
+    def status(self):
+        return {"state": self.state, "failures": self.failures}
+
+
+_breakers = {}
+
+
+def breaker_for(url):
+    host = urlsplit(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+def breakers_status():
+    return {host: breaker.status() for host, breaker in _breakers.items()}
+
+
+class _LoopState:
+    # asyncio-примитивы привязаны к циклу событий, поэтому клиент и семафор свои на каждый цикл
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+            follow_redirects=True
+        )
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+_states = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None or state.client.is_closed:
+        state = _LoopState()
+        _states[loop] = state
+    return state
+
+
+def _backoff(attempt):
+    return BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+
+
+async def fetch(url, headers=None):
+    """
+    GET через общий пул. Сетевые ошибки и ответы из RETRY_STATUSES
+    повторяются до MAX_RETRIES раз; в паузе между попытками слот
+    параллельности освобождается. Возвращает httpx.Response.
+    Если цепь хоста разомкнута — сразу CircuitOpenError.
+    """
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.host} недоступен, повтор не раньше чем через {breaker.reset_after:.0f} с")
+
+    state = _state()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with state.semaphore:
+                response = await state.client.get(url, headers=headers)
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            if attempt == MAX_RETRIES:
+                breaker.record_failure()
+                return response
+            print(f"⚠️ {url}: ответ {response.status_code}, повтор {attempt + 1}/{MAX_RETRIES}")
+        except httpx.TransportError as e:
+            if attempt == MAX_RETRIES:
+                breaker.record_failure()
+                raise
+            print(f"⚠️ {url}: {e!r}, повтор {attempt + 1}/{MAX_RETRIES}")
+        await asyncio.sleep(_backoff(attempt))
+
+
+async def aclose():
+    state = _states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+def run_sync(func, *args, **kwargs):
+    """
+    Синхронная обёртка для CLI (__main__): выполняет корутину в своём
+    цикле событий и закрывает клиент этого цикла.
+    """
+    async def runner():
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            await aclose()
+    return asyncio.run(runner())
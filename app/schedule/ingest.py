@@ -0,0 +1,152 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.schedule.excel_scraper import get_excel_index_async
+from app.schedule.doc_scraper import (
+    has_docx_url_changed,
+    fetch_latest_docx_url_async,
+    get_docx_tables_async
+)
+
+# ⚙️ Загрузка источников расписания: книга и документ замен скачиваются
+# одновременно, а разбираются в отдельных процессах — у каждого источника свой
+# процесс, поэтому разбор идёт параллельно и не держит GIL сервера.
+# Время обновления — максимум из двух источников, а не их сумма.
+
+PARSE_TIMEOUT = float(os.environ.get("SCHEDULE_PARSE_TIMEOUT", "60"))
+# 0 — разбирать в потоках (например, там, где процессы запускать нельзя)
+PARSE_IN_PROCESS = os.environ.get("SCHEDULE_PARSE_IN_PROCESS", "1") != "0"
+
+SOURCES = ("excel", "docx")
+
+
+class PoolUnavailable(Exception):
+    """Пул процессов разбора не принимает задачи — разбор идёт в потоке."""
+
+
+class IngestCoordinator:
+    """
+    Скачивает и разбирает оба источника, записывая время стадий:
+    {"excel": {"total", "parse"}, "docx": {"total", "parse"}, "wall"} в секундах.
+    total включает скачивание; parse — только разбор (0, если версия уже в кэше).
+    """
+
+    def __init__(self, parse_timeout=PARSE_TIMEOUT, use_processes=PARSE_IN_PROCESS):
+        self.parse_timeout = parse_timeout
+        self.use_processes = use_processes
+        self._pools = {}
+
+    def _pool(self, source):
+        pool = self._pools.get(source)
+        if pool is None:
+            # spawn: сервер многопоточный, fork из него небезопасен
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self._pools[source] = pool
+        return pool
+
+    def _kill_pool(self, source):
+        # Зависший разбор не отменить — процесс завершается вместе с пулом
+        pool = self._pools.pop(source, None)
+        if pool is None:
+            return
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, source, func, *args):
+        """
+        Задача в пул источника. PoolUnavailable — пул закрыт («cannot
+        schedule new futures after shutdown») или его процесс упал.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._pool(source), func, *args)
+        except RuntimeError as e:
+            # submit закрытого или сломанного пула; BrokenProcessPool — тоже RuntimeError
+            raise PoolUnavailable(source) from e
+
+        async def result():
+            try:
+                return await future
+            except BrokenProcessPool as e:
+                raise PoolUnavailable(source) from e
+        return result()
+
+    def job_runner(self, source, timings):
+        """run_job для get_excel_index_async / get_docx_tables_async."""
+        async def run_job(func, *args):
+            started = time.perf_counter()
+            try:
+                if self.use_processes:
+                    try:
+                        future = self._submit(source, func, *args)
+                        return await asyncio.wait_for(future, self.parse_timeout)
+                    except PoolUnavailable as e:
+                        # процесс не запустился или упал — разбираем в потоке;
+                        # RuntimeError самого разбора сюда не попадает
+                        print(f"⚠️ Пул разбора {source} недоступен ({e.__cause__ or e}), разбор в потоке")
+                        self._kill_pool(source)
+                return await asyncio.wait_for(asyncio.to_thread(func, *args), self.parse_timeout)
+            except asyncio.TimeoutError:
+                if self.use_processes:
+                    self._kill_pool(source)
+                raise TimeoutError(f"Разбор {source} дольше {self.parse_timeout:.0f} с")
+            finally:
+                timings["parse"] = time.perf_counter() - started
+        return run_job
+
+    async def ingest_excel(self, url, timings):
+        started = time.perf_counter()
+        try:
+            return await get_excel_index_async(url, run_job=self.job_runner("excel", timings))
+        finally:
+            timings["total"] = time.perf_counter() - started
+
+    async def ingest_docx(self, page_url, timings):
+        started = time.perf_counter()
+        try:
+            docx_url = await fetch_latest_docx_url_async(page_url)
+            if not docx_url:
+                return None
+            # запись индекса документов на диск — не в цикле событий
+            if await asyncio.to_thread(has_docx_url_changed, docx_url):
+                print(f"🔄 Обнаружена новая ссылка на замены: {docx_url}")
+            # Каждая версия документа скачивается и разбирается один раз
+            return await get_docx_tables_async(docx_url, run_job=self.job_runner("docx", timings))
+        except Exception as e:
+            # без замен показываем основное расписание
+            print("Ошибка при загрузке DOCX:", e)
+            timings["error"] = str(e)
+            return None
+        finally:
+            timings["total"] = time.perf_counter() - started
+
+    async def ingest(self, excel_url, doc_page_url):
+        """
+        (ScheduleIndex, запись DOCX или None, время стадий). Ошибка книги
+        пробрасывается после того, как документ замен тоже загрузится.
+        """
+        timings = {source: {"total": 0.0, "parse": 0.0} for source in SOURCES}
+        started = time.perf_counter()
+        excel_index, docx_entry = await asyncio.gather(
+            self.ingest_excel(excel_url, timings["excel"]),
+            self.ingest_docx(doc_page_url, timings["docx"]),
+            return_exceptions=True
+        )
+        timings["wall"] = time.perf_counter() - started
+        if isinstance(excel_index, BaseException):
+            raise excel_index
+        if isinstance(docx_entry, BaseException):
+            raise docx_entry
+        return excel_index, docx_entry, timings
+
+    def shutdown(self):
+        for source in list(self._pools):
+            self._pools.pop(source).shutdown(wait=False, cancel_futures=True)
+
+
+ingest_coordinator = IngestCoordinator()
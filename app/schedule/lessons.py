@@ -0,0 +1,108 @@
+import re
+import sys
+from enum import Enum
+from functools import lru_cache
+
+# 🧱 Компактное представление пары из книги Excel: объект со __slots__ вместо
+# словаря, повторяющиеся строки (дни, предметы, аудитории, время) интернируются,
+# время дополнительно хранится минутами от полуночи, тип недели — enum.
+# Шаблон и API по-прежнему получают словари — см. Lesson.to_dict.
+
+
+class WeekType(str, Enum):
+    # str-enum: сравнение с "upper"/"lower" продолжает работать
+    UPPER = "upper"
+    LOWER = "lower"
+
+
+# Те же правила, что у datetime.strptime(..., "%H:%M")
+_CLOCK = re.compile(r"(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)")
+
+
+def parse_clock(text):
+    """ "8.00" / "08:00" -> 480, иначе None. """
+    m = _CLOCK.fullmatch(text.replace(".", ":").strip())
+    if not m:
+        return None
+    return int(m.group(1)) * 60 + int(m.group(2))
+
+
+def format_clock(minutes):
+    # Как strftime('%H:%M') у datetime, перешедшего через полночь
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
+def normalize_dashes(time_str):
+    return time_str.replace("–", "-").replace("—", "-").strip()
+
+
+@lru_cache(maxsize=4096)
+def parse_time_range(time_str):
+    """
+    "8.00-9.35" -> (480, 575), None — если строка не разбирается.
+    Разбор один раз на уникальную строку, без strptime.
+    """
+    if not isinstance(time_str, str):
+        return None
+    parts = normalize_dashes(time_str).split("-")
+    if len(parts) != 2:
+        return None
+    start = parse_clock(parts[0])
+    end = parse_clock(parts[1])
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Lesson:
+    """
+    Пара одной группы. Поля те же, что у прежнего словаря из excel_scraper;
+    start/end — минуты от полуночи для time (None, если время не разобрано).
+    get() повторяет dict.get, поэтому слияние работает с парами как раньше.
+    """
+    __slots__ = ("day", "time", "raw_time", "pair", "room", "subject", "week_type", "duration", "start", "end")
+
+    FIELDS = ("day", "time", "raw_time", "pair", "room", "subject", "week_type", "duration")
+
+    def __init__(self, day, time, raw_time, pair, room, subject, week_type=None, duration=2):
+        self.day = _intern(day)
+        self.raw_time = _intern(raw_time)
+        self.pair = _intern(pair)
+        self.room = _intern(room)
+        self.subject = _intern(subject)
+        self.week_type = WeekType(week_type) if week_type else None
+        self.duration = duration
+        self.set_time(time)
+
+    def set_time(self, time):
+        self.time = _intern(time)
+        self.start, self.end = parse_time_range(time) or (None, None)
+
+    def get(self, key, default=None):
+        if key == "week_type":
+            return self.week_type.value if self.week_type else None
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def to_dict(self):
+        return {field: self.get(field) for field in Lesson.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data.get(field) for field in cls.FIELDS[:-1]), duration=data.get("duration", 2))
+
+    def __eq__(self, other):
+        if not isinstance(other, Lesson):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in Lesson.FIELDS)
+
+    def __repr__(self):
+        return f"Lesson({self.to_dict()!r})"
+
+
+_FIELD_SET = frozenset(Lesson.FIELDS)
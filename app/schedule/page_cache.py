@@ -0,0 +1,109 @@
+import os
+import hashlib
+from collections import OrderedDict
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен — без него обычный json
+    orjson = None
+    import json
+
+# 🗂 Кэш готовых ответов /schedule: HTML и JSON по ключу
+# (группа, целевые дни, версия книги, версия замен группы, формат). Новая версия
+# даёт новый ключ, старые записи вытесняются по LRU в пределах лимита байт.
+
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("SCHEDULE_PAGE_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+
+def dump_json(data):
+    """Сериализация ответа в байты UTF-8: orjson, если установлен."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body):
+    # Слабый ETag: хэш несжатого тела. GZipMiddleware сжимает ответ, не трогая
+    # заголовки, и сильный тег совпал бы у байтово разных gzip- и plain-вариантов
+    return 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Проверка If-None-Match: список тегов через запятую или "*".
+    Для If-None-Match сравнение слабое — префикс W/ не учитывается.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def conditional_response(request, page, headers=None):
+    """
+    Ответ из записи кэша: 304 без тела, если клиент прислал тот же ETag.
+    Cache-Control: no-cache — браузер и PWA всегда переспрашивают сервер.
+    """
+    headers = {"ETag": page["etag"], "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request.headers.get("if-none-match"), page["etag"]):
+        # На сжатый ответ Vary ставит GZipMiddleware, на 304 без тела — нет
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    return Response(page["body"], media_type=page["media_type"], headers=headers)
+
+
+class PageCache:
+    """LRU готовых ответов, ограниченный суммарным размером тел."""
+
+    def __init__(self, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+
+    def get(self, key):
+        page = self._pages.get(key)
+        if page is None:
+            self.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def put(self, key, body, media_type):
+        page = {"body": body, "etag": make_etag(body), "media_type": media_type}
+        if len(body) > self.max_bytes:
+            # больше всего кэша — отдаём, но не храним
+            return page
+
+        old = self._pages.pop(key, None)
+        if old is not None:
+            self.size -= len(old["body"])
+        self._pages[key] = page
+        self.size += len(body)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._pages.popitem(last=False)
+            self.size -= len(evicted["body"])
+        return page
+
+    def clear(self):
+        self._pages.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "pages": len(self._pages),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+schedule_page_cache = PageCache()
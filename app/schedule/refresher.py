@@ -0,0 +1,395 @@
+import os
+import sys
+import time
+import json
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+from datetime import date, timedelta
+
+# schedule_merger импортирует соседние модули без пакета — как и в main.py
+sys.path.append(str(Path(__file__).resolve().parent))
+from app.schedule import http_client, storage
+from app.schedule.ingest import ingest_coordinator
+from app.schedule.single_flight import schedule_flights
+from app.schedule.doc_scraper import (
+    get_replacement_index,
+    group_replacements,
+    normalize_group,
+    diff_replacement_indexes
+)
+from app.schedule.schedule_merger import merge_schedules, merge_week, merge_all_groups, normalize_day
+
+# 🌐 Источники расписания (можно переопределить через окружение)
+EXCEL_URL = os.environ.get(
+    "SCHEDULE_EXCEL_URL",
+    "http://www.bobruisk.belstu.by/uploads/b1/s/8/648/basic/117/614/Raspisanie_uchebnyih_zanyatiy_na_2025-2026_uch.god_1_semestr.xlsx?t=1756801696"
+)
+DOC_PAGE_URL = os.environ.get(
+    "SCHEDULE_DOC_PAGE_URL",
+    "http://www.bobruisk.belstu.by/dnevnoe-otdelenie/raspisanie-zanyatiy-i-zvonkov-zamenyi"
+)
+
+# ⏲ Период опроса в секундах и разброс (доля периода), чтобы не бить в сайт синхронно
+REFRESH_INTERVAL = int(os.environ.get("SCHEDULE_REFRESH_INTERVAL", "300"))
+REFRESH_JITTER = float(os.environ.get("SCHEDULE_REFRESH_JITTER", "0.2"))
+# Мягкий TTL: снимок старше — всё равно отдаётся сразу, но запрос запускает
+# одно фоновое обновление (stale-while-revalidate)
+SOFT_TTL = int(os.environ.get("SCHEDULE_SOFT_TTL", "600"))
+# Не чаще одного внеочередного обновления за столько секунд, пока сайт не отвечает
+REVALIDATE_COOLDOWN = int(os.environ.get("SCHEDULE_REVALIDATE_COOLDOWN", "30"))
+
+WEEKDAYS_RU = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+OTHER_WEEK = {"upper": "lower", "lower": "upper"}
+
+
+class ScheduleSnapshot:
+    """
+    Готовое расписание на момент обновления: индекс Excel, замены из DOCX
+    и объединённые пары по каждой группе и дню. После публикации не меняется,
+    кроме ленивого досчёта групп, которых не было в шапке книги.
+    """
+
+    def __init__(self, excel_index, docx_entry=None):
+        self.excel_index = excel_index
+        self.excel_version = excel_index.version
+        self.docx_entry = docx_entry
+        self.docx = docx_entry["parsed"] if docx_entry else None
+        self.docx_url = docx_entry["url"] if docx_entry else None
+        self.docx_version = docx_entry["sha256"] if docx_entry else None
+        self.built_at = time.time()
+        # Когда источники последний раз сверялись с сайтом; у снимка из базы — время сохранения
+        self.fresh_at = getattr(excel_index, "stored_at", None) or self.built_at
+        self.week_type = self.docx["week_type"] if self.docx else None
+        # Замены всех групп за один обход таблиц
+        self.replacements = get_replacement_index(docx_entry) if docx_entry else None
+        self.groups = {}  # группа -> {"doc_schedule": ..., "days": {день: [пары]}} или None
+        # Когда документ замен появился на сайте — от этой даты дни замен переводятся в даты
+        self.docx_published = docx_entry.get("first_seen", self.built_at) if docx_entry else None
+        self.replacement_dates = self._map_replacement_dates()
+        self._dated_days = {}  # (группа, день, тип недели, есть замены) -> день для /api/schedule
+        self.timings = None    # время стадий загрузки (build_snapshot_async), у снимка из базы — None
+        # Разница с прошлой версией документа (get_docx_tables_async) и версии замен по группам
+        self.docx_changes = docx_entry.get("changes") if docx_entry else None
+        self._replacement_versions = {}
+
+    def _map_replacement_dates(self):
+        """
+        Дни из документа замен -> конкретные даты: ближайший такой день
+        недели, начиная с даты публикации документа.
+        """
+        if not self.replacements:
+            return {}
+        labels = {normalize_day(label) for days in self.replacements.values() for label in days}
+        start = date.fromtimestamp(self.docx_published)
+        dates = {}
+        for offset in range(7):
+            day = start + timedelta(days=offset)
+            if normalize_day(WEEKDAYS_RU[day.weekday()]) in labels:
+                dates[day] = WEEKDAYS_RU[day.weekday()]
+        return dates
+
+    def week_type_on(self, day):
+        """
+        Тип недели на дату: неделя замен — как в документе, дальше
+        чередуется через неделю. Без документа — None (без фильтра).
+        """
+        if self.week_type not in OTHER_WEEK:
+            return None
+        reference = min(self.replacement_dates) if self.replacement_dates else date.fromtimestamp(self.docx_published)
+        weeks = ((day - timedelta(days=day.weekday())) - (reference - timedelta(days=reference.weekday()))).days // 7
+        return self.week_type if weeks % 2 == 0 else OTHER_WEEK[self.week_type]
+
+    def _group_week(self, group_name):
+        # (пары Excel по дням, замены группы) или None, если группы нет в книге
+        excel_days = self.excel_index.get_days(group_name)
+        if not excel_days or not any(excel_days.values()):
+            return None
+
+        doc_schedule = {"group": group_name, "schedule": []}
+        if self.replacements is not None:
+            doc_schedule = group_replacements(self.replacements, group_name, self.week_type)
+        return excel_days, doc_schedule
+
+    def _build_group(self, group_name):
+        week = self._group_week(group_name)
+        if week is None:
+            return None
+        excel_days, doc_schedule = week
+        return {"doc_schedule": doc_schedule, "days": merge_week(group_name, excel_days, doc_schedule)}
+
+    def changed_groups(self, previous):
+        """
+        Нормализованные названия групп, чьи замены отличаются от снимка
+        previous, или None, если пересчитывать нужно все группы.
+        """
+        if previous is None or previous.excel_version != self.excel_version or previous.week_type != self.week_type:
+            return None
+        if previous.docx_version == self.docx_version:
+            return set()
+        if previous.replacements is None or self.replacements is None:
+            return None
+        changes = self.docx_changes
+        if changes is not None and changes["previous"] == previous.docx_version:
+            return set(changes["groups"])
+        return set(diff_replacement_indexes(previous.replacements, self.replacements))
+
+    def replacements_version(self, group_name):
+        """
+        Версия замен одной группы — хэш её строк и типа недели. Кэш страниц
+        ключуется ею, а не хэшем всего документа: новая версия документа
+        сбрасывает страницы только тех групп, у которых что-то поменялось.
+        """
+        if self.replacements is None:
+            return None
+        key = normalize_group(group_name)
+        if key not in self._replacement_versions:
+            data = json.dumps([self.week_type, self.replacements.get(key, {})], ensure_ascii=False, sort_keys=True)
+            self._replacement_versions[key] = hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+        return self._replacement_versions[key]
+
+    def build_all(self, previous=None):
+        changed = self.changed_groups(previous)
+        if changed is not None:
+            print(f"🔀 Пересчёт групп с изменёнными заменами: {len(changed)}")
+
+        weeks = {}
+        for group_name in self.excel_index.groups:
+            if changed is not None and group_name in previous.groups and normalize_group(group_name) not in changed:
+                # Книга, тип недели и замены группы те же — неделя из прошлого снимка
+                self.groups[group_name] = previous.groups[group_name]
+                continue
+            week = self._group_week(group_name)
+            if week is None:
+                self.groups[group_name] = None
+            else:
+                weeks[group_name] = week
+
+        # Вся неделя всех групп — одним пакетным слиянием
+        for group_name, days in merge_all_groups(weeks).items():
+            self.groups[group_name] = {"doc_schedule": weeks[group_name][1], "days": days}
+
+    def get_group(self, group_name):
+        if group_name in self.groups:
+            return self.groups[group_name]
+        # Промах не запоминается: название приходит из запроса (?group=),
+        # и каждая опечатка иначе осталась бы в снимке до следующего
+        group = self._build_group(group_name)
+        if group is not None:
+            self.groups[group_name] = group
+        return group
+
+    def get_dated_day(self, group_name, day):
+        """
+        Пары группы на конкретную дату: пары Excel по типу недели этой даты,
+        замены — только если документ относится к ней. Одинаковые дни
+        разных недель считаются один раз на снимок. None — группы нет.
+        """
+        if self.get_group(group_name) is None:
+            return None
+        day_name = WEEKDAYS_RU[day.weekday()]
+        week_type = self.week_type_on(day)
+        replaced = day in self.replacement_dates
+
+        key = (group_name, day_name, week_type, replaced)
+        if key not in self._dated_days:
+            excel_days, doc_schedule = self._group_week(group_name)
+            doc_items = [
+                item for item in doc_schedule.get("schedule", [])
+                if normalize_day(item.get("day")) == normalize_day(day_name)
+            ] if replaced else []
+            merged = merge_schedules(
+                {"group": group_name, "schedule": excel_days.get(day_name.lower(), [])},
+                {"group": doc_schedule.get("group", group_name), "schedule": doc_items, "week_type": week_type}
+            )
+            self._dated_days[key] = {
+                "day": day_name,
+                "week_type": week_type,
+                "replacements": replaced,
+                "lessons": merged["schedule"]
+            }
+        return {"date": day.isoformat(), **self._dated_days[key]}
+
+
+async def build_snapshot_async(excel_url=EXCEL_URL, doc_page_url=DOC_PAGE_URL, previous=None, coordinator=None):
+    """
+    Скачивает и разбирает оба источника параллельно (см. ingest.py), затем
+    считает расписания всех групп в потоке. Из снимка previous переносятся
+    группы, которых изменения не коснулись. Время стадий — в snapshot.timings.
+    """
+    coordinator = coordinator or ingest_coordinator
+    excel_index, docx_entry, timings = await coordinator.ingest(excel_url, doc_page_url)
+    if docx_entry is None and "error" in timings["docx"] and previous is not None and previous.docx_entry:
+        # Документ замен не скачался — остаются прежние замены, а не пустые
+        print("↩️ Замены из прошлого снимка")
+        docx_entry = previous.docx_entry
+
+    def build():
+        started = time.perf_counter()
+        snapshot = ScheduleSnapshot(excel_index, docx_entry)
+        snapshot.build_all(previous)
+        timings["merge"] = time.perf_counter() - started
+        snapshot.timings = timings
+        return snapshot
+
+    return await asyncio.to_thread(build)
+
+
+def build_snapshot(excel_url=EXCEL_URL, doc_page_url=DOC_PAGE_URL, previous=None):
+    return http_client.run_sync(build_snapshot_async, excel_url, doc_page_url, previous)
+
+
+def load_stored_snapshot():
+    """
+    Снимок из app.db без обращения к сайту. Группы досчитываются
+    лениво при первом запросе, поэтому загрузка занимает миллисекунды.
+    """
+    sources = storage.load_current_sources()
+    if sources is None:
+        return None
+    return ScheduleSnapshot(*sources)
+
+
+class ScheduleRefresher:
+    """
+    Фоновое обновление расписания. Запускается из lifespan FastAPI,
+    раз в interval (± jitter) собирает новый ScheduleSnapshot и публикует
+    его одной заменой ссылки — /schedule только читает. При старте сразу
+    публикуется снимок из app.db, новые версии источников сохраняются туда же.
+    Снимок старше soft_ttl по-прежнему отдаётся сразу; первый такой запрос
+    запускает внеочередное обновление, остальные ждут его же (см. revalidate).
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL, jitter=REFRESH_JITTER, soft_ttl=SOFT_TTL):
+        self.interval = interval
+        self.jitter = jitter
+        self.soft_ttl = soft_ttl
+        self.snapshot = None
+        self.last_error = None
+        self.last_duration = None
+        self._stored_versions = None
+        self._task = None
+        self._revalidation = None
+        self._revalidated_at = 0.0
+
+    def next_delay(self):
+        spread = self.interval * self.jitter
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+    async def refresh(self):
+        started = time.perf_counter()
+        snapshot = await build_snapshot_async(previous=self.snapshot)
+        self.last_duration = time.perf_counter() - started
+        self.snapshot = snapshot
+        self.last_error = None
+        print(f"✅ Расписание обновлено за {self.last_duration:.1f} с, групп: {len(snapshot.groups)}")
+        await self.persist(snapshot)
+
+    async def persist(self, snapshot):
+        # В базу пишутся только новые версии источников
+        versions = (snapshot.excel_version, snapshot.docx_version)
+        if versions == self._stored_versions:
+            return
+        try:
+            await asyncio.to_thread(storage.save_current_snapshot, snapshot)
+            self._stored_versions = versions
+        except Exception as e:
+            print("⚠️ Не удалось сохранить расписание в базу:", e)
+
+    def load_stored(self):
+        try:
+            started = time.perf_counter()
+            snapshot = load_stored_snapshot()
+        except Exception as e:
+            print("⚠️ Не удалось прочитать расписание из базы:", e)
+            return
+        if snapshot is not None:
+            self.snapshot = snapshot
+            self._stored_versions = (snapshot.excel_version, snapshot.docx_version)
+            print(f"💾 Расписание из базы за {(time.perf_counter() - started) * 1000:.0f} мс, "
+                  f"групп в книге: {len(snapshot.excel_index.groups)}")
+
+    async def _refresh_logged(self):
+        try:
+            await self.refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Снимок не меняется — пользователи видят последнее удачное расписание
+            self.last_error = str(e)
+            print("❌ Ошибка фонового обновления расписания:", e)
+
+    def revalidate(self):
+        """
+        Задача обновления снимка: новая, только если предыдущая уже завершилась.
+        Плановое обновление и запросы к устаревшему снимку разделяют одну задачу.
+        """
+        if self._revalidation is None or self._revalidation.done():
+            self._revalidated_at = time.monotonic()
+        self._revalidation = schedule_flights.start(("snapshot", EXCEL_URL, DOC_PAGE_URL), self._refresh_logged)
+        return self._revalidation
+
+    def is_stale(self, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        return snapshot is not None and time.time() - snapshot.fresh_at > self.soft_ttl
+
+    def revalidate_if_stale(self):
+        if self.snapshot is not None and not self.is_stale():
+            return
+        if time.monotonic() - self._revalidated_at >= REVALIDATE_COOLDOWN:
+            self.revalidate()
+
+    async def _run(self):
+        while True:
+            await asyncio.shield(self.revalidate())
+            await asyncio.sleep(self.next_delay())
+
+    def status(self):
+        """Состояние обновления для /api/schedule/status."""
+        snapshot = self.snapshot
+        return {
+            "ready": snapshot is not None,
+            "built_at": snapshot.built_at if snapshot else None,
+            "fresh_at": snapshot.fresh_at if snapshot else None,
+            "stale": self.is_stale(),
+            "revalidating": self._revalidation is not None and not self._revalidation.done(),
+            "breakers": http_client.breakers_status(),
+            "single_flight": schedule_flights.stats(),
+            "excel_version": snapshot.excel_version if snapshot else None,
+            "docx_version": snapshot.docx_version if snapshot else None,
+            "docx_url": snapshot.docx_url if snapshot else None,
+            "from_storage": snapshot is not None and snapshot.timings is None,
+            "timings": snapshot.timings if snapshot else None,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+            "interval": self.interval
+        }
+
+    def start(self):
+        # Сначала — сохранённый снимок, чтобы /schedule отвечал сразу после старта
+        if self.snapshot is None:
+            self.load_stored()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._revalidation is not None:
+            self._revalidation.cancel()
+            try:
+                await self._revalidation
+            except asyncio.CancelledError:
+                pass
+            self._revalidation = None
+        ingest_coordinator.shutdown()
+        await http_client.aclose()
+
+
+schedule_refresher = ScheduleRefresher()
@@ -22,6 +22,10 @@ weekday_map_eng_to_rus = {
     "Sunday": "Воскресенье"
 }
 
+# Шаблоны пар компилируются один раз — normalize_pair вызывается на каждую пару и замену
+PAIR_NUMBER_PATTERN = re.compile(r'(\d+)')
+PAIR_SORT_PATTERN = re.compile(r'\s*(\d+)(?:\s*/\s*(\d+))?')
+
 def normalize_day(day):
     return day.strip().lower().replace("ё", "е") if isinstance(day, str) else ""
 
@@ -33,8 +37,7 @@ def normalize_pair(pair):
     """
     if not pair:
         return None
-    s = str(pair)
-    m = re.search(r'(\d+)', s)
+    m = PAIR_NUMBER_PATTERN.search(str(pair))
     return m.group(1) if m else None
 
 def parse_pair_for_sort(pair):
@@ -45,13 +48,13 @@ def parse_pair_for_sort(pair):
     if not pair:
         return (9999, 9999)
     s = str(pair)
-    m = re.match(r'\s*(\d+)(?:\s*/\s*(\d+))?', s)
+    m = PAIR_SORT_PATTERN.match(s)
     if m:
         base = int(m.group(1))
         sub = int(m.group(2)) if m.group(2) else 0
         return (base, sub)
     # fallback: try to find first number
-    m2 = re.search(r'(\d+)', s)
+    m2 = PAIR_NUMBER_PATTERN.search(s)
     if m2:
         return (int(m2.group(1)), 0)
     return (9999, 9999)
@@ -111,7 +114,12 @@ def get_docx_schedule_from_doc(doc, group_name):
         print("❌ Ошибка при разборе docx-документа:", e)
         return None
 
-def merge_schedules(excel_data, doc_data):
+def merge_schedules_reference(excel_data, doc_data):
+    """
+    Исходное слияние перебором: для каждой пары Excel ищет замену по всему
+    списку, для каждой добавленной замены — время по всему Excel.
+    Оставлено эталоном для проверки merge_schedules (см. tests/test_merge.py).
+    """
     merged = {
         "group": excel_data.get("group"),
         "schedule": []
@@ -122,7 +130,8 @@ def merge_schedules(excel_data, doc_data):
 
     # Применяем замены по каждой записи Excel
     for lesson in excel_data.get("schedule", []):
-        pair_number = str(lesson.get("pair")).strip() if lesson.get("pair") else None
+        pair = lesson.get("pair")
+        pair_number = str(pair).strip() if pair else None
         day = lesson.get("day", "").strip()
         room = lesson.get("room", "")
         subject = lesson.get("subject", "")
@@ -226,6 +235,196 @@ def merge_schedules(excel_data, doc_data):
     return merged
 
 
+def _keyed(items, day=None):
+    """
+    [(день, базовая пара, запись)] — нормализация один раз на запись.
+    day — общий ключ дня для всех записей (день недели в merge_week).
+    """
+    return [
+        (normalize_day(item.get("day")) if day is None else day, normalize_pair(item.get("pair")), item)
+        for item in items
+    ]
+
+
+def _index_excel_lessons(lessons):
+    """
+    Один проход по парам Excel (из _keyed):
+    - base_pairs — (день, базовая пара) для пар с номером;
+    - raw_times — первое raw_time по (день, базовая пара);
+    - by_day — (пара, raw_time) по дням для поиска времени подгрупп "4/1".
+    """
+    base_pairs = set()
+    raw_times = {}
+    by_day = {}
+    for day, base, lesson in lessons:
+        key = (day, base)
+        pair = lesson.get("pair")
+        if pair:
+            base_pairs.add(key)
+        raw_time = lesson.get("raw_time")
+        if raw_time:
+            raw_times.setdefault(key, raw_time)
+            by_day.setdefault(day, []).append((str(lesson.get("pair", "")), raw_time))
+    return base_pairs, raw_times, by_day
+
+
+def _index_replacements(replacements):
+    # (день, базовая пара) -> первая подходящая замена, как next(...) в эталоне
+    index = {}
+    for day, base, r in replacements:
+        if base is not None:
+            index.setdefault((day, base), r)
+    return index
+
+
+def _merge_indexed(lessons, replacements, week_type, replacement_by_pair, excel_index):
+    """
+    Слияние по готовым индексам. lessons и replacements — из _keyed;
+    индексы могут быть построены и по более широкому списку (вся неделя):
+    ключи включают день, поэтому чужие дни не мешают.
+    """
+    excel_base_pairs, excel_raw_times, excel_by_day = excel_index
+    schedule = []
+
+    # Применяем замены по каждой записи Excel
+    for lesson_day, base, lesson in lessons:
+        pair = lesson.get("pair")
+        pair_number = str(pair).strip() if pair else None
+        day = lesson.get("day", "").strip()
+        room = lesson.get("room", "")
+        subject = lesson.get("subject", "")
+        lesson_week_type = lesson.get("week_type")
+        duration = lesson.get("duration")
+
+        if lesson_week_type and week_type and lesson_week_type != week_type:
+            continue
+        if duration == 1 and lesson_week_type == "upper" and week_type == "lower":
+            continue
+
+        replacement = None
+        if pair_number and base is not None:
+            replacement = replacement_by_pair.get((lesson_day, base))
+
+        display_pair = pair_number
+        time = lesson.get("time") if "/" in str(pair_number) else lesson.get("raw_time")
+
+        if replacement and "to" in replacement:
+            schedule.append({
+                "day": day,
+                "time": time,
+                "pair": replacement.get("pair", display_pair),
+                "room": replacement.get("room", room),
+                "subject": replacement["to"].get("subject") or subject,
+                "replaced_subject": subject
+            })
+        else:
+            schedule.append({
+                "day": day,
+                "time": time,
+                "pair": display_pair,
+                "room": room,
+                "subject": subject
+            })
+
+    # Добавляем замены, которых нет в Excel (например, добавленные пары)
+    for r_day, r_base, r in replacements:
+        if "pair" in r and "to" in r and r.get("day"):
+            if (r_day, r_base) in excel_base_pairs:
+                continue
+
+            time = None
+            if "/" in str(r["pair"]):
+                base_pair = str(r["pair"]).split("/")[0]
+                try:
+                    index = int(str(r["pair"]).split("/")[1])
+                except:
+                    index = None
+
+                excel_time = next(
+                    (raw_time for pair, raw_time in excel_by_day.get(r_day, ())
+                     if pair.startswith(base_pair)),
+                    None
+                )
+                if excel_time and index in (1,2):
+                    first, second = split_time_interval(excel_time)
+                    time = first if index == 1 else second
+            else:
+                time = excel_raw_times.get((r_day, r_base))
+
+            schedule.append({
+                "day": r["day"],
+                "time": time,
+                "pair": r["pair"],
+                "room": r.get("room", ""),
+                "subject": r["to"].get("subject", ""),
+                "replaced_subject": None
+            })
+        if "comment" in r:
+            schedule.append({"comment": r["comment"]})
+
+    schedule.sort(key=lambda item: parse_pair_for_sort(item.get("pair")))
+    return schedule
+
+
+def merge_schedules(excel_data, doc_data):
+    """
+    Объединяет пары Excel с заменами. Результат тот же, что у
+    merge_schedules_reference, но обе стороны индексируются один раз
+    по (день, базовая пара) — без вложенных переборов.
+    """
+    lessons = _keyed(excel_data.get("schedule", []))
+    replacements = _keyed(doc_data.get("schedule", []) if doc_data else [])
+    week_type = doc_data.get("week_type") if doc_data else None
+    return {
+        "group": excel_data.get("group"),
+        "schedule": _merge_indexed(
+            lessons, replacements, week_type,
+            _index_replacements(replacements), _index_excel_lessons(lessons)
+        )
+    }
+
+
+def _day_key(day):
+    return (day or "").strip().lower()
+
+
+def merge_week(group_name, excel_days, doc_schedule=None):
+    """
+    Неделя одной группы: excel_days — {день: [пары]} из индекса Excel,
+    doc_schedule — замены группы. Каждый день сливается отдельно, как на
+    странице /schedule, но индексы строятся один раз на всю неделю: ключ
+    дня — день недели, поэтому результат тот же, что у merge_schedules
+    по каждому дню. Возвращает {день: [объединённые пары]}.
+    """
+    lessons_by_day = {day_key: _keyed(lessons, day_key) for day_key, lessons in excel_days.items()}
+    doc_by_day = {}
+    for item in (doc_schedule or {}).get("schedule", []):
+        day_key = _day_key(item.get("day"))
+        doc_by_day.setdefault(day_key, []).append((day_key, normalize_pair(item.get("pair")), item))
+
+    replacement_by_pair = _index_replacements(r for items in doc_by_day.values() for r in items)
+    excel_index = _index_excel_lessons(l for items in lessons_by_day.values() for l in items)
+
+    days = {}
+    for day_key in list(excel_days) + [d for d in doc_by_day if d not in excel_days]:
+        days[day_key] = _merge_indexed(
+            lessons_by_day.get(day_key, ()), doc_by_day.get(day_key, ()), None,
+            replacement_by_pair, excel_index
+        )
+    return days
+
+
+def merge_all_groups(weeks):
+    """
+    Пакетное слияние: weeks — {группа: (excel_days, doc_schedule)}.
+    Возвращает {группа: {день: [объединённые пары]}}.
+    """
+    return {
+        group_name: merge_week(group_name, excel_days, doc_schedule)
+        for group_name, (excel_days, doc_schedule) in weeks.items()
+    }
+
+
 # ------------------ main (тестовый блок) ------------------
 if __name__ == '__main__':
     EXCEL_URL = "http://www.bobruisk.belstu.by/uploads/b1/s/8/648/basic/117/614/Raspisanie_uchebnyih_zanyatiy_na_2025-2026_uch.god_1_semestr.xlsx?t=1756801696"
@@ -243,29 +442,19 @@ if __name__ == '__main__':
     if DOCX_URL:
         doc_updated = has_docx_url_changed(DOCX_URL)
         print(f"🔄 Обнаружена новая ссылка на замены: {doc_updated}")
-        temp_doc_schedule = get_docx_schedule(MY_GROUP, DOC_PAGE_URL)
+        temp_doc_schedule = get_docx_schedule(MY_GROUP, DOC_PAGE_URL, docx_url=DOCX_URL)
         if temp_doc_schedule:
             doc_schedule = temp_doc_schedule
         else:
             print("❌ doc_scraper вернул None или пустые данные.")
     else:
-        # fallback: попробуем загрузить DOCX по последней сохранённой ссылке в кэше
-        try:
-            cache_path = ds.CACHE_FILE
-            if os.path.exists(cache_path):
-                with open(cache_path, "r", encoding="utf-8") as f:
-                    last_url = f.read().strip()
-                if last_url:
-                    print("⚠️ fetch_latest_docx_url вернул None — пытаюсь загрузить из кэше:", last_url)
-                    try:
-                        doc = ds.load_docx_from_url(last_url)
-                        temp_doc_schedule = get_docx_schedule_from_doc(doc, MY_GROUP)
-                        if temp_doc_schedule:
-                            doc_schedule = temp_doc_schedule
-                    except Exception as e:
-                        print("❌ Ошибка при загрузке/парсинге DOCX по кешу:", e)
-        except Exception as e:
-            print("❌ Ошибка при чтении кеш-файла:", e)
+        # fallback: последняя известная ссылка — сам документ уже лежит в кэше замен
+        last_url = ds.get_last_docx_url()
+        if last_url:
+            print("⚠️ fetch_latest_docx_url вернул None — беру замены из кэша:", last_url)
+            temp_doc_schedule = get_docx_schedule(MY_GROUP, docx_url=last_url)
+            if temp_doc_schedule:
+                doc_schedule = temp_doc_schedule
 
     if not excel_schedule:
         print("❌ Ошибка при получении основного расписания.")
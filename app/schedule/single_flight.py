@@ -0,0 +1,64 @@
+import asyncio
+
+# 🛬 Объединение одинаковых запросов: пока загрузка по ключу (источник, ссылка,
+# группа) идёт, следующие вызовы с тем же ключом ждут её результат, а не
+# запускают свою. Счётчики показывают, сколько вызовов удалось объединить.
+
+
+class SingleFlight:
+    """
+    Ключ — кортеж, первый элемент которого — вид загрузки ("excel_index",
+    "docx", ...): по нему ведутся счётчики. Результат не кэшируется —
+    после завершения следующий вызов снова выполняет функцию.
+    """
+
+    def __init__(self):
+        self._flights = {}   # ключ -> asyncio.Task
+        self._counters = {}  # вид -> {"calls", "executions", "coalesced"}
+
+    def _count(self, key, field):
+        kind = key[0] if isinstance(key, tuple) else key
+        counters = self._counters.setdefault(kind, {"calls": 0, "executions": 0, "coalesced": 0})
+        counters["calls"] += 1
+        counters[field] += 1
+
+    def _forget(self, key, task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # ошибку уже получили ожидающие; если их не осталось — не шумим в лог
+        if not task.cancelled():
+            task.exception()
+
+    def start(self, key, func, *args, **kwargs):
+        """Задача загрузки по ключу: уже идущая или новая func(*args, **kwargs)."""
+        loop = asyncio.get_running_loop()
+        task = self._flights.get(key)
+        # задача другого цикла событий (run_sync в CLI) не подходит
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self._count(key, "coalesced")
+            return task
+
+        self._count(key, "executions")
+        task = loop.create_task(func(*args, **kwargs))
+        self._flights[key] = task
+        task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        return task
+
+    async def do(self, key, func, *args, **kwargs):
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(self.start(key, func, *args, **kwargs))
+
+    def stats(self):
+        totals = {"calls": 0, "executions": 0, "coalesced": 0}
+        for counters in self._counters.values():
+            for field in totals:
+                totals[field] += counters[field]
+        return {
+            **totals,
+            "in_flight": len(self._flights),
+            "by_kind": {kind: dict(counters) for kind, counters in self._counters.items()}
+        }
+
+
+# Общий для скраперов и фонового обновления
+schedule_flights = SingleFlight()
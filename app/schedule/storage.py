@@ -0,0 +1,212 @@
+import json
+import time
+from datetime import timezone
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import ScheduleSource, ExcelLesson, Replacement
+from app.schedule.excel_scraper import ScheduleIndex
+from app.schedule.lessons import Lesson
+
+# 💾 Снимок разобранного расписания в app.db: пары Excel и замены DOCX
+# по версиям источников. При старте снимок читается одним запросом на таблицу,
+# и /schedule работает сразу, пока фоновое обновление идёт с сайта.
+
+EXCEL_FIELDS = ("day_label", "time", "raw_time", "pair", "room", "subject", "week_type", "duration")
+
+
+def _find_source(db: Session, kind, sha256):
+    return db.query(ScheduleSource).filter(ScheduleSource.kind == kind, ScheduleSource.sha256 == sha256).first()
+
+
+def _save_excel(db: Session, index):
+    source = ScheduleSource(
+        kind="excel",
+        sha256=index.version,
+        header_cells=json.dumps([list(cell) for cell in index.header_cells], ensure_ascii=False)
+    )
+    db.add(source)
+    db.flush()
+
+    # Колонке — первое название группы из шапки (сами группы восстанавливаются по шапке)
+    column_groups = {}
+    for name, column in index.groups.items():
+        column_groups.setdefault(column, name)
+
+    rows = []
+    for column, days in index.columns.items():
+        position = 0
+        for day_key, lessons in days.items():
+            for lesson in lessons:
+                rows.append({
+                    "source_id": source.id,
+                    "column": column,
+                    "group": column_groups.get(column, ""),
+                    "day": day_key,
+                    "position": position,
+                    "day_label": lesson.get("day"),
+                    "time": lesson.get("time"),
+                    "raw_time": lesson.get("raw_time"),
+                    "pair": lesson.get("pair"),
+                    "room": lesson.get("room"),
+                    "subject": lesson.get("subject"),
+                    "week_type": lesson.get("week_type"),
+                    "duration": lesson.get("duration")
+                })
+                position += 1
+    db.bulk_insert_mappings(ExcelLesson, rows)
+    return source
+
+
+def _save_docx(db: Session, snapshot):
+    source = ScheduleSource(
+        kind="docx",
+        url=snapshot.docx_url,
+        sha256=snapshot.docx_version,
+        week_type=snapshot.week_type,
+        published_at=snapshot.docx_published
+    )
+    db.add(source)
+    db.flush()
+
+    rows = []
+    for group_key, days in snapshot.replacements.items():
+        for day_label, items in days.items():
+            for item in items:
+                rows.append({
+                    "source_id": source.id,
+                    "group": group_key,
+                    "day": day_label,
+                    "position": len(rows),
+                    "pair": item.get("pair"),
+                    "room": item.get("room"),
+                    "subject_to": (item.get("to") or {}).get("subject"),
+                    "teacher_to": (item.get("to") or {}).get("teacher"),
+                    "subject_from": (item.get("from") or {}).get("subject"),
+                    "teacher_from": (item.get("from") or {}).get("teacher"),
+                    "comment": item.get("comment")
+                })
+    db.bulk_insert_mappings(Replacement, rows)
+    return source
+
+
+def _set_current(db: Session, kind, source):
+    """Делает версию текущей и удаляет остальные версии этого источника."""
+    old_ids = [
+        source_id for (source_id,) in
+        db.query(ScheduleSource.id).filter(ScheduleSource.kind == kind, ScheduleSource.id != source.id)
+    ]
+    if old_ids:
+        rows_model = ExcelLesson if kind == "excel" else Replacement
+        db.query(rows_model).filter(rows_model.source_id.in_(old_ids)).delete(synchronize_session=False)
+        db.query(ScheduleSource).filter(ScheduleSource.id.in_(old_ids)).delete(synchronize_session=False)
+    source.is_current = True
+
+
+def save_snapshot(db: Session, snapshot):
+    """
+    Сохраняет версии источников снимка, если их ещё нет в базе,
+    и делает их текущими. Всё — одной транзакцией.
+    """
+    excel_source = _find_source(db, "excel", snapshot.excel_version)
+    if excel_source is None:
+        excel_source = _save_excel(db, snapshot.excel_index)
+    _set_current(db, "excel", excel_source)
+
+    if snapshot.docx_version is not None:
+        docx_source = _find_source(db, "docx", snapshot.docx_version)
+        if docx_source is None:
+            docx_source = _save_docx(db, snapshot)
+        _set_current(db, "docx", docx_source)
+
+    db.commit()
+
+
+def _load_excel(db: Session, source):
+    columns = {}
+    query = (
+        db.query(ExcelLesson.column, ExcelLesson.day, *[getattr(ExcelLesson, f) for f in EXCEL_FIELDS])
+        .filter(ExcelLesson.source_id == source.id)
+        .order_by(ExcelLesson.column, ExcelLesson.position)
+    )
+    for column, day_key, day_label, time_, raw_time, pair, room, subject, week_type, duration in query:
+        columns.setdefault(column, {}).setdefault(day_key, []).append(
+            Lesson(day_label, time_, raw_time, pair, room, subject, week_type, duration)
+        )
+
+    index = ScheduleIndex(
+        columns=columns,
+        header_cells=[tuple(cell) for cell in json.loads(source.header_cells or "[]")]
+    )
+    index.version = source.sha256
+    # Время сохранения версии — для отметки свежести снимка из базы (created_at в UTC)
+    index.stored_at = source.created_at.replace(tzinfo=timezone.utc).timestamp() if source.created_at else None
+    return index
+
+
+def _load_docx(db: Session, source):
+    replacements = {}
+    query = (
+        db.query(
+            Replacement.group, Replacement.day, Replacement.pair, Replacement.room,
+            Replacement.subject_to, Replacement.teacher_to,
+            Replacement.subject_from, Replacement.teacher_from, Replacement.comment
+        )
+        .filter(Replacement.source_id == source.id)
+        .order_by(Replacement.position)
+    )
+    for group_key, day, pair, room, subject_to, teacher_to, subject_from, teacher_from, comment in query:
+        if comment is not None:
+            item = {"day": day, "comment": comment}
+        else:
+            item = {
+                "day": day,
+                "pair": pair,
+                "room": room,
+                "from": {"subject": subject_from, "teacher": teacher_from},
+                "to": {"subject": subject_to, "teacher": teacher_to}
+            }
+        replacements.setdefault(group_key, {}).setdefault(day, []).append(item)
+
+    # Запись в том же виде, что get_docx_tables_async, с готовым индексом замен
+    return {
+        "url": source.url,
+        "sha256": source.sha256,
+        "parsed": {"week_type": source.week_type, "day_labels": [], "tables": []},
+        "index": replacements,
+        "loaded_at": time.time(),
+        "first_seen": source.published_at
+    }
+
+
+def load_sources(db: Session):
+    """(ScheduleIndex, запись DOCX или None) текущих версий или None, если снимка нет."""
+    excel_source = db.query(ScheduleSource).filter(
+        ScheduleSource.kind == "excel", ScheduleSource.is_current == True
+    ).first()
+    if excel_source is None:
+        return None
+    docx_source = db.query(ScheduleSource).filter(
+        ScheduleSource.kind == "docx", ScheduleSource.is_current == True
+    ).first()
+    return _load_excel(db, excel_source), (_load_docx(db, docx_source) if docx_source else None)
+
+
+def load_current_sources():
+    db = SessionLocal()
+    try:
+        return load_sources(db)
+    finally:
+        db.close()
+
+
+def save_current_snapshot(snapshot):
+    db = SessionLocal()
+    try:
+        save_snapshot(db, snapshot)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
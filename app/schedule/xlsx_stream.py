@@ -0,0 +1,239 @@
+import io
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+# 📄 Потоковое чтение xlsx: лист и styles.xml разбираются iterparse прямо из zip,
+# без объектной модели openpyxl. Память — O(одной строки) плюс таблица строк.
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# 🎨 Цвета заливки -> тип недели (см. interpret_color в excel_scraper)
+UPPER_COLORS = {"00B0F0", "0070C0", "0066FF", "CCECFF"}
+LOWER_COLORS = {"00FF00", "00B050", "00FF99"}
+HOUR_COLORS = {"FFC0CB", "FF99CC", "FFB6C1", "FF66CC"}
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+
+def color_type_from_rgb(rgb):
+    """
+    "FF00B0F0" -> "upper", "FF00FF00" -> "lower", "FFFFC0CB" -> "hour", иначе None.
+    """
+    if not rgb:
+        return None
+    rgb = rgb.upper()
+    if rgb.startswith("FF"):
+        rgb = rgb[2:]
+
+    if rgb in UPPER_COLORS:
+        return "upper"
+    elif rgb in LOWER_COLORS:
+        return "lower"
+    elif rgb in HOUR_COLORS:
+        return "hour"
+    return None
+
+
+def _column_number(letters):
+    number = 0
+    for ch in letters:
+        number = number * 26 + (ord(ch) - 64)
+    return number
+
+
+def _open_zip(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return zipfile.ZipFile(source)
+
+
+def _active_sheet_path(archive):
+    """Путь к активному листу — тот же, что вернул бы workbook.active в openpyxl."""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+
+    active_tab = 0
+    view = workbook.find(f"{NS_MAIN}bookViews/{NS_MAIN}workbookView")
+    if view is not None:
+        active_tab = int(view.get("activeTab", 0))
+
+    sheets = workbook.findall(f"{NS_MAIN}sheets/{NS_MAIN}sheet")
+    if not sheets:
+        raise ValueError("В книге нет листов")
+    sheet = sheets[active_tab] if active_tab < len(sheets) else sheets[0]
+    rel_id = sheet.get(f"{NS_REL}id")
+
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{NS_PKG_REL}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"Не найден лист {rel_id}")
+
+
+def _text_of(element):
+    # Текст <si>/<is>: <t> напрямую или внутри <r>, фонетика <rPh> пропускается
+    parts = []
+    for child in element:
+        if child.tag == f"{NS_MAIN}t":
+            parts.append(child.text or "")
+        elif child.tag == f"{NS_MAIN}r":
+            t = child.find(f"{NS_MAIN}t")
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+def read_shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == f"{NS_MAIN}si":
+                strings.append(_text_of(element))
+                element.clear()
+    return strings
+
+
+def read_style_colors(archive):
+    """
+    Список: индекс стиля ячейки (атрибут s) -> тип недели по цвету заливки.
+    Как и interpret_color, учитываются только заливки с явным rgb в fgColor.
+    """
+    if "xl/styles.xml" not in archive.namelist():
+        return []
+
+    fill_types = []
+    xf_fills = []
+    in_fills = False
+    in_cell_xfs = False
+    with archive.open("xl/styles.xml") as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            tag = element.tag
+            if tag == f"{NS_MAIN}fills":
+                in_fills = event == "start"
+            elif tag == f"{NS_MAIN}cellXfs":
+                in_cell_xfs = event == "start"
+            elif event != "end":
+                continue
+            elif tag == f"{NS_MAIN}fill" and in_fills:
+                fg = element.find(f"{NS_MAIN}patternFill/{NS_MAIN}fgColor")
+                fill_types.append(color_type_from_rgb(fg.get("rgb")) if fg is not None else None)
+                element.clear()
+            elif tag == f"{NS_MAIN}xf" and in_cell_xfs:
+                xf_fills.append(int(element.get("fillId", 0)))
+                element.clear()
+
+    return [fill_types[i] if i < len(fill_types) else None for i in xf_fills]
+
+
+def _cast_number(value):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def iter_cells(source):
+    """
+    Генератор (строка, колонка, значение, тип недели) по непустым ячейкам
+    активного листа. Строки и колонки нумеруются с 1, как в openpyxl.
+
+    Значения приводятся так же, как при load_workbook: общие строки, числа
+    int/float, bool, формулы как "=...". Даты по формату ячейки не
+    распознаются — в расписании их нет.
+    """
+    archive = _open_zip(source)
+    try:
+        shared_strings = read_shared_strings(archive)
+        style_colors = read_style_colors(archive)
+        sheet_path = _active_sheet_path(archive)
+
+        with archive.open(sheet_path) as f:
+            sheet_data = None
+            row_idx = 0
+            col_idx = 0
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == f"{NS_MAIN}sheetData":
+                        sheet_data = element
+                    elif tag == f"{NS_MAIN}row":
+                        row_idx = int(element.get("r", row_idx + 1))
+                        col_idx = 0
+                    continue
+
+                if tag == f"{NS_MAIN}c":
+                    ref = element.get("r")
+                    match = _CELL_REF.match(ref) if ref else None
+                    col_idx = _column_number(match.group(1)) if match else col_idx + 1
+
+                    value = _cell_value(element, shared_strings)
+                    style = int(element.get("s", 0))
+                    week_type = style_colors[style] if style < len(style_colors) else None
+                    if value is not None or week_type is not None:
+                        yield row_idx, col_idx, value, week_type
+                elif tag == f"{NS_MAIN}row" and sheet_data is not None:
+                    # Отпускаем разобранную строку — держим в памяти только текущую
+                    sheet_data.clear()
+    finally:
+        archive.close()
+
+
+def _cell_value(element, shared_strings):
+    data_type = element.get("t", "n")
+
+    formula = element.find(f"{NS_MAIN}f")
+    if formula is not None and formula.text:
+        return "=" + formula.text
+
+    if data_type == "inlineStr":
+        inline = element.find(f"{NS_MAIN}is")
+        return _text_of(inline) if inline is not None else None
+
+    v = element.find(f"{NS_MAIN}v")
+    if v is None or v.text is None:
+        return None
+    raw = v.text
+
+    if data_type == "s":
+        return shared_strings[int(raw)]
+    if data_type == "b":
+        return bool(int(raw))
+    if data_type in ("str", "e"):
+        return raw
+    try:
+        return _cast_number(raw)
+    except ValueError:
+        return raw
+
+
+def iter_rows(source):
+    """
+    Строки листа в формате iter_sheet_rows из excel_scraper:
+    (номер строки, значения, типы недели), списки индексируются с 0.
+    Полностью пустые строки пропускаются.
+    """
+    current_row = None
+    values = []
+    colors = []
+    for row_idx, col_idx, value, week_type in iter_cells(source):
+        if row_idx != current_row:
+            if current_row is not None:
+                yield current_row, values, colors
+            current_row = row_idx
+            values = []
+            colors = []
+        missing = col_idx - len(values)
+        if missing > 0:
+            values.extend([None] * missing)
+            colors.extend([None] * missing)
+        values[col_idx - 1] = value
+        colors[col_idx - 1] = week_type
+    if current_row is not None:
+        yield current_row, values, colors
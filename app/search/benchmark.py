@@ -0,0 +1,112 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import Note, Event
+from app.search import fts
+
+# 🔍 Бенчмарк полнотекстового поиска: база на --notes заметок у --users
+# пользователей и --events событий, затем случайные запросы через
+# search_notes / search_events — тот же код, что у /api/notes/search и
+# /api/events/search. Запросы — одно-два слова словаря, часть — префиксом
+# («лаб» вместо «лабораторная»), как их набирают в строке поиска.
+# Запуск из корня проекта:
+#   python -m app.search.benchmark                          # 1 000 000 заметок, 1000 пользователей
+#   python -m app.search.benchmark --notes 100000 --queries 200
+
+WORDS = (
+    "лабораторная", "отчёт", "курсовая", "экзамен", "зачёт", "лекция", "практика", "семинар",
+    "физика", "математика", "программирование", "база", "данных", "сеть", "история", "английский",
+    "сдать", "прочитать", "подготовить", "повторить", "задание", "вариант", "тест", "контрольная",
+    "преподаватель", "аудитория", "библиотека", "конспект", "билеты", "проект", "защита", "доклад",
+    "купить", "позвонить", "встреча", "общежитие", "стипендия", "справка", "деканат", "расписание",
+)
+
+
+def make_text(rnd):
+    words = rnd.choices(WORDS, k=rnd.randint(4, 16))
+    return f"{' '.join(words[:3]).capitalize()}\n{' '.join(words[3:])}"
+
+
+def seed(engine, notes, users, events, rnd, batch=50000):
+    """
+    Строки вставляются без триггеров, индексы FTS строятся после — одним
+    INSERT ... SELECT в ensure_fts, как при первом запуске на старой базе.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start in range(0, notes, batch):
+            conn.execute(Note.__table__.insert(), [
+                {"text": make_text(rnd), "repeat": "none", "done": False, "user_id": 1 + i % users}
+                for i in range(start, min(notes, start + batch))
+            ])
+        if events:
+            conn.execute(Event.__table__.insert(), [
+                {"title": " ".join(rnd.choices(WORDS, k=4)).capitalize(),
+                 "description": " ".join(rnd.choices(WORDS, k=12)),
+                 "content": " ".join(rnd.choices(WORDS, k=80))}
+                for _ in range(events)
+            ])
+    started = time.perf_counter()
+    if not fts.ensure_fts(engine):
+        raise SystemExit("❌ В этой сборке SQLite нет FTS5")
+    return time.perf_counter() - started
+
+
+def make_query(rnd):
+    words = rnd.sample(WORDS, rnd.choice((1, 1, 2)))
+    # Половина слов — префиксом от трёх букв
+    return " ".join(word[:rnd.randint(3, len(word))] if rnd.random() < 0.5 else word for word in words)
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def bench(name, search, rnd, queries):
+    latencies, found = [], 0
+    for _ in range(queries):
+        started = time.perf_counter()
+        found += len(search(rnd))
+        latencies.append(time.perf_counter() - started)
+    ms = 1000
+    print(f"  {name:<8} p50 {percentile(latencies, 0.5) * ms:7.2f} мс   p95 {percentile(latencies, 0.95) * ms:7.2f} мс   "
+          f"p99 {percentile(latencies, 0.99) * ms:7.2f} мс   макс {max(latencies) * ms:7.2f} мс   "
+          f"в среднем найдено {found / queries:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк полнотекстового поиска FTS5 по заметкам и событиям")
+    parser.add_argument("--notes", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=fts.SEARCH_LIMIT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(workdir, 'search.db')}")
+        started = time.perf_counter()
+        index_seconds = seed(engine, args.notes, args.users, args.events, rnd)
+        print(f"🗄 {args.notes} заметок у {args.users} пользователей, {args.events} событий: "
+              f"база за {time.perf_counter() - started:.1f} с, из них индекс FTS {index_seconds:.1f} с")
+
+        db = sessionmaker(bind=engine)()
+        # Первый запрос читает страницы индекса с диска — в замер не идёт
+        fts.search_notes(db, 1, WORDS[0], args.limit)
+        print(f"🔍 {args.queries} запросов, limit {args.limit}:")
+        bench("заметки", lambda r: fts.search_notes(db, r.randint(1, args.users), make_query(r), args.limit), rnd, args.queries)
+        if args.events:
+            bench("события", lambda r: fts.search_events(db, make_query(r), args.limit), rnd, args.queries)
+        db.close()
+        engine.dispose()
@@ -0,0 +1,285 @@
+# app/search/fts.py
+import re
+import html
+import unicodedata
+from functools import lru_cache
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 🔍 Полнотекстовый поиск SQLite FTS5 по заметкам и событиям.
+# Индексы — external content: хранят только токены, текст читается из
+# самих таблиц notes/events. Триггеры обновляют индекс при любом INSERT,
+# UPDATE и DELETE — в том числе пакетных из app/notes/notes.py.
+# unicode61 приводит кириллицу к нижнему регистру, «ё» заменяется на «е»
+# и в индексе, и в запросе (remove_diacritics её не трогает — это отдельная
+# буква); каждое слово запроса от трёх букв ищется по префиксу («лаб» найдёт
+# «лабораторная», «лабы»).
+#
+# Заметки разделены по владельцам внутри самого индекса: каждое слово
+# записывается с номером пользователя впереди («0000000017лаб…»). Все
+# термины пользователя лежат в словаре подряд, и запрос — в том числе по
+# префиксу — читает только списки его заметок, а не списки всего корпуса.
+# Слова превращает в такие термины функция fts_user_terms, которую
+# create_sqlite_engine регистрирует на каждом соединении (см. app/database.py).
+
+TOKENIZE = "unicode61 remove_diacritics 2"
+SEARCH_LIMIT = 20
+SEARCH_LIMIT_MAX = 100
+SNIPPET_WORDS = 12
+
+# Номер пользователя фиксированной ширины: «1» + «7лаб» и «17» + «лаб»
+# дают разные термины
+USER_TERM_WIDTH = 10
+
+# Маркеры совпадений во фрагменте: символы из Private Use Area, которых нет
+# в тексте, — после экранирования HTML меняются на <mark>
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+# Слово — как у unicode61: буквы и цифры, подчёркивание — разделитель
+_TOKEN = re.compile(r"[^\W_]+")
+
+fts_enabled = False
+
+
+def _fold(expression):
+    # ё -> е одинаково при записи и удалении из индекса, иначе external content разойдётся
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _fold_text(value):
+    return value.replace("ё", "е").replace("Ё", "Е")
+
+
+def user_prefix(user_id):
+    return f"{int(user_id):0{USER_TERM_WIDTH}d}"
+
+
+def user_terms(user_id, value):
+    """Текст заметки -> термины индекса: каждое слово с номером владельца впереди."""
+    if user_id is None or not value:
+        return ""
+    prefix = user_prefix(user_id)
+    return " ".join(prefix + token for token in _TOKEN.findall(_fold_text(value)))
+
+
+def register_functions(dbapi_connection, connection_record=None):
+    # Без функции запись в notes падает на триггере индекса — регистрируется на каждом соединении
+    dbapi_connection.create_function("fts_user_terms", 2, user_terms, deterministic=True)
+
+
+FTS_TABLES = {
+    # таблица индекса: (таблица с текстом, {колонка индекса: выражение от строки},
+    # колонки, при смене которых строка переиндексируется, префиксные индексы)
+    "notes_fts": ("notes", {"text": "fts_user_terms({row}user_id, {row}text)"}, ("text", "user_id"), ""),
+    "events_fts": (
+        "events",
+        {column: _fold("{row}" + column) for column in ("title", "description", "content")},
+        ("title", "description", "content"),
+        # Слова короче трёх букв ищутся целиком — префиксы длины 2 не нужны
+        "3 4",
+    ),
+}
+
+
+def _values(prefix, expressions):
+    return ", ".join(expression.format(row=prefix) for expression in expressions.values())
+
+
+def _ddl(fts_table, table, expressions, watched, prefix):
+    cols = ", ".join(expressions)
+    new_values = _values("new.", expressions)
+    old_values = _values("old.", expressions)
+    insert_new = f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    prefix_option = f", prefix='{prefix}'" if prefix else ""
+    return [
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='{TOKENIZE}'{prefix_option})",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # Только при смене текста: отметка «выполнено» индекс не трогает
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {', '.join(watched)} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def ensure_fts(engine):
+    """
+    Создаёт индексы и триггеры, если их ещё нет; новый индекс сразу
+    заполняется из существующих строк. Индекс со старым описанием (другие
+    колонки или префиксы) пересоздаётся вместе с триггерами. Без FTS5 в
+    сборке SQLite поиск выключается, остальное приложение работает.
+    """
+    global fts_enabled
+    try:
+        with engine.begin() as conn:
+            for fts_table, (table, expressions, watched, prefix) in FTS_TABLES.items():
+                create_table, *triggers = _ddl(fts_table, table, expressions, watched, prefix)
+                existing = conn.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table}
+                ).scalar()
+                if existing is not None and existing != create_table:
+                    print(f"🛠 {fts_table}: описание индекса изменилось — пересоздаём")
+                    for suffix in ("ai", "ad", "au"):
+                        conn.execute(text(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}"))
+                    conn.execute(text(f"DROP TABLE {fts_table}"))
+                    existing = None
+                if existing is None:
+                    # 'rebuild' взял бы текст без замены ё — заполняем тем же выражением, что триггеры
+                    conn.execute(text(create_table))
+                    conn.execute(text(
+                        f"INSERT INTO {fts_table}(rowid, {', '.join(expressions)}) "
+                        f"SELECT id, {_values('', expressions)} FROM {table}"
+                    ))
+                for trigger in triggers:
+                    conn.execute(text(trigger))
+        fts_enabled = True
+    except Exception as e:
+        fts_enabled = False
+        print("⚠️ Полнотекстовый поиск недоступен (FTS5):", e)
+    return fts_enabled
+
+
+def query_tokens(query):
+    # Слова запроса (не больше 16) — тем же правилом, что слова индекса
+    return _TOKEN.findall(_fold_text(query or ""))[:16]
+
+
+def build_match_query(query, columns, prefix=""):
+    """
+    Строка пользователя -> запрос MATCH по колонкам columns: все слова
+    обязательны, слова от трёх букв ищутся по префиксу (короче — целиком,
+    иначе «л» совпадёт почти со всем). prefix — начало каждого термина
+    (номер владельца в индексе заметок). Операторы FTS5 из ввода не
+    интерпретируются. None — если в запросе нет ни одного слова.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return None
+    terms = " ".join(f'"{prefix}{token}"*' if len(token) >= 3 else f'"{prefix}{token}"' for token in tokens)
+    return f"{{{' '.join(columns)}}} : ({terms})"
+
+
+def highlight(snippet):
+    # Экранируем текст и только потом превращаем маркеры в <mark>
+    return html.escape(snippet or "").replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+@lru_cache(maxsize=8192)
+def _plain(word):
+    # Сравнение слов как у unicode61 remove_diacritics 2: регистр и диакритика не важны
+    decomposed = unicodedata.normalize("NFD", _fold_text(word).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def make_snippet(value, tokens, size=SNIPPET_WORDS):
+    """
+    Фрагмент текста заметки вокруг первого совпадения, совпавшие слова —
+    в маркерах, как у snippet() FTS5. Собирается из самого текста: в индексе
+    заметок термины не совпадают с текстом, а snippet() в запросе с ORDER BY
+    считался бы для каждого совпадения, а не только для limit лучших.
+    """
+    value = value or ""
+    words = list(_TOKEN.finditer(value))
+    if not words:
+        return ""
+    wanted = [(_plain(token), len(token) >= 3) for token in tokens]
+
+    def matches(word):
+        word = _plain(word)
+        return any(word.startswith(token) if is_prefix else word == token for token, is_prefix in wanted)
+
+    first = next((i for i, word in enumerate(words) if matches(word.group())), 0)
+    start = max(0, min(first - size // 4, len(words) - size))
+    end = min(len(words), start + size)
+
+    parts = ["…"] if start > 0 else []
+    position = words[start].start()
+    for word in words[start:end]:
+        parts.append(value[position:word.start()])
+        parts.append(f"{_MARK_OPEN}{word.group()}{_MARK_CLOSE}" if matches(word.group()) else word.group())
+        position = word.end()
+    if end < len(words):
+        parts.append("…")
+    return "".join(parts)
+
+
+def _best_snippet(values, tokens):
+    # Первое поле с совпадением (как snippet() с колонкой -1), иначе первое непустое
+    fallback = ""
+    for value in values:
+        if not value:
+            continue
+        snippet = make_snippet(value, tokens)
+        if _MARK_OPEN in snippet:
+            return snippet
+        fallback = fallback or snippet
+    return fallback
+
+
+def search_notes(db: Session, user_id: int, query: str, limit: int = SEARCH_LIMIT):
+    """
+    Заметки пользователя по релевантности (bm25), с фрагментом текста.
+    Запрос идёт только по терминам этого пользователя (см. user_terms).
+    """
+    match = build_match_query(query, ("text",), user_prefix(user_id))
+    if match is None:
+        return []
+    rows = db.execute(text("""
+        SELECT n.id, n.text, n.icon, n.note_datetime, n.done, n.created_at, bm25(notes_fts) AS score
+        FROM notes_fts JOIN notes AS n ON n.id = notes_fts.rowid
+        WHERE notes_fts MATCH :match AND n.user_id = :user_id AND n.deleted_at IS NULL
+        ORDER BY score
+        LIMIT :limit
+    """), {"match": match, "user_id": int(user_id), "limit": limit})
+    tokens = query_tokens(query)
+    return [
+        {
+            "id": row.id,
+            "title": (row.text or "").split("\n")[0][:255],
+            "snippet": highlight(make_snippet(row.text, tokens)),
+            "icon": row.icon or "📝",
+            "datetime": row.note_datetime,
+            "done": bool(row.done),
+            "created_at": row.created_at,
+            "score": row.score
+        }
+        for row in rows
+    ]
+
+
+def search_events(db: Session, query: str, limit: int = SEARCH_LIMIT):
+    """
+    События по релевантности. Совпадение в заголовке весит больше, чем
+    в описании, а в описании — больше, чем в полном тексте.
+    """
+    match = build_match_query(query, ("title", "description", "content"))
+    if match is None:
+        return []
+    # Сортируются только номер и оценка, тексты читаются для limit лучших
+    rows = db.execute(text("""
+        WITH top AS (
+            SELECT rowid, bm25(events_fts, 10.0, 3.0, 1.0) AS score
+            FROM events_fts
+            WHERE events_fts MATCH :match
+            ORDER BY score
+            LIMIT :limit
+        )
+        SELECT e.id, e.title, e.description, e.content, e.date, e.image, top.score
+        FROM top JOIN events AS e ON e.id = top.rowid
+        ORDER BY top.score
+    """), {"match": match, "limit": limit})
+    tokens = query_tokens(query)
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "date": row.date,
+            "image": row.image,
+            "snippet": highlight(_best_snippet((row.title, row.description, row.content), tokens)),
+            "score": row.score
+        }
+        for row in rows
+    ]
@@ -41,6 +41,16 @@ let db;
     driver: sqlite3.Database
   });
 
+  // 🗄 Тот же профиль хранения, что в app/database.py: база открыта и здесь,
+  // и в Python — WAL и busy_timeout, чтобы не ловить "database is locked"
+  await db.exec(`
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA mmap_size = 268435456;
+    PRAGMA cache_size = -16384;
+    PRAGMA busy_timeout = 5000;
+  `);
+
   await db.exec(`
     CREATE TABLE IF NOT EXISTS students (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
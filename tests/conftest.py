@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Приложение открывает ./app.db, а SQLAlchemy запоминает абсолютный путь при
+# импорте app.database — тесты работают во временной папке, а не с app.db проекта
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.chdir(tempfile.mkdtemp(prefix="app-tests-"))
@@ -0,0 +1,94 @@
+import time
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+
+@pytest.fixture(scope="module")
+def main():
+    # Таблицы создаются при импорте — в app.db временной папки (см. conftest.py)
+    from app import main as app_main
+    return app_main
+
+
+def add_legacy_user(main, username):
+    # Аккаунт, созданный до паролей
+    db = main.SessionLocal()
+    user = main.User(username=username, password_hash="local", group="1 курс, РС01-25")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def run(main, *requests):
+    # Каждый запрос — новый клиент без cookie: как разные устройства
+    async def go():
+        responses = []
+        for url, body in requests:
+            async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+                responses.append(await client.post(url, json=body))
+        return responses
+    return asyncio.run(go())
+
+
+def test_legacy_account_sets_password_on_first_login(main):
+    user_id = add_legacy_user(main, "Старый Пользователь")
+    login = "/api/login"
+    short, first, wrong, again = run(
+        main,
+        (login, {"username": "Старый Пользователь", "password": "123"}),
+        (login, {"username": "Старый Пользователь", "password": "секрет-1"}),
+        (login, {"username": "Старый Пользователь", "password": "другой-1"}),
+        (login, {"username": "Старый Пользователь", "password": "секрет-1"}),
+    )
+    assert short.status_code == 400
+    assert first.status_code == 200 and first.json()["id"] == user_id and first.json()["token"]
+    # Пароль задаётся один раз: дальше — обычная проверка
+    assert wrong.status_code == 401
+    assert again.status_code == 200 and again.json()["id"] == user_id
+
+
+def test_legacy_account_sets_password_on_register(main):
+    user_id = add_legacy_user(main, "Иван Старый")
+    form = {"firstName": "Иван", "lastName": "Старый", "course": "2", "group": "РС02-24"}
+    claimed, other, login = run(
+        main,
+        ("/api/register", {**form, "password": "пароль-1"}),
+        ("/api/register", {**form, "password": "пароль-2"}),
+        ("/api/login", {"username": "Иван Старый", "password": "пароль-1"}),
+    )
+    assert claimed.status_code == 200 and claimed.json()["id"] == user_id and claimed.json()["token"]
+    assert other.status_code == 409
+    assert login.status_code == 200
+
+    db = main.SessionLocal()
+    assert db.get(main.User, user_id).group == "2 курс, РС02-24"
+    db.close()
+
+
+def test_password_hashing_does_not_block_the_loop(main):
+    run(main, ("/api/register", {
+        "firstName": "Петр", "lastName": "Новый", "course": "1", "group": "РС01-25", "password": "пароль-1"
+    }))
+
+    async def go():
+        lags = []
+
+        async def probe():
+            for _ in range(20):
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started)
+
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+            logins = [client.post("/api/login", json={"username": "Петр Новый", "password": "пароль-1"}) for _ in range(3)]
+            responses, _ = await asyncio.gather(asyncio.gather(*logins), probe())
+        return responses, lags
+
+    responses, lags = asyncio.run(go())
+    assert all(r.status_code == 200 for r in responses)
+    # PBKDF2 в цикле событий держал бы его ~100 мс на каждый вход
+    assert max(lags) < 0.08
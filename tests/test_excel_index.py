@@ -0,0 +1,48 @@
+import io
+
+from openpyxl import Workbook, load_workbook
+
+from app.schedule import xlsx_stream
+from app.schedule.excel_scraper import ScheduleIndex, build_schedule_index, find_group_column
+
+# Названия, которые GROUP_NAME_PATTERN не берёт: строчные, длинный префикс,
+# приписка через пробел — find_group_column находил их подстрокой
+HEADER = ["РС01-25", "рс02-24", "ТЭОСП1-24", "ИС11-24 (вечер)", "Группа МД-3"]
+
+
+def make_content():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.cell(1, 1, "Расписание учебных занятий")
+    for g, name in enumerate(HEADER):
+        sheet.cell(2, 4 + g * 2, name)
+    sheet.cell(3, 2, "Понедельник")
+    sheet.cell(3, 3, "1 8.00-9.35")
+    for g, name in enumerate(HEADER):
+        sheet.cell(3, 5 + g * 2, f"Предмет {name}")
+        sheet.cell(3, 6 + g * 2, 100 + g)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_header_names_outside_the_pattern_are_found():
+    content = make_content()
+    sheet = load_workbook(io.BytesIO(content)).active
+    index = build_schedule_index(xlsx_stream.iter_rows(content))
+
+    for g, name in enumerate(HEADER):
+        assert index.find_column(name) == find_group_column(sheet, name)
+        [lesson] = index.lessons_for_day(name, "понедельник")
+        assert lesson.subject == f"Предмет {name}" and lesson.room == str(100 + g)
+
+    # Подстрока шапки — как в find_group_column
+    assert index.lessons_for_day("ИС11-24", "Понедельник")[0].subject == "Предмет ИС11-24 (вечер)"
+    assert index.get_days("ПО6") is None
+
+
+def test_cached_index_keeps_every_header_column():
+    index = build_schedule_index(xlsx_stream.iter_rows(make_content()))
+    restored = ScheduleIndex.from_dict(index.to_dict())
+    assert restored.columns.keys() == index.columns.keys()
+    assert restored.lessons_for_day("рс02-24", "понедельник")[0].subject == "Предмет рс02-24"
@@ -0,0 +1,87 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import Note, Event
+from app.search import fts
+
+
+def make_db(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    assert fts.ensure_fts(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def add_note(db, user_id, value):
+    note = Note(text=value, repeat="none", done=False, user_id=user_id)
+    db.add(note)
+    db.commit()
+    return note.id
+
+
+def found(db, user_id, query):
+    return [item["id"] for item in fts.search_notes(db, user_id, query)]
+
+
+def test_search_notes_sees_only_own_notes(tmp_path):
+    engine, db = make_db(tmp_path)
+    own = add_note(db, 17, "Сдать лабораторную по физике")
+    add_note(db, 1, "Лабораторная 7лаб")
+    # «1» + «7лаб» не должно совпасть с «17» + «лаб»
+    add_note(db, 1, "7лабиринт")
+
+    assert found(db, 17, "лаб") == [own]
+    assert found(db, 17, "физ лаб") == [own]
+    assert found(db, 2, "лаб") == []
+    assert len(found(db, 1, "лаб")) == 1
+    engine.dispose()
+
+
+def test_search_notes_follows_updates_and_folds_yo(tmp_path):
+    engine, db = make_db(tmp_path)
+    note_id = add_note(db, 5, "Отчёт по практике")
+    assert found(db, 5, "отчет") == [note_id]
+
+    note = db.get(Note, note_id)
+    note.text = "Курсовая"
+    db.commit()
+    assert found(db, 5, "отчет") == []
+    assert found(db, 5, "курс") == [note_id]
+
+    # Смена владельца переносит заметку в его часть индекса
+    note.user_id = 6
+    db.commit()
+    assert found(db, 5, "курс") == []
+    assert found(db, 6, "курс") == [note_id]
+    engine.dispose()
+
+
+def test_snippet_marks_matches_and_escapes_html(tmp_path):
+    engine, db = make_db(tmp_path)
+    add_note(db, 3, "Купить <b>тетради</b> и ручки для лабораторной")
+    [item] = fts.search_notes(db, 3, "тетрад лаб")
+    assert item["snippet"] == "Купить &lt;b&gt;<mark>тетради</mark>&lt;/b&gt; и ручки для <mark>лабораторной</mark>"
+
+    db.add(Event(title="Ёлка в колледже", description="новогодний концерт", content="актовый зал"))
+    db.commit()
+    [event] = fts.search_events(db, "елк")
+    assert event["snippet"] == "<mark>Ёлка</mark> в колледже"
+    engine.dispose()
+
+
+def test_ensure_fts_rebuilds_old_index(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Прежний индекс: владелец отдельной колонкой-токеном
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE notes_fts USING fts5(text, user_id, content='notes', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+        ))
+        conn.execute(text("INSERT INTO notes(text, repeat, done, user_id) VALUES ('Экзамен по истории', 'none', 0, 4)"))
+
+    assert fts.ensure_fts(engine)
+    db = sessionmaker(bind=engine)()
+    assert found(db, 4, "экз") == [1]
+    engine.dispose()
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+# benchmark добавляет app/schedule в sys.path — schedule_merger импортирует соседей без пакета
+from app.schedule.benchmark import ROOMS
+from app.schedule.schedule_merger import merge_all_groups, merge_schedules, merge_schedules_reference, merge_week
+
+SEED = 20251020
+CASES = 2000
+
+# Значения, на которых легко разойтись: пустые пары, подгруппы, буквы, "ё" в днях
+MERGE_PAIRS = [None, "", "1", "2", " 3 ", "4", "4/1", "4/2", "4/3", "4/x", "3лр", "лр", 5, "10", "1/"]
+MERGE_DAYS = ["Понедельник", " вторник ", "Четверг", "Четвёрг", "", None]
+MERGE_TIMES = [None, "", "8.00-9.35", "9.50-11.25", "14.00-15.35"]
+
+
+def random_merge_case(rnd):
+    """Случайная пара (excel_data, doc_data) для сравнения слияний."""
+    lessons = []
+    for _ in range(rnd.randint(0, 12)):
+        lesson = {
+            "day": rnd.choice(MERGE_DAYS[:-1]),
+            "pair": rnd.choice(MERGE_PAIRS),
+            "room": rnd.choice(ROOMS),
+            "subject": f"Предмет {rnd.randint(1, 5)}",
+            "week_type": rnd.choice([None, None, "upper", "lower", "hour"]),
+            "duration": rnd.choice([1, 2]),
+            "raw_time": rnd.choice(MERGE_TIMES),
+            "time": rnd.choice(MERGE_TIMES)
+        }
+        if rnd.random() < 0.1:
+            del lesson["pair"]
+        lessons.append(lesson)
+
+    replacements = []
+    for _ in range(rnd.randint(0, 8)):
+        if rnd.random() < 0.15:
+            replacements.append({"day": rnd.choice(MERGE_DAYS), "comment": "Занятия с 3-й пары"})
+            continue
+        item = {
+            "day": rnd.choice(MERGE_DAYS),
+            "pair": rnd.choice(MERGE_PAIRS),
+            "room": rnd.choice(["101", ""]),
+            "to": {"subject": rnd.choice(["Новый", ""])}
+        }
+        if rnd.random() < 0.1:
+            del item["to"]
+        if rnd.random() < 0.1:
+            del item["room"]
+        replacements.append(item)
+
+    doc_data = {"group": "РС01-20", "schedule": replacements}
+    if rnd.random() < 0.5:
+        doc_data["week_type"] = rnd.choice(["upper", "lower"])
+    return {"group": "РС01-20", "schedule": lessons}, rnd.choice([doc_data, doc_data, None])
+
+
+def split_days(excel_data, doc_data):
+    # Пары и замены по дням недели — как их отдаёт индекс Excel и group_replacements
+    excel_days, doc_days = {}, {}
+    for lesson in excel_data["schedule"]:
+        excel_days.setdefault(lesson["day"].strip().lower(), []).append(lesson)
+    for item in (doc_data or {}).get("schedule", []):
+        doc_days.setdefault((item.get("day") or "").strip().lower(), []).append(item)
+    return excel_days, doc_days
+
+
+def reference_week(group_name, excel_days, doc_data):
+    # merge_week тип недели не фильтрует — эталон по каждому дню без week_type
+    _, doc_days = split_days({"schedule": []}, doc_data)
+    return {
+        day: merge_schedules_reference(
+            {"group": group_name, "schedule": excel_days.get(day, [])},
+            {"group": group_name, "schedule": doc_days.get(day, [])}
+        )["schedule"]
+        for day in list(excel_days) + [d for d in doc_days if d not in excel_days]
+    }
+
+
+@pytest.mark.parametrize("week_type", [None, "upper", "lower"])
+def test_merge_schedules_matches_reference(week_type):
+    rnd = random.Random(SEED)
+    for case in range(CASES):
+        excel_data, doc_data = random_merge_case(rnd)
+        if doc_data is not None:
+            doc_data = {**doc_data, "week_type": week_type}
+        expected = merge_schedules_reference(excel_data, doc_data)
+        assert merge_schedules(excel_data, doc_data) == expected, f"case={case}: {excel_data} {doc_data}"
+
+
+def test_merge_week_matches_reference_per_day():
+    rnd = random.Random(SEED)
+    for case in range(CASES):
+        excel_data, doc_data = random_merge_case(rnd)
+        excel_days, _ = split_days(excel_data, doc_data)
+        expected = reference_week(excel_data["group"], excel_days, doc_data)
+        assert merge_week(excel_data["group"], excel_days, doc_data) == expected, f"case={case}: {excel_data} {doc_data}"
+
+
+def test_replacements_without_excel_lessons():
+    # Группа есть в документе замен, но не в книге: все замены — добавленные пары
+    doc_data = {"group": "ИС11-24", "week_type": "upper", "schedule": [
+        {"day": "Понедельник", "pair": "2", "room": "101", "to": {"subject": "Физика"}},
+        {"day": "Понедельник", "pair": "4/1", "room": "", "to": {"subject": "Химия"}},
+        {"day": "Вторник", "comment": "Занятия с 3-й пары"},
+    ]}
+    excel_data = {"group": "ИС11-24", "schedule": []}
+    assert merge_schedules(excel_data, doc_data) == merge_schedules_reference(excel_data, doc_data)
+    assert [item.get("subject") for item in merge_schedules(excel_data, doc_data)["schedule"]] == ["Физика", "Химия", None]
+    assert merge_week("ИС11-24", {}, doc_data) == reference_week("ИС11-24", {}, doc_data)
+
+
+def test_merge_all_groups_matches_reference():
+    rnd = random.Random(SEED)
+    weeks = {}
+    for g in range(50):
+        excel_data, doc_data = random_merge_case(rnd)
+        excel_days, _ = split_days(excel_data, doc_data)
+        # Каждая пятая группа — только с заменами, без пар в книге
+        weeks[f"РС{g:02d}-25"] = ({} if g % 5 == 0 else excel_days, doc_data)
+
+    merged = merge_all_groups(weeks)
+    assert list(merged) == list(weeks)
+    for group_name, (excel_days, doc_data) in weeks.items():
+        assert merged[group_name] == reference_week(group_name, excel_days, doc_data), group_name
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.models import Note
+
+
+@pytest.fixture(scope="module")
+def main():
+    from app import main as app_main
+    return app_main
+
+
+def test_batch_rejects_non_integer_ids_per_operation(main):
+    async def go():
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+            registered = await client.post("/api/register", json={
+                "firstName": "Анна", "lastName": "Пакетная", "course": "1", "group": "РС01-25", "password": "пароль-1"
+            })
+            assert registered.status_code == 200
+            created = await client.post("/api/notes/batch", json={"operations": [{"op": "create", "text": "Конспект"}]})
+            note_id = created.json()["results"][0]["id"]
+
+            response = await client.post("/api/notes/batch", json={"operations": [
+                {"op": "update", "id": [note_id], "text": "Список"},
+                {"op": "delete", "id": {"id": note_id}},
+                {"op": "done", "id": True},
+                {"op": "update", "id": str(note_id), "text": "Строка"},
+                {"op": "done", "id": note_id},
+            ]})
+            return note_id, response
+
+    note_id, response = asyncio.run(go())
+    # Битые id — ошибка своей операции, а не 500 на весь пакет
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["error", "error", "error", "error", "done"]
+    assert results[4]["id"] == note_id
+
+    db = main.SessionLocal()
+    note = db.get(Note, note_id)
+    assert note.done and note.text == "Конспект" and note.deleted_at is None
+    db.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from httpx import AsyncClient, ASGITransport
+
+from app.schedule.page_cache import PageCache, conditional_response, etag_matches
+
+
+def make_app():
+    # Тот же стек, что в main.py: GZipMiddleware поверх ответов из кэша страниц
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    cache = PageCache()
+    page = cache.put("page", ("<p>Пара</p>" * 500).encode("utf-8"), "text/html; charset=utf-8")
+
+    @app.get("/page")
+    async def get_page(request: Request):
+        return conditional_response(request, page)
+
+    return app
+
+
+def fetch(*headers):
+    async def go():
+        async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as client:
+            return [await client.get("/page", headers=h) for h in headers]
+    return asyncio.run(go())
+
+
+def test_gzip_and_plain_share_a_weak_etag():
+    gzipped, plain = fetch({"Accept-Encoding": "gzip"}, {"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    # Байты разные, а тег общий — поэтому он слабый
+    assert gzipped.headers["etag"] == plain.headers["etag"]
+    assert gzipped.headers["etag"].startswith('W/"')
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+
+
+def test_revalidation_with_either_variant_gives_304():
+    [first] = fetch({"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    gzipped, plain, strong = fetch(
+        {"Accept-Encoding": "gzip", "If-None-Match": etag},
+        {"Accept-Encoding": "identity", "If-None-Match": etag},
+        {"If-None-Match": etag.removeprefix("W/")},
+    )
+    for response in (gzipped, plain, strong):
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', 'W/"b"')
+    assert etag_matches("*", 'W/"b"')
+    assert not etag_matches('W/"c"', 'W/"b"')
+    assert not etag_matches(None, 'W/"b"')
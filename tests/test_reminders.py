@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.notes.reminders import ReminderScheduler
+
+NOW = datetime(2025, 10, 20, 12, 0)
+
+
+class RacingScheduler(ReminderScheduler):
+    """Окно «читается» из заданных строк, а между чтением и push_rows приходят notify."""
+
+    def __init__(self, rows, during_load):
+        super().__init__(window=3600)
+        self.rows = rows
+        self.during_load = during_load
+
+    def _query_window_session(self, start, until):
+        rows = list(self.rows)
+        for note_id, due in self.during_load:
+            self.notify(note_id, due)
+        return rows
+
+
+def extend(scheduler, now):
+    asyncio.run(scheduler._extend_window(now))
+
+
+def test_notify_during_window_load_is_not_lost():
+    scheduler = RacingScheduler(
+        rows=[(1, NOW + timedelta(minutes=10))],
+        during_load=[
+            (2, NOW + timedelta(minutes=20)),  # новая заметка, которой нет в прочитанных строках
+            (1, NOW + timedelta(minutes=30)),  # перенос: строка из базы уже устарела
+        ],
+    )
+    scheduler._loaded_until = NOW
+    extend(scheduler, NOW)
+
+    assert scheduler.pop_due(NOW + timedelta(minutes=15)) == []
+    assert scheduler.pop_due(NOW + timedelta(minutes=25)) == [2]
+    assert scheduler.pop_due(NOW + timedelta(minutes=35)) == [1]
+    assert scheduler.pop_due(NOW + timedelta(hours=2)) == []
+
+
+def test_notify_during_load_outside_new_window_or_cancelled():
+    scheduler = RacingScheduler(
+        rows=[(1, NOW + timedelta(minutes=10))],
+        during_load=[
+            (1, None),                          # выполнена во время чтения
+            (3, NOW + timedelta(hours=3)),      # дальше нового окна — дочитается позже
+        ],
+    )
+    scheduler._loaded_until = NOW
+    extend(scheduler, NOW)
+
+    assert scheduler.pop_due(NOW + timedelta(hours=1)) == []
+    assert scheduler.stats()["scheduled"] == 0
+
+
+def test_notify_in_old_window_during_load_is_pushed_once():
+    scheduler = RacingScheduler(rows=[], during_load=[(4, NOW - timedelta(minutes=5))])
+    scheduler._loaded_until = NOW
+    extend(scheduler, NOW)
+
+    assert len(scheduler._heap) == 1
+    assert scheduler.pop_due(NOW) == [4]
+
+
+class FlakyScheduler(ReminderScheduler):
+    """fire падает заданное число раз (ошибка базы при commit), потом срабатывает."""
+
+    def __init__(self, failures, during_fire=()):
+        super().__init__(window=3600)
+        self.failures = failures
+        self.during_fire = during_fire
+        self.fired_ids = []
+
+    def _fire_session(self, note_ids, now):
+        for note_id, due in self.during_fire:
+            self.notify(note_id, due)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.fired_ids.extend(note_ids)
+        return [], []
+
+
+def test_failed_fire_puts_due_notes_back():
+    scheduler = FlakyScheduler(failures=1)
+    scheduler._loaded_until = NOW + timedelta(hours=1)
+    scheduler.notify(1, NOW - timedelta(minutes=2))
+    scheduler.notify(2, NOW - timedelta(minutes=1))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler._fire_due(NOW))
+    assert scheduler.fired_ids == []
+    assert scheduler.stats()["scheduled"] == 2
+
+    # Повтор после паузы в _main — те же заметки
+    assert asyncio.run(scheduler._fire_due(NOW)) is True
+    assert scheduler.fired_ids == [1, 2]
+    assert asyncio.run(scheduler._fire_due(NOW)) is False
+
+
+def test_failed_fire_keeps_newer_notify():
+    # Пока fire шёл, заметку 1 перенесли на потом: старое время не возвращается
+    scheduler = FlakyScheduler(failures=1, during_fire=[(1, NOW + timedelta(minutes=30))])
+    scheduler._loaded_until = NOW + timedelta(hours=1)
+    scheduler.notify(1, NOW - timedelta(minutes=1))
+    scheduler.notify(2, NOW - timedelta(minutes=1))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler._fire_due(NOW))
+    assert scheduler.pop_due(NOW) == [2]
+    assert scheduler.pop_due(NOW + timedelta(minutes=30)) == [1]
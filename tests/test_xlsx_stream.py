@@ -0,0 +1,170 @@
+import io
+import re
+import zipfile
+from html import unescape
+from xml.sax.saxutils import escape
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Color, PatternFill
+
+from app.schedule import xlsx_stream
+from app.schedule.benchmark import make_workbook
+from app.schedule.excel_scraper import build_schedule_index, iter_sheet_rows
+
+
+def fixture_workbook():
+    """
+    Маленькая книга в формате колледжа: объединённые ячейки дней, заливки
+    rgb, темой и палитрой (indexed), числа, bool и формула.
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.cell(1, 1, "Расписание учебных занятий")
+    sheet.cell(2, 4, "РС01-25")
+    sheet.cell(2, 6, "ИС11-24")
+    sheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
+
+    rows = [
+        (3, "1 8.00-9.35", "Математика", 101, PatternFill("solid", fgColor="FF00B0F0")),
+        (4, None, "Физика", "204а", PatternFill("solid", fgColor=Color(theme=4))),
+        (5, "2 9.50-11.25", "История", 12, PatternFill("solid", fgColor=Color(indexed=13))),
+        (6, None, "Химия", "спортзал", PatternFill("solid", fgColor="FFFFFF00")),
+        (7, "1 8.00-9.35", "Литература", 3.5, PatternFill("solid", fgColor="FF00FF00")),
+        (8, None, "Английский", True, None),
+    ]
+    for row, time_label, subject, room, fill in rows:
+        if time_label:
+            sheet.cell(row, 3, time_label)
+        cell = sheet.cell(row, 5, subject)
+        sheet.cell(row, 6, room)
+        sheet.cell(row, 7, f"{subject} (2 подгр.)")
+        if fill:
+            cell.fill = fill
+    sheet.cell(9, 8, "=F3+1")
+    # Заливка без значения — только стиль
+    sheet.cell(9, 5).fill = PatternFill("solid", fgColor="FFFFC0CB")
+
+    sheet.cell(3, 2, "Понедельник")
+    sheet.merge_cells(start_row=3, start_column=2, end_row=6, end_column=2)
+    sheet.cell(7, 2, "Вторник")
+    sheet.merge_cells(start_row=7, start_column=2, end_row=8, end_column=2)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+SST_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+SST_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+
+def with_shared_strings(content):
+    """
+    Та же книга, но строки вынесены в xl/sharedStrings.xml (t="s"), как
+    сохраняет Excel; openpyxl пишет их прямо в ячейки (t="inlineStr").
+    Каждая вторая общая строка — из двух фрагментов rich text.
+    """
+    source = zipfile.ZipFile(io.BytesIO(content))
+    strings = {}
+
+    def shared(match):
+        text = unescape(match.group(2).decode())
+        index = strings.setdefault(text, len(strings))
+        return f'<c{match.group(1).decode()} t="s"><v>{index}</v></c>'.encode()
+
+    def item(text, index):
+        if index % 2 and len(text) > 1:
+            return f"<si><r><t>{escape(text[:1])}</t></r><r><rPr><b/></rPr><t>{escape(text[1:])}</t></r></si>"
+        return f"<si><t>{escape(text)}</t></si>"
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+            if info.filename == "xl/worksheets/sheet1.xml":
+                data, count = re.subn(rb'<c([^>]*?) t="inlineStr"><is><t>(.*?)</t></is></c>', shared, data)
+                assert count > 0
+            elif info.filename == "[Content_Types].xml":
+                data = data.replace(b"</Types>", f'<Override PartName="/xl/sharedStrings.xml" ContentType="{SST_CONTENT_TYPE}"/></Types>'.encode())
+            elif info.filename == "xl/_rels/workbook.xml.rels":
+                data = data.replace(b"</Relationships>", f'<Relationship Type="{SST_RELATIONSHIP}" Target="sharedStrings.xml" Id="rIdSst"/></Relationships>'.encode())
+            target.writestr(info, data)
+        items = "".join(item(text, index) for text, index in strings.items())
+        target.writestr("xl/sharedStrings.xml", (
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>'
+        ))
+    return buffer.getvalue()
+
+
+def openpyxl_cells(content):
+    workbook = load_workbook(io.BytesIO(content))
+    cells = {}
+    for row_idx, values, colors in iter_sheet_rows(workbook.active):
+        for i, value in enumerate(values):
+            if value is not None or colors[i] is not None:
+                cells[row_idx, i + 1] = (value, colors[i])
+    return cells
+
+
+def stream_cells(content):
+    cells = {}
+    for row_idx, values, colors in xlsx_stream.iter_rows(content):
+        for i, value in enumerate(values):
+            if value is not None or colors[i] is not None:
+                cells[row_idx, i + 1] = (value, colors[i])
+    return cells
+
+
+def assert_same_index(content):
+    expected = build_schedule_index(iter_sheet_rows(load_workbook(io.BytesIO(content)).active))
+    actual = build_schedule_index(xlsx_stream.iter_rows(content))
+    assert actual.header_cells == expected.header_cells
+    assert actual.groups == expected.groups
+    assert actual.columns == expected.columns
+    return actual
+
+
+def test_fixture_cells_match_openpyxl():
+    content = fixture_workbook()
+    cells = stream_cells(content)
+    assert cells == openpyxl_cells(content)
+
+    # Объединённые дни — значение только в левой верхней ячейке
+    assert cells[3, 2] == ("Понедельник", None)
+    assert (4, 2) not in cells
+    # Тип недели даёт только явный rgb: тема и палитра — без типа
+    assert cells[3, 5] == ("Математика", "upper")
+    assert cells[4, 5] == ("Физика", None)
+    assert cells[5, 5] == ("История", None)
+    assert cells[7, 5] == ("Литература", "lower")
+    assert cells[9, 5] == (None, "hour")
+    assert cells[8, 6] == (True, None)
+    assert cells[9, 8] == ("=F3+1", None)
+
+
+def test_shared_strings_match_inline_strings():
+    content = fixture_workbook()
+    shared = with_shared_strings(content)
+    sheet = zipfile.ZipFile(io.BytesIO(shared)).read("xl/worksheets/sheet1.xml")
+    assert b'inlineStr' not in sheet and b't="s"' in sheet
+
+    expected = stream_cells(content)
+    assert stream_cells(shared) == expected
+    assert openpyxl_cells(shared) == expected
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_fixture_index_matches_openpyxl(shared):
+    content = fixture_workbook()
+    if shared:
+        content = with_shared_strings(content)
+    index = assert_same_index(content)
+    assert set(index.groups) == {"РС01-25", "ИС11-24"}
+    assert index.columns
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_generated_index_matches_openpyxl(seed):
+    assert_same_index(make_workbook(groups=12, seed=seed))